@@ -12,16 +12,63 @@ AI 总结对比脚本
 4. 保存到 info/summary.json
 """
 
+import contextvars
+import hashlib
 import json
+import random
+import threading
 import time
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 import requests
 
+from json_io import save_json
+
 
 # 重试配置
-MAX_RETRIES = 3
+MAX_RETRIES = 6
 RETRY_DELAY = 2
+# 限流 / 过载 / 服务端错误才值得重试，其余 4xx（如鉴权失败、请求格式错误）直接放弃
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# 请求前限流（可在 llm_config.json 中用 rpm / tpm 覆盖，0 表示不限制）
+DEFAULT_RPM = 50
+DEFAULT_TPM = 0
+
+# 输出长度配置
+MATRIX_MAX_TOKENS = 3000
+TAG_MAX_TOKENS = 600
+
+# Matrix 概览生成失败时写入的占位文本（不会被当作可复用的结果）
+MATRIX_FAILED_TEXT = "总结生成失败"
+
+# Message Batches 配置（--batch 模式，费用减半，适合离线批量生成）
+BATCH_POLL_INTERVAL = 60  # 秒
+BATCH_TIMEOUT = 24 * 3600  # 批处理最长 24 小时
+
+# 并发配置（标签概览并发请求数，可在 llm_config.json 中用 max_concurrency 覆盖）
+MAX_CONCURRENCY = 8
+
+# HTTP 连接配置：模块级 Session 复用连接池，避免每次调用都重新握手
+HTTP_POOL_SIZE = 16
+HTTP_TIMEOUT = (5, 120)  # (连接, 读取) 秒
+RETRY_MAX_DELAY = 60
+
+_HTTP = requests.Session()
+_HTTP.mount("https://", requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+_HTTP.mount("http://", requests.adapters.HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE))
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+# LLM 结果缓存：相同 (model, max_tokens, prompt) 在一次运行中只请求一次，
+# 结果持久化到 .cache/llm，数据未变时重复运行直接复用（--no-cache 关闭）
+LLM_CACHE_ENABLED = True
+_inflight = {}
+_inflight_lock = threading.Lock()
 
 
 def get_project_root():
@@ -32,28 +79,37 @@ def get_project_root():
     return script_dir.parent
 
 
+# 项目路径（模块加载时计算一次）
+PROJECT_ROOT = get_project_root()
+STORAGE_DIR = PROJECT_ROOT / "storage"
+INFO_DIR = PROJECT_ROOT / "info"
+
+
+@lru_cache(maxsize=1)
 def load_config():
-    """加载 LLM 配置"""
+    """加载 LLM 配置（进程内只读取一次）"""
     config_path = Path(__file__).parent / "prompts" / "llm_config.json"
     with open(config_path, "r", encoding="utf-8") as f:
         configs = json.load(f)
     return configs[0]
 
 
+@lru_cache(maxsize=1)
 def load_exclude_tags():
-    """加载要排除的标签列表"""
-    config_path = get_project_root() / "info" / "admin_config.json"
+    """加载要排除的标签集合（进程内只读取一次，返回 frozenset 便于 O(1) 判断）"""
+    config_path = INFO_DIR / "admin_config.json"
     try:
         with open(config_path, "r", encoding="utf-8") as f:
             config = json.load(f)
-        return config.get("exclude_tags", [])
+        return frozenset(config.get("exclude_tags", []))
     except Exception:
-        return []
+        return frozenset()
 
 
+@lru_cache(maxsize=1)
 def load_tags():
-    """加载标签体系（自动过滤 exclude_tags，包括顶级标签和 subtag）"""
-    tags_path = get_project_root() / "info" / "tag.json"
+    """加载标签体系（自动过滤 exclude_tags，包括顶级标签和 subtag；进程内只读取一次）"""
+    tags_path = INFO_DIR / "tag.json"
     with open(tags_path, "r", encoding="utf-8") as f:
         tags_data = json.load(f)
     
@@ -83,18 +139,51 @@ def load_tags():
     return filtered_tags
 
 
+def clear_caches():
+    """清空配置和标签缓存（常驻进程重复生成前调用；产品数据按文件 mtime 自动失效）"""
+    load_config.cache_clear()
+    load_exclude_tags.cache_clear()
+    load_tags.cache_clear()
+
+
+def get_storage_signature(storage_dir: Path) -> tuple:
+    """storage 下各产品文件的 (文件名, mtime) 列表，任何文件变化都会改变签名"""
+    return tuple(sorted(
+        (p.name, p.stat().st_mtime_ns)
+        for p in storage_dir.glob("*.json")
+        if p.name != "example.json"
+    ))
+
+
 def load_all_products():
-    """加载所有产品数据"""
-    storage_dir = get_project_root() / "storage"
+    """加载所有产品数据（按文件 mtime 缓存，文件未变化时不重复解析）"""
+    storage_dir = STORAGE_DIR
+    return _load_all_products(storage_dir, get_storage_signature(storage_dir))
+
+
+def read_file_bytes(path: Path):
+    """读取文件原始字节，失败时返回异常对象（供线程池使用）"""
+    try:
+        return path.read_bytes()
+    except OSError as e:
+        return e
+
+
+@lru_cache(maxsize=1)
+def _load_all_products(storage_dir: Path, signature: tuple):
+    """实际加载产品数据，signature 仅用作缓存 key"""
     products = {}
+    json_files = [storage_dir / name for name, _ in signature]
     
-    for json_file in storage_dir.glob("*.json"):
-        if json_file.name == "example.json":
-            continue
-        
+    # 文件读取释放 GIL，用线程池并行读取，解析在主线程完成
+    with ThreadPoolExecutor(max_workers=min(8, len(json_files) or 1)) as executor:
+        raw_files = list(executor.map(read_file_bytes, json_files))
+    
+    for json_file, raw in zip(json_files, raw_files):
         try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            if isinstance(raw, Exception):
+                raise raw
+            data = json.loads(raw)
             
             if len(data) < 2:
                 continue
@@ -104,10 +193,12 @@ def load_all_products():
             is_self = product_info.get("is_self", False)
             features = data[1].get("features", [])
             
+            # 分析只用到 tags，不保留 title/description 等大字段，
+            # 解析出的完整文档在本次循环结束后即可被回收
             products[product_name] = {
                 "name": product_name,
                 "is_self": is_self,
-                "features": features,
+                "tag_rows": flatten_feature_tags(features),
                 "feature_count": len(features)
             }
         except Exception as e:
@@ -116,93 +207,392 @@ def load_all_products():
     return products
 
 
+def flatten_feature_tags(features: list) -> list:
+    """
+    把功能列表展平成 (tag_name, subtag 名称元组) 行，每个功能的每个标签一行
+    加载时只做一次，之后的覆盖统计直接遍历这张平表
+    """
+    rows = []
+    for feature in features:
+        feature_tags = feature.get("tags", [])
+        if not isinstance(feature_tags, list):
+            continue
+        for tag in feature_tags:
+            tag_name = tag.get("name", "")
+            if tag_name:
+                subtag_names = tuple(s.get("name", "") for s in tag.get("subtags", []))
+                rows.append((tag_name, subtag_names))
+    return rows
+
+
 def analyze_tag_coverage(products: dict, tags: list):
-    """分析每个产品的标签覆盖情况（自动过滤 exclude_tags）"""
+    """
+    分析每个产品的标签覆盖情况（自动过滤 exclude_tags）
+    subtags 保持为 set，序列化时通过 json.dumps(default=sorted) 转为有序列表
+    """
     coverage = {}
     exclude_tags = load_exclude_tags()
+    # 排除列表同时用于过滤空名称的 subtag
+    exclude_subtags = exclude_tags | {""}
     
     for product_name, product_data in products.items():
-        product_tags = {}
+        counts = Counter()
+        subtags = defaultdict(set)
         
-        for feature in product_data["features"]:
-            feature_tags = feature.get("tags", [])
-            if not isinstance(feature_tags, list):
+        for tag_name, subtag_names in product_data["tag_rows"]:
+            # 跳过配置中排除的标签
+            if tag_name in exclude_tags:
                 continue
-            
-            for tag in feature_tags:
-                tag_name = tag.get("name", "")
-                if not tag_name:
-                    continue
-                
-                # 跳过配置中排除的标签
-                if tag_name in exclude_tags:
-                    continue
-                
-                if tag_name not in product_tags:
-                    product_tags[tag_name] = {
-                        "count": 0,
-                        "subtags": set()
-                    }
-                
-                product_tags[tag_name]["count"] += 1
-                
-                for subtag in tag.get("subtags", []):
-                    subtag_name = subtag.get("name", "")
-                    # 跳过配置中排除的 subtag
-                    if subtag_name and subtag_name not in exclude_tags:
-                        product_tags[tag_name]["subtags"].add(subtag_name)
-        
-        # 转换 set 为 list
-        for tag_name in product_tags:
-            product_tags[tag_name]["subtags"] = list(product_tags[tag_name]["subtags"])
+            counts[tag_name] += 1
+            subtags[tag_name].update(subtag_names)
         
-        coverage[product_name] = product_tags
+        # 排除的 subtag 按标签做一次集合差，而不是逐个判断
+        coverage[product_name] = {
+            tag_name: {"count": count, "subtags": subtags[tag_name] - exclude_subtags}
+            for tag_name, count in counts.items()
+        }
     
     return coverage
 
 
-def call_llm(prompt: str, config: dict, max_tokens: int = 2000) -> str:
-    """调用 LLM API"""
-    headers = {
+def build_headers(config: dict) -> dict:
+    """构建 Anthropic API 请求头"""
+    return {
         "Content-Type": "application/json",
         "x-api-key": config["api_key"],
         "anthropic-version": "2023-06-01"
     }
+
+
+def build_payload(prompt: str, config: dict, max_tokens: int, shared_context: str = "") -> dict:
+    """
+    构建 Messages API 请求体（同步调用与批处理共用）
+    shared_context 不为空时作为第一个内容块并标记 cache_control，
+    多次调用共用同一前缀时命中 prompt 缓存，只按约 10% 计费
+    """
+    if shared_context:
+        content = [
+            {"type": "text", "text": shared_context, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt}
+        ]
+    else:
+        content = prompt
     
-    payload = {
+    return {
         "model": config.get("model", "claude-3-sonnet-20240229"),
         "max_tokens": max_tokens,
         "messages": [
-            {"role": "user", "content": prompt}
+            {"role": "user", "content": content}
         ]
     }
+
+
+def get_llm_cache_dir() -> Path:
+    """LLM 结果磁盘缓存目录"""
+    return PROJECT_ROOT / ".cache" / "llm"
+
+
+def llm_cache_key(prompt: str, config: dict, max_tokens: int, shared_context: str = "") -> str:
+    """缓存键：模型 + 输出长度 + 共享上下文 + prompt 的 SHA-256"""
+    raw = f"{config.get('model', '')}\n{max_tokens}\n{shared_context}\n{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def read_llm_cache(key: str) -> str:
+    """读取缓存结果，未命中返回空字符串"""
+    try:
+        with open(get_llm_cache_dir() / f"{key}.json", "r", encoding="utf-8") as f:
+            return json.load(f).get("text", "")
+    except (OSError, ValueError):
+        return ""
+
+
+def write_llm_cache(key: str, text: str, config: dict, max_tokens: int):
+    """写入缓存结果（原子写入，避免并发写出半个文件）"""
+    cache_dir = get_llm_cache_dir()
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        save_json(cache_dir / f"{key}.json", {
+            "model": config.get("model", ""),
+            "max_tokens": max_tokens,
+            "text": text,
+            "created_at": datetime.now().isoformat()
+        })
+    except OSError as e:
+        print(f"  写入 LLM 缓存失败: {e}")
+
+
+def call_llm(prompt: str, config: dict, max_tokens: int = 2000, shared_context: str = "", stream: bool = False) -> str:
+    """
+    调用 LLM API（带缓存）
+    - 磁盘缓存命中时直接返回
+    - 并发线程提交相同 prompt 时只发一次请求，其余线程等待同一结果
+    - stream=True 时使用流式接口，边生成边打印（适合输出较长的 Matrix 概览）
+    """
+    key = llm_cache_key(prompt, config, max_tokens, shared_context)
+    if LLM_CACHE_ENABLED:
+        cached = read_llm_cache(key)
+        if cached:
+            return cached
+    
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[key] = future
+    
+    if not is_owner:
+        return future.result()
+    
+    text = ""
+    try:
+        fetch = request_llm_stream if stream else request_llm
+        text = fetch(prompt, config, max_tokens, shared_context)
+        if text and LLM_CACHE_ENABLED:
+            write_llm_cache(key, text, config, max_tokens)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        future.set_result(text)
+    
+    return text
+
+
+class RateLimiter:
+    """
+    请求前限流：每分钟请求数 (rpm) 和 token 数 (tpm) 两个令牌桶，按时间匀速补充
+    并发线程共用一个实例，桶空时调用方阻塞等待，避免一开始就把 API 打到 429
+    """
+    def __init__(self, rpm: int, tpm: int = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+    
+    def acquire(self, tokens: int = 0):
+        """取走 1 个请求额度和 tokens 个 token 额度，不足时等待"""
+        # 单次请求超过整个桶容量时按满桶计算，否则永远等不到
+        tokens = min(tokens, self.tpm) if self.tpm else 0
+        while True:
+            with self._lock:
+                self._refill()
+                request_ok = not self.rpm or self._requests >= 1
+                tokens_ok = self._tokens >= tokens
+                if request_ok and tokens_ok:
+                    if self.rpm:
+                        self._requests -= 1
+                    self._tokens -= tokens
+                    return
+                wait = 0.0
+                if not request_ok:
+                    wait = (1 - self._requests) * 60 / self.rpm
+                if not tokens_ok:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            time.sleep(wait)
+
+
+def get_rate_limiter(config: dict) -> RateLimiter:
+    """进程内共用的限流器（首次调用时按配置创建）"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(config.get("rpm", DEFAULT_RPM), config.get("tpm", DEFAULT_TPM))
+        return _rate_limiter
+
+
+def estimate_tokens(text: str, max_tokens: int) -> int:
+    """粗略估算一次请求消耗的 token 数（输入按 3 字符 1 token，加上输出上限）"""
+    return len(text) // 3 + max_tokens
+
+
+def get_retry_delay(response, attempt: int) -> float:
+    """
+    计算重试等待时间：优先使用服务端返回的 retry-after，
+    否则指数退避 2s, 4s, 8s ...（最长 60s，带随机抖动，避免并发请求同时重试）
+    """
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), RETRY_MAX_DELAY)
+        except ValueError:
+            pass
+    delay = min(RETRY_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def request_llm(prompt: str, config: dict, max_tokens: int = 2000, shared_context: str = "") -> str:
+    """调用 LLM API（直接请求，限流后发送，失败按 retry-after / 指数退避重试）"""
+    headers = build_headers(config)
+    payload = build_payload(prompt, config, max_tokens, shared_context)
+    limiter = get_rate_limiter(config)
     
     for attempt in range(MAX_RETRIES):
+        response = None
+        limiter.acquire(estimate_tokens(prompt, max_tokens))
         try:
-            response = requests.post(
+            response = _HTTP.post(
                 f"{config['base_url']}/v1/messages",
                 headers=headers,
                 json=payload,
-                timeout=120
+                timeout=HTTP_TIMEOUT
             )
             
             if response.status_code == 200:
                 result = response.json()
                 return result["content"][0]["text"]
-            else:
-                print(f"  API 返回错误: {response.status_code}")
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(RETRY_DELAY * (attempt + 1))
+            
+            print(f"  API 返回错误: {response.status_code}")
+            if response.status_code not in RETRYABLE_STATUS:
+                return ""
         except Exception as e:
             print(f"  请求失败: {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(RETRY_DELAY * (attempt + 1))
+        
+        if attempt < MAX_RETRIES - 1:
+            time.sleep(get_retry_delay(response, attempt))
+    
+    return ""
+
+
+def read_sse_text(response) -> str:
+    """
+    读取 Messages API 的 SSE 流，拼接 text_delta 并实时打印
+    按 UTF-8 自行解码（text/event-stream 没有 charset 时 requests 会按 ISO-8859-1 解码）
+    """
+    chunks = []
+    for raw_line in response.iter_lines():
+        line = raw_line.decode("utf-8") if isinstance(raw_line, bytes) else raw_line
+        if not line.startswith("data:"):
+            continue
+        event = json.loads(line[len("data:"):].strip())
+        event_type = event.get("type")
+        if event_type == "content_block_delta" and event["delta"].get("type") == "text_delta":
+            text = event["delta"]["text"]
+            chunks.append(text)
+            print(text, end="", flush=True)
+        elif event_type == "error":
+            raise RuntimeError(event.get("error", {}).get("message", "流式响应出错"))
+    print()
+    return "".join(chunks)
+
+
+def request_llm_stream(prompt: str, config: dict, max_tokens: int = 2000, shared_context: str = "") -> str:
+    """流式调用 LLM API（限流与重试策略同 request_llm，中途断开时整体重试）"""
+    headers = build_headers(config)
+    payload = build_payload(prompt, config, max_tokens, shared_context)
+    payload["stream"] = True
+    limiter = get_rate_limiter(config)
+    
+    for attempt in range(MAX_RETRIES):
+        response = None
+        limiter.acquire(estimate_tokens(prompt, max_tokens))
+        try:
+            with _HTTP.post(
+                f"{config['base_url']}/v1/messages",
+                headers=headers,
+                json=payload,
+                timeout=HTTP_TIMEOUT,
+                stream=True
+            ) as response:
+                if response.status_code == 200:
+                    return read_sse_text(response)
+                
+                print(f"  API 返回错误: {response.status_code}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    return ""
+        except Exception as e:
+            print(f"\n  流式请求失败: {e}")
+        
+        if attempt < MAX_RETRIES - 1:
+            time.sleep(get_retry_delay(response, attempt))
     
     return ""
 
 
+def call_llm_batch(jobs: dict, config: dict) -> dict:
+    """
+    通过 Message Batches API 一次性提交多个 prompt，轮询直到完成
+    
+    Args:
+        jobs: {custom_id: (prompt, max_tokens, shared_context)}，custom_id 只能包含字母、数字、- 和 _
+    
+    Returns:
+        {custom_id: text}，失败的请求不会出现在结果中
+    """
+    headers = build_headers(config)
+    batches_url = f"{config['base_url']}/v1/messages/batches"
+    
+    batch_requests = [
+        {"custom_id": custom_id, "params": build_payload(prompt, config, max_tokens, shared_context)}
+        for custom_id, (prompt, max_tokens, shared_context) in jobs.items()
+    ]
+    
+    try:
+        response = _HTTP.post(batches_url, headers=headers, json={"requests": batch_requests}, timeout=120)
+        response.raise_for_status()
+        batch = response.json()
+    except Exception as e:
+        print(f"  批处理提交失败: {e}")
+        return {}
+    
+    batch_id = batch["id"]
+    print(f"  批处理已提交: {batch_id}（{len(batch_requests)} 个请求）")
+    
+    # 轮询直到处理结束
+    deadline = time.time() + BATCH_TIMEOUT
+    while batch.get("processing_status") != "ended":
+        if time.time() > deadline:
+            print(f"  批处理超时: {batch_id}")
+            return {}
+        time.sleep(BATCH_POLL_INTERVAL)
+        try:
+            response = _HTTP.get(f"{batches_url}/{batch_id}", headers=headers, timeout=60)
+            response.raise_for_status()
+            batch = response.json()
+        except Exception as e:
+            print(f"  查询批处理状态失败: {e}")
+            continue
+        counts = batch.get("request_counts", {})
+        print(f"  批处理状态: {batch.get('processing_status')} {counts}")
+    
+    # 下载结果（JSONL，每行一个请求的结果）
+    try:
+        response = _HTTP.get(batch["results_url"], headers=headers, timeout=120)
+        response.raise_for_status()
+    except Exception as e:
+        print(f"  下载批处理结果失败: {e}")
+        return {}
+    
+    results = {}
+    for line in response.text.splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        result = item.get("result", {})
+        if result.get("type") == "succeeded":
+            results[item["custom_id"]] = result["message"]["content"][0]["text"]
+        else:
+            print(f"  请求 {item.get('custom_id')} 失败: {result.get('type')}")
+    
+    return results
+
+
 def analyze_competitor_focus(products: dict, coverage: dict) -> dict:
-    """分析每个竞品的产品重心和迭代方向"""
+    """
+    分析每个竞品的产品重心：功能数最多的 3 个领域
+    只返回领域名称，具体数字已在竞品数据中，不在 prompt 里重复
+    """
     competitor_analysis = {}
     
     for name, product in products.items():
@@ -223,38 +613,73 @@ def analyze_competitor_focus(products: dict, coverage: dict) -> dict:
         # 前3个是核心领域
         top_tags = sorted_tags[:3] if len(sorted_tags) >= 3 else sorted_tags
         
-        competitor_analysis[name] = {
+        competitor_analysis[name] = [tag for tag, _ in top_tags]
+    
+    return competitor_analysis
+
+
+def build_tag_index(tags: list) -> dict:
+    """
+    预先计算每个标签的 subtag 信息，供 Matrix 和各标签概览复用
+    返回: {tag_name: {"subtags": [subtag_name, ...], "total": subtag 数量（至少为 1）}}
+    """
+    tag_index = {}
+    for tag in tags:
+        tag_name = tag.get("name", "")
+        subtags = [s.get("name", "") for s in tag.get("subtags", [])]
+        tag_index[tag_name] = {
+            "subtags": subtags,
+            "total": len(subtags) if subtags else 1
+        }
+    return tag_index
+
+
+EMPTY_TAG_ENTRY = {"subtags": [], "total": 1}
+
+
+def compact_json(data) -> str:
+    """prompt 中嵌入的 JSON 使用紧凑格式（无缩进和多余空格），set 转为有序列表"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=sorted)
+
+
+def build_shared_context(products: dict, coverage: dict, tag_index: dict) -> str:
+    """
+    构建所有标签概览共用的上下文：标签体系 + 各产品在每个功能领域的覆盖数据
+    每次标签调用都以它开头，只有结尾的问题不同，从而命中 prompt 缓存
+    """
+    product_data = {}
+    for name, product in products.items():
+        product_data[name] = {
+            "is_self": product.get("is_self", False),
             "feature_count": product["feature_count"],
-            "top_focus": [
-                {
-                    "tag": tag,
-                    "count": data["count"],
+            "tags": {
+                tag_name: {
+                    "features": data["count"],
+                    "subtags_covered": len(data["subtags"]),
+                    "subtags_total": tag_index.get(tag_name, EMPTY_TAG_ENTRY)["total"],
                     "subtags": data["subtags"]
                 }
-                for tag, data in top_tags
-            ],
-            "total_tags": len(product_coverage)
+                for tag_name, data in coverage.get(name, {}).items()
+            }
         }
+    taxonomy = {tag_name: entry["subtags"] for tag_name, entry in tag_index.items()}
     
-    return competitor_analysis
+    return f"""以下是 YouWare（is_self 为 true）与各竞品的功能覆盖数据，后续问题都基于这些数据回答。
 
+## 功能领域体系（标签 -> 所有可能的子功能）：
+{compact_json(taxonomy)}
 
-def generate_matrix_overview(products: dict, coverage: dict, tags: list, config: dict) -> str:
-    """生成 Matrix 总体概览 - 深度业务分析版"""
-    print("生成 Matrix 总体概览（深度分析版）...")
-    
+## 各产品在每个功能领域的覆盖情况：
+{compact_json(product_data)}"""
+
+
+def build_matrix_prompt(products: dict, coverage: dict, tags: list) -> str:
+    """构建 Matrix 总体概览的 prompt（YouWare 数据缺失时返回空字符串）"""
     # 准备详细数据
     youware_data = None
-    competitor_data = []
+    competitor_data = {}
     
-    # 构建标签 -> subtag 数量的映射
-    tag_subtag_counts = {}
-    tag_subtag_names = {}
-    for tag in tags:
-        tag_name = tag.get("name", "")
-        subtags = tag.get("subtags", [])
-        tag_subtag_counts[tag_name] = len(subtags) if subtags else 1
-        tag_subtag_names[tag_name] = [s.get("name", "") for s in subtags]
+    tag_index = build_tag_index(tags)
     
     for name, product in products.items():
         tag_summary = coverage.get(name, {})
@@ -262,8 +687,8 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
         # 计算每个标签的覆盖率
         tag_details = {}
         for tag_name, tag_data in tag_summary.items():
-            total = tag_subtag_counts.get(tag_name, 1)
-            covered_subtags = tag_data.get("subtags", [])
+            total = tag_index.get(tag_name, EMPTY_TAG_ENTRY)["total"]
+            covered_subtags = tag_data.get("subtags", frozenset())
             tag_details[tag_name] = {
                 "covered": len(covered_subtags),
                 "total": total,
@@ -272,7 +697,6 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
             }
         
         summary = {
-            "name": name,
             "feature_count": product["feature_count"],
             "tag_count": len(tag_summary),
             "tag_details": tag_details
@@ -281,17 +705,17 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
         if product.get("is_self"):
             youware_data = summary
         else:
-            competitor_data.append(summary)
+            competitor_data[name] = summary
     
     if not youware_data:
-        return "YouWare 数据未找到"
+        return ""
     
     # 分析竞品重心
     competitor_focus = analyze_competitor_focus(products, coverage)
     
     # 找出 YouWare 缺失的标签和 subtag
     missing_analysis = {}
-    for comp in competitor_data:
+    for comp_name, comp in competitor_data.items():
         for tag_name, details in comp.get("tag_details", {}).items():
             if tag_name not in youware_data.get("tag_details", {}):
                 # YouWare 完全缺失这个标签
@@ -299,28 +723,22 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
                     missing_analysis[tag_name] = {
                         "type": "完全缺失",
                         "competitors_with": [],
-                        "subtags_missing": details.get("subtags", [])
+                        "subtags_missing": set(details["subtags"])
                     }
-                missing_analysis[tag_name]["competitors_with"].append(comp["name"])
+                missing_analysis[tag_name]["competitors_with"].append(comp_name)
             else:
                 # YouWare 有这个标签，但可能缺少 subtag
-                youware_subtags = set(youware_data["tag_details"][tag_name].get("subtags", []))
-                comp_subtags = set(details.get("subtags", []))
-                missing_subtags = comp_subtags - youware_subtags
+                missing_subtags = details["subtags"] - youware_data["tag_details"][tag_name]["subtags"]
                 
                 if missing_subtags:
                     if tag_name not in missing_analysis:
                         missing_analysis[tag_name] = {
                             "type": "部分缺失",
                             "competitors_with": [],
-                            "subtags_missing": []
+                            "subtags_missing": set()
                         }
-                    missing_analysis[tag_name]["competitors_with"].append(comp["name"])
-                    missing_analysis[tag_name]["subtags_missing"].extend(list(missing_subtags))
-    
-    # 去重 subtags_missing
-    for tag_name in missing_analysis:
-        missing_analysis[tag_name]["subtags_missing"] = list(set(missing_analysis[tag_name]["subtags_missing"]))
+                    missing_analysis[tag_name]["competitors_with"].append(comp_name)
+                    missing_analysis[tag_name]["subtags_missing"].update(missing_subtags)
     
     prompt = f"""你是一位资深的产品战略分析师，老板需要你撰写一份**深度竞品分析报告**，帮助理解 YouWare 在市场中的真实位置。
 
@@ -331,19 +749,18 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
 - 挖掘竞品的**产品思路和战略重点**，而不是单纯列功能数量
 - 用自然的中文段落，不要用 Markdown 格式
 
-## YouWare 数据：
-- 功能更新总数: {youware_data['feature_count']} 个
-- 覆盖功能领域: {youware_data['tag_count']} 个
-- 各领域详情: {json.dumps(youware_data['tag_details'], ensure_ascii=False)}
+## 数据说明：
+- youware / competitors 中 tag_details 的每一项：features=该领域功能数，covered/total=已覆盖/全部子功能数，subtags=已覆盖的子功能
+- competitor_focus：每个竞品功能数最多的 3 个领域
+- gaps：YouWare 缺失的领域（完全缺失）或缺失部分子功能（部分缺失），以及具备这些功能的竞品
 
-## 各竞品产品重心分析：
-{json.dumps(competitor_focus, ensure_ascii=False, indent=2)}
-
-## YouWare 功能差距详情：
-{json.dumps(missing_analysis, ensure_ascii=False, indent=2)}
-
-## 全部竞品数据：
-{json.dumps(competitor_data, ensure_ascii=False, indent=2)}
+## 数据：
+{compact_json({
+    "youware": youware_data,
+    "competitors": competitor_data,
+    "competitor_focus": competitor_focus,
+    "gaps": missing_analysis
+})}
 
 ---
 
@@ -365,19 +782,29 @@ def generate_matrix_overview(products: dict, coverage: dict, tags: list, config:
 
 请直接输出分析内容："""
     
-    result = call_llm(prompt, config, max_tokens=3000)
-    return result.strip() if result else "总结生成失败"
+    return prompt
 
 
-def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage: dict, config: dict) -> str:
-    """生成单个标签的概览 - 深度业务分析版"""
-    # 获取该标签的所有 subtag
-    all_subtags = [s.get("name", "") for s in tag_info.get("subtags", [])]
-    total_subtags = len(all_subtags) if all_subtags else 1
+def generate_matrix_overview(products: dict, coverage: dict, tags: list, config: dict) -> str:
+    """生成 Matrix 总体概览 - 深度业务分析版"""
+    print("生成 Matrix 总体概览（深度分析版）...")
+    
+    prompt = build_matrix_prompt(products, coverage, tags)
+    if not prompt:
+        return "YouWare 数据未找到"
+    
+    result = call_llm(prompt, config, max_tokens=MATRIX_MAX_TOKENS, stream=True)
+    return result.strip() if result else MATRIX_FAILED_TEXT
+
+
+def build_tag_prompt(tag_name: str, tag_entry: dict, products: dict, coverage: dict) -> str:
+    """构建单个标签概览的 prompt（没有任何产品覆盖该标签时返回空字符串）"""
+    # 该标签的 subtag 总数（由 build_tag_index 预先计算）
+    total_subtags = tag_entry["total"]
     
     # 收集该标签下各产品的情况
     tag_data = {}
-    youware_subtags = []
+    youware_subtags = frozenset()
     youware_feature_count = 0
     competitor_subtags = {}
     competitor_features = {}
@@ -393,8 +820,7 @@ def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage
                 "is_self": product.get("is_self", False),
                 "feature_count": feature_count,
                 "subtags_covered": len(subtags),
-                "subtags_total": total_subtags,
-                "subtags": subtags
+                "subtags_total": total_subtags
             }
             
             if product.get("is_self"):
@@ -413,16 +839,8 @@ def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage
     # 检查 YouWare 是否有这个标签
     youware_has_tag = any(v.get("is_self") for v in tag_data.values())
     
-    # 找出 YouWare 缺失但竞品有的 subtag
-    missing_subtags = set()
-    if youware_has_tag:
-        youware_set = set(youware_subtags)
-        for comp_name, comp_subtags in competitor_subtags.items():
-            missing_subtags.update(set(comp_subtags) - youware_set)
-    else:
-        # YouWare 完全没有这个标签，收集所有竞品的 subtag
-        for comp_subtags in competitor_subtags.values():
-            missing_subtags.update(comp_subtags)
+    # 找出 YouWare 缺失但竞品有的 subtag（YouWare 没有该标签时即所有竞品 subtag）
+    missing_subtags = frozenset().union(*competitor_subtags.values()) - youware_subtags
     
     # 计算差距程度
     gap_description = ""
@@ -440,7 +858,13 @@ def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage
         else:
             gap_description = "完全缺失"
     
-    prompt = f"""分析 "{tag_name}" 功能领域下 YouWare 与竞品的对比情况。
+    # 各产品详情已在共享上下文中，这里只列出简要数字
+    product_lines = "\n".join(
+        f"- {name}: {data['feature_count']} 个功能，覆盖 {data['subtags_covered']}/{data['subtags_total']} 个子功能"
+        for name, data in tag_data.items()
+    )
+    
+    prompt = f"""基于上文数据，分析 "{tag_name}" 功能领域下 YouWare 与竞品的对比情况。
 
 ⚠️ 要求：只分析现状，**不要给任何建议**。用简洁的中文，不要用 Markdown。
 
@@ -450,14 +874,11 @@ def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage
 - 领先竞品: {leader_name} ({leader_count}个功能)
 - 差距程度: {gap_description}
 
-## 各产品详情：
-{json.dumps(tag_data, ensure_ascii=False, indent=2)}
-
-## 该领域所有可能的子功能：
-{', '.join(all_subtags) if all_subtags else '无子分类'}
+## 各产品情况（子功能明细见上文）：
+{product_lines}
 
 ## YouWare 缺失的子功能：
-{', '.join(missing_subtags) if missing_subtags else '无缺失'}
+{', '.join(sorted(missing_subtags)) if missing_subtags else '无缺失'}
 
 请输出 3-5 句话的分析：
 1. YouWare 在此领域的位置（领先/持平/落后/缺失）
@@ -467,12 +888,135 @@ def generate_tag_summary(tag_name: str, tag_info: dict, products: dict, coverage
 {"特别注意：YouWare 在此领域完全缺失，需分析这意味着什么。" if not youware_has_tag else ""}
 {"如果 YouWare 在此领域表现较好，客观说明优势。" if gap_description == "基本持平或领先" else ""}"""
     
-    result = call_llm(prompt, config, max_tokens=600)
+    return prompt
+
+
+def generate_tag_summary(tag_name: str, tag_entry: dict, products: dict, coverage: dict, shared_context: str, config: dict) -> str:
+    """生成单个标签的概览 - 深度业务分析版"""
+    prompt = build_tag_prompt(tag_name, tag_entry, products, coverage)
+    if not prompt:
+        return ""
+    
+    result = call_llm(prompt, config, max_tokens=TAG_MAX_TOKENS, shared_context=shared_context)
     return result.strip() if result else ""
 
 
-def generate_all_summaries():
-    """生成所有总结 - 深度业务分析版"""
+def generate_tag_summaries(tag_list: list, tag_index: dict, products: dict, coverage: dict, shared_context: str, config: dict) -> dict:
+    """并发生成每个标签的概览（LLM 调用为 I/O 密集，线程池即可并行）"""
+    total_tags = len(tag_list)
+    max_workers = max(1, min(config.get("max_concurrency", MAX_CONCURRENCY), total_tags or 1))
+    print(f"\n并发生成 {total_tags} 个功能领域概览（并发数 {max_workers}）...")
+    
+    results = {}
+    current = 0
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # 先单独生成第一个标签，把共享上下文写入 prompt 缓存，其余标签再并发提交以命中缓存
+        # 每个任务在复制的当前上下文中运行：API 服务按 ContextVar 捕获任务输出，工作线程打印的错误也写入任务日志
+        for group in (tag_list[:1], tag_list[1:]):
+            futures = {
+                executor.submit(contextvars.copy_context().run, generate_tag_summary, tag["name"], tag_index[tag["name"]], products, coverage, shared_context, config): tag["name"]
+                for tag in group
+            }
+            for future in as_completed(futures):
+                current += 1
+                tag_name = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    print(f"\n[{current}/{total_tags}] {tag_name} 分析失败: {e}")
+                    continue
+                print(f"\n[{current}/{total_tags}] {tag_name} 领域分析完成")
+                if summary:
+                    results[tag_name] = summary
+                    # 只显示前80个字符
+                    preview = summary.replace('\n', ' ')[:80]
+                    print(f"    → {preview}...")
+    
+    # 按标签体系顺序输出
+    return {tag["name"]: results[tag["name"]] for tag in tag_list if tag["name"] in results}
+
+
+def generate_summaries_batch(products: dict, coverage: dict, tags: list, tag_list: list, tag_index: dict,
+                             shared_context: str, config: dict, include_matrix: bool = True) -> tuple:
+    """
+    通过 Message Batches API 一次性生成 Matrix 概览和 tag_list 中的标签概览
+    返回: (matrix_overview, tag_summaries)，include_matrix 为 False 时 matrix_overview 为 None
+    """
+    print("\n通过 Message Batches API 提交所有分析请求...")
+    
+    jobs = {}
+    matrix_prompt = build_matrix_prompt(products, coverage, tags) if include_matrix else ""
+    if matrix_prompt:
+        jobs["matrix"] = (matrix_prompt, MATRIX_MAX_TOKENS, "")
+    
+    # 标签名可能包含空格和 "/"，custom_id 使用序号
+    tag_ids = {}
+    for i, tag in enumerate(tag_list):
+        prompt = build_tag_prompt(tag["name"], tag_index[tag["name"]], products, coverage)
+        if prompt:
+            custom_id = f"tag-{i}"
+            tag_ids[custom_id] = tag["name"]
+            jobs[custom_id] = (prompt, TAG_MAX_TOKENS, shared_context)
+    
+    results = call_llm_batch(jobs, config) if jobs else {}
+    
+    if not include_matrix:
+        matrix_overview = None
+    elif not matrix_prompt:
+        matrix_overview = "YouWare 数据未找到"
+    else:
+        matrix_overview = results.get("matrix", "").strip() or MATRIX_FAILED_TEXT
+    
+    tag_summaries = {}
+    for custom_id, tag_name in tag_ids.items():
+        summary = results.get(custom_id, "").strip()
+        if summary:
+            tag_summaries[tag_name] = summary
+    
+    return matrix_overview, tag_summaries
+
+
+def input_hash(data) -> str:
+    """对分析输入做稳定的 SHA-256 指纹（键排序，set 转为有序列表）"""
+    raw = json.dumps(data, ensure_ascii=False, sort_keys=True, default=sorted)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def tag_input_hash(tag_name: str, tag_entry: dict, products: dict, coverage: dict, config: dict) -> str:
+    """
+    单个标签概览的输入指纹：模型、该标签的 prompt 以及各产品在该标签下的覆盖明细
+    其他标签或产品其他部分的变化不会影响它
+    """
+    return input_hash({
+        "model": config.get("model", ""),
+        "max_tokens": TAG_MAX_TOKENS,
+        "prompt": build_tag_prompt(tag_name, tag_entry, products, coverage),
+        "subtags": tag_entry["subtags"],
+        "coverage": {
+            name: coverage[name][tag_name]
+            for name in products
+            if tag_name in coverage.get(name, {})
+        }
+    })
+
+
+def load_previous_summary() -> dict:
+    """读取上一次生成的 summary.json，不存在或损坏时返回空字典"""
+    summary_path = INFO_DIR / "summary.json"
+    try:
+        with open(summary_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def generate_all_summaries(use_batch: bool = False):
+    """
+    生成所有总结 - 深度业务分析版
+    
+    Args:
+        use_batch: 使用 Message Batches API 提交（费用减半，但需等待批处理完成）
+    """
     print("=" * 60)
     print("AI 深度竞品分析报告生成")
     print("=" * 60)
@@ -504,42 +1048,79 @@ def generate_all_summaries():
     print("正在生成深度分析报告（预计需要 2-3 分钟）...")
     print("=" * 60)
     
-    # 生成 Matrix 概览（传递 tags 用于计算 subtag 总数）
-    matrix_overview = generate_matrix_overview(products, coverage, tags, config)
+    tag_list = [t for t in tags if t.get("name")]
+    tag_index = build_tag_index(tag_list)
+    shared_context = build_shared_context(products, coverage, tag_index)
+    
+    # 增量更新：输入指纹与上次相同的概览直接复用，只为有变化的部分调用 LLM
+    previous = load_previous_summary() if LLM_CACHE_ENABLED else {}
+    previous_hashes = previous.get("input_hashes", {})
+    previous_tag_summaries = previous.get("tag_summaries", {})
+    
+    matrix_hash = input_hash({
+        "model": config.get("model", ""),
+        "max_tokens": MATRIX_MAX_TOKENS,
+        "prompt": build_matrix_prompt(products, coverage, tags)
+    })
+    tag_hashes = {
+        tag["name"]: tag_input_hash(tag["name"], tag_index[tag["name"]], products, coverage, config)
+        for tag in tag_list
+    }
+    
+    reuse_matrix = bool(previous.get("matrix_overview")) and previous_hashes.get("matrix_overview") == matrix_hash
+    stale_tags = [
+        tag for tag in tag_list
+        if tag["name"] not in previous_tag_summaries
+        or previous_hashes.get("tag_summaries", {}).get(tag["name"]) != tag_hashes[tag["name"]]
+    ]
+    stale_names = {tag["name"] for tag in stale_tags}
+    print(f"\n增量更新: Matrix {'复用上次结果' if reuse_matrix else '需要重新生成'}，"
+          f"{len(tag_list) - len(stale_tags)} 个领域复用，{len(stale_tags)} 个领域需要重新生成")
+    
+    matrix_overview = previous["matrix_overview"] if reuse_matrix else None
+    new_tag_summaries = {}
+    if use_batch:
+        if stale_tags or not reuse_matrix:
+            batch_matrix, new_tag_summaries = generate_summaries_batch(
+                products, coverage, tags, stale_tags, tag_index, shared_context, config,
+                include_matrix=not reuse_matrix
+            )
+            matrix_overview = matrix_overview or batch_matrix
+    else:
+        if not reuse_matrix:
+            # 生成 Matrix 概览（传递 tags 用于计算 subtag 总数）
+            matrix_overview = generate_matrix_overview(products, coverage, tags, config)
+        if stale_tags:
+            new_tag_summaries = generate_tag_summaries(stale_tags, tag_index, products, coverage, shared_context, config)
+    
+    # 按标签体系顺序合并复用的和新生成的概览
+    tag_summaries = {}
+    for tag in tag_list:
+        tag_name = tag["name"]
+        if tag_name in new_tag_summaries:
+            tag_summaries[tag_name] = new_tag_summaries[tag_name]
+        elif tag_name not in stale_names:
+            tag_summaries[tag_name] = previous_tag_summaries[tag_name]
+    
     print(f"\n✓ Matrix 总体分析完成，共 {len(matrix_overview)} 字符")
     print("-" * 40)
     print(matrix_overview[:500] + "..." if len(matrix_overview) > 500 else matrix_overview)
     print("-" * 40)
     
-    # 生成每个标签的概览
-    tag_summaries = {}
-    total_tags = len([t for t in tags if t.get("name")])
-    current = 0
-    
-    for tag in tags:
-        tag_name = tag.get("name", "")
-        if not tag_name:
-            continue
-        
-        current += 1
-        print(f"\n[{current}/{total_tags}] 分析 {tag_name} 领域...")
-        summary = generate_tag_summary(tag_name, tag, products, coverage, config)
-        if summary:
-            tag_summaries[tag_name] = summary
-            # 只显示前80个字符
-            preview = summary.replace('\n', ' ')[:80]
-            print(f"    → {preview}...")
-    
-    # 保存结果
+    # 保存结果（input_hashes 只记录成功生成的部分，失败的下次会重新生成）
     result = {
         "last_updated": datetime.now().isoformat(),
         "matrix_overview": matrix_overview,
-        "tag_summaries": tag_summaries
+        "tag_summaries": tag_summaries,
+        "input_hashes": {
+            "matrix_overview": matrix_hash if matrix_overview != MATRIX_FAILED_TEXT else "",
+            "tag_summaries": {tag_name: tag_hashes[tag_name] for tag_name in tag_summaries}
+        }
     }
     
-    summary_path = get_project_root() / "info" / "summary.json"
-    with open(summary_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=4)
+    summary_path = INFO_DIR / "summary.json"
+    # 原子写入：前端和 API 服务随时可能读取 summary.json
+    save_json(summary_path, result)
     
     print("\n" + "=" * 60)
     print(f"✅ 分析报告已保存: {summary_path}")
@@ -564,9 +1145,23 @@ def main():
         action="store_true",
         help="只生成 Matrix 概览"
     )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="使用 Message Batches API 批量生成全部总结（费用减半，适合定时任务）"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="不读写 .cache/llm 结果缓存，强制重新调用 LLM"
+    )
     
     args = parser.parse_args()
     
+    if args.no_cache:
+        global LLM_CACHE_ENABLED
+        LLM_CACHE_ENABLED = False
+    
     if args.tag:
         # 只生成指定标签
         config = load_config()
@@ -575,8 +1170,10 @@ def main():
         coverage = analyze_tag_coverage(products, tags)
         
         # 找到对应的 tag 信息
-        tag_info = next((t for t in tags if t.get("name") == args.tag), {})
-        summary = generate_tag_summary(args.tag, tag_info, products, coverage, config)
+        tag_index = build_tag_index([t for t in tags if t.get("name")])
+        shared_context = build_shared_context(products, coverage, tag_index)
+        tag_entry = tag_index.get(args.tag, EMPTY_TAG_ENTRY)
+        summary = generate_tag_summary(args.tag, tag_entry, products, coverage, shared_context, config)
         print(f"{args.tag}: {summary}")
     elif args.matrix_only:
         # 只生成 Matrix 概览
@@ -589,7 +1186,7 @@ def main():
         print(f"Matrix 概览:\n{overview}")
     else:
         # 生成所有
-        generate_all_summaries()
+        generate_all_summaries(use_batch=args.batch)
 
 
 if __name__ == "__main__":
@@ -4,18 +4,40 @@ API 服务器
 提供 Admin 管理、增量更新和 AI 总结的触发接口
 """
 
+import contextvars
+import gzip
+import io
 import json
-import subprocess
 import sys
 import threading
+import time
+import traceback
 import secrets
+import sqlite3
 import hashlib
-from datetime import datetime, timedelta
+import hmac
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
+from functools import lru_cache, partial
 from pathlib import Path
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 from urllib.parse import parse_qs, urlparse
 
+# 同目录下的脚本直接作为模块调用，避免每次触发都启动新的 Python 解释器，
+# 也能在多次运行之间复用连接池和缓存
+SCRIPT_DIR = Path(__file__).resolve().parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPT_DIR))
 
+import ai_summary
+import json_io
+import llm_tagger
+import monitor
+import parse_changelog
+
+
+@lru_cache(maxsize=1)
 def get_project_root():
     """
     获取项目根目录
@@ -30,23 +52,92 @@ def get_project_root():
     return script_dir.parent
 
 
-# Session 存储 (简单内存存储，重启后失效)
-sessions = {}
+# 项目路径（模块加载时计算一次）
+PROJECT_ROOT = get_project_root()
+STORAGE_DIR = PROJECT_ROOT / "storage"
+INFO_DIR = PROJECT_ROOT / "info"
+LOGS_DIR = PROJECT_ROOT / "logs"
+TAG_FILE = INFO_DIR / "tag.json"
+RUN_STATUS_FILE = INFO_DIR / "run_status.json"
+ADMIN_CONFIG_FILE = INFO_DIR / "admin_config.json"
+CHANGELOG_RAW_FILE = STORAGE_DIR / "youware_changelog_raw.txt"
+
+# 所有产品及其数据文件
+PRODUCTS = ('youware', 'base44', 'bolt', 'lovable', 'replit', 'rocket', 'trickle', 'v0')
+PRODUCT_FILES = {product: STORAGE_DIR / f"{product}.json" for product in PRODUCTS}
+
+
+def get_product_file(product) -> Path:
+    """产品数据文件路径，已知产品直接使用预先计算好的路径"""
+    if isinstance(product, str) and product in PRODUCT_FILES:
+        return PRODUCT_FILES[product]
+    return STORAGE_DIR / f"{product}.json"
+
+
+# Session 存储：保存在 .cache/sessions.db（SQLite），服务重启后无需重新登录，多个进程也能共享
+# 表结构：token -> 过期时间（Unix 时间戳，秒）
+SESSION_DB_PATH = PROJECT_ROOT / ".cache" / "sessions.db"
+SESSION_TTL = 24 * 3600  # 秒
+MAX_SESSIONS = 10000
+_session_db = None
+sessions_lock = threading.RLock()
 
 # 任务运行状态
 running_tasks = {
     "crawl": False,
     "summary": False
 }
+# 请求由多线程并发处理，检查并标记任务状态需要加锁
+running_tasks_lock = threading.Lock()
+
+# 后台任务线程池：复用工作线程，不再每次触发都新建线程，同时限制同时运行的后台任务数
+TASK_WORKERS = 4
+task_executor = ThreadPoolExecutor(max_workers=TASK_WORKERS, thread_name_prefix="task")
+
+
+def claim_task(task_type: str) -> bool:
+    """原子地检查并标记任务为运行中，已在运行时返回 False"""
+    with running_tasks_lock:
+        if running_tasks.get(task_type):
+            return False
+        running_tasks[task_type] = True
+        return True
+
+
+def release_task(task_type: str):
+    """任务结束后清除运行标记"""
+    with running_tasks_lock:
+        running_tasks[task_type] = False
 
 
 def load_admin_config():
     """加载管理员配置"""
-    config_path = get_project_root() / "info" / "admin_config.json"
-    if config_path.exists():
+    config_path = ADMIN_CONFIG_FILE
+    try:
         with open(config_path, 'r', encoding='utf-8') as f:
             return json.load(f)
-    return {"password": "admin", "session_secret": "default_secret"}
+    except FileNotFoundError:
+        return {"password": "admin", "session_secret": "default_secret"}
+
+
+def get_session_db() -> sqlite3.Connection:
+    """打开（首次调用时创建）session 数据库，调用方需持有 sessions_lock"""
+    global _session_db
+    if _session_db is None:
+        try:
+            SESSION_DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(SESSION_DB_PATH), check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+        except (sqlite3.Error, OSError) as e:
+            # 目录无法创建或不可写等情况退回内存数据库，只是重启后 session 失效
+            print(f"无法打开 session 数据库，改用内存存储: {e}")
+            conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, expires REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+        _session_db = conn
+    return _session_db
 
 
 def verify_session(token: str) -> bool:
@@ -54,174 +145,717 @@ def verify_session(token: str) -> bool:
     if not token:
         return False
     
-    session = sessions.get(token)
-    if not session:
-        return False
-    
-    # 检查是否过期 (24小时)
-    if datetime.now() > session.get('expires', datetime.min):
-        del sessions[token]
-        return False
-    
-    return True
+    with sessions_lock:
+        row = get_session_db().execute(
+            "SELECT 1 FROM sessions WHERE token = ? AND expires > ?", (token, time.time())
+        ).fetchone()
+    return row is not None
+
+
+def purge_expired_sessions():
+    """清理已过期的 session"""
+    with sessions_lock:
+        get_session_db().execute("DELETE FROM sessions WHERE expires <= ?", (time.time(),))
 
 
 def create_session() -> str:
     """创建新的 session"""
     token = secrets.token_hex(32)
-    sessions[token] = {
-        'created': datetime.now(),
-        'expires': datetime.now() + timedelta(hours=24)
-    }
+    with sessions_lock:
+        db = get_session_db()
+        purge_expired_sessions()
+        db.execute("INSERT INTO sessions (token, expires) VALUES (?, ?)", (token, time.time() + SESSION_TTL))
+        # 超出上限时淘汰最早的 session
+        db.execute(
+            "DELETE FROM sessions WHERE token IN "
+            "(SELECT token FROM sessions ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (MAX_SESSIONS,)
+        )
     return token
 
 
-def save_run_status(crawl_time=None, summary_time=None):
-    """保存运行状态"""
-    status_path = get_project_root() / "info" / "run_status.json"
+def delete_session(token: str):
+    """删除 session（登出）"""
+    if token:
+        with sessions_lock:
+            get_session_db().execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+
+def check_password(password: str, expected: str) -> bool:
+    """
+    常量时间比较密码，避免逐字符比较带来的时间侧信道
+    先各自取 sha256 再比较，长度不同时 compare_digest 会提前返回，摘要定长则不泄露密码长度
+    """
+    password_digest = hashlib.sha256(str(password).encode("utf-8")).digest()
+    expected_digest = hashlib.sha256(str(expected).encode("utf-8")).digest()
+    return hmac.compare_digest(password_digest, expected_digest)
+
+
+# 响应编码器：复用同一个实例（json.dumps 带非默认参数时每次都会新建编码器），
+# 紧凑分隔符减小响应体积；响应数据都是新构建的普通 dict/list，不需要循环引用检查
+_response_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False)
+
+# 响应压缩：超过该字节数且客户端接受 gzip 时压缩；级别 1 速度最快，压缩率已足够
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 1
+
+# 请求体上限：管理后台最大的请求是整份 changelog 原文（几十 KB），超过上限直接拒绝，不读入内存
+MAX_REQUEST_BODY = 5 * 1024 * 1024
+
+# JSON 文件解析缓存：{路径: ((mtime_ns, size), data)}，文件未变化时直接复用解析结果
+# 缓存中的数据是共享的，只能读不能改；需要修改的接口自行读取新副本，保存后由 save_json 更新缓存
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+
+def _file_signature(path: Path) -> tuple:
+    stat = path.stat()
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_json_cached(path: Path):
+    """读取 JSON 文件，文件 mtime 和大小未变时返回缓存的解析结果（返回值只读）"""
+    signature = _file_signature(path)
+    with _json_cache_lock:
+        entry = _json_cache.get(path)
+    if entry and entry[0] == signature:
+        return entry[1]
     
-    # 读取现有状态
-    status = {}
-    if status_path.exists():
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    with _json_cache_lock:
+        _json_cache[path] = (signature, data)
+    return data
+
+
+FEATURE_ENTRY_POS = 1  # feature 条目在产品文件中的固定位置
+
+
+def get_feature_list(product_data: list):
+    """
+    取出产品文件中 name 为 feature 的条目下的功能列表，不存在时返回 None
+    产品文件固定为 [产品信息, feature 条目]（爬虫与其他脚本都按 data[1] 读取），先直接检查该位置
+    """
+    if len(product_data) > FEATURE_ENTRY_POS and product_data[FEATURE_ENTRY_POS].get('name') == 'feature':
+        return product_data[FEATURE_ENTRY_POS].get('features')
+    for item in product_data:
+        if item.get('name') == 'feature':
+            return item.get('features')
+    return None
+
+
+def get_indexed_tag(features: list, feature_index: int, tag_pos: int):
+    """按倒排索引记录的位置取出一级标签，位置已失效（文件在索引后被改动）时返回 None"""
+    if feature_index >= len(features):
+        return None
+    tags = features[feature_index].get('tags')
+    if not isinstance(tags, list) or tag_pos >= len(tags) or not isinstance(tags[tag_pos], dict):
+        return None
+    return tags[tag_pos]
+
+
+def find_feature(product_data: list, feature_index):
+    """按下标取出功能条目，产品没有功能列表或下标越界时返回 None"""
+    features = get_feature_list(product_data)
+    if features is None or not isinstance(feature_index, int) or not 0 <= feature_index < len(features):
+        return None
+    return features[feature_index]
+
+
+# 产品索引缓存：{路径: ((mtime_ns, size), index)}，与解析缓存一样随文件变化失效
+_product_index_cache = {}
+
+
+def build_product_index(product: str, data: list) -> dict:
+    """
+    遍历一次产品功能列表，生成管理后台各列表接口需要的数据：
+    - others: 标签中含 Others 的功能（/api/admin/others）
+    - untagged: 未打标或已标记无需打标的功能（/api/admin/untagged）
+    - used_subtags: 用到的所有二级标签（/api/admin/used-subtags）
+    - primary_postings: 一级标签名 -> 用到该标签的功能下标（倒排索引，标签重命名时只处理这些功能）
+    - subtag_postings: 二级标签名 -> (功能下标, 所在一级标签在 tags 中的位置)
+    - search_texts: 每个功能小写后的 (标题, 描述)，/api/admin/features 搜索时不必每次重新转换
+    """
+    others = []
+    untagged = []
+    used_subtags = set()
+    primary_postings = {}
+    subtag_postings = {}
+    search_texts = []
+    
+    features = get_feature_list(data) or []
+    
+    for idx, feature in enumerate(features):
+        search_texts.append((
+            str(feature.get('title') or '').lower(),
+            str(feature.get('description') or '').lower()
+        ))
+        tags = feature.get('tags')
+        item = {
+            'product': product,
+            'feature_index': idx,
+            'title': feature.get('title', ''),
+            'description': feature.get('description', ''),
+            'time': feature.get('time', '')
+        }
+        
+        # 未打标: tags 不存在、为 None、为空数组
+        # 无需打标: tags == "None" (字符串)
+        if tags is None or (isinstance(tags, list) and len(tags) == 0):
+            untagged.append({**item, 'status': 'untagged'})
+            continue
+        if tags == "None":
+            untagged.append({**item, 'status': 'none'})
+            continue
+        if not isinstance(tags, list):
+            continue
+        
+        others_added = False
+        for pos, tag in enumerate(tags):
+            # 确保 tag 是字典
+            if not isinstance(tag, dict):
+                continue
+            if tag.get('name'):
+                primary_postings.setdefault(tag.get('name'), []).append(idx)
+            subtags = tag.get('subtags', [])
+            for subtag in subtags:
+                if isinstance(subtag, dict) and subtag.get('name'):
+                    used_subtags.add(subtag.get('name'))
+                    subtag_postings.setdefault(subtag.get('name'), []).append((idx, pos))
+            if tag.get('name') == 'Others' and not others_added:
+                others.append({
+                    **item,
+                    'current_subtags': [st.get('name') for st in subtags if isinstance(st, dict)]
+                })
+                others_added = True
+    
+    return {
+        "others": others,
+        "untagged": untagged,
+        "used_subtags": frozenset(used_subtags),
+        "primary_postings": primary_postings,
+        "subtag_postings": subtag_postings,
+        "search_texts": search_texts
+    }
+
+
+def load_product_index(product: str, product_file: Path) -> dict:
+    """读取产品文件的预计算索引，文件未变化时直接返回缓存（返回值只读）"""
+    signature = _file_signature(product_file)
+    with _json_cache_lock:
+        entry = _product_index_cache.get(product_file)
+    if entry and entry[0] == signature:
+        return entry[1]
+    
+    index = build_product_index(product, load_json_cached(product_file))
+    with _json_cache_lock:
+        _product_index_cache[product_file] = (signature, index)
+    return index
+
+
+def iter_product_indexes():
+    """依次返回所有产品的预计算索引，产品文件不存在的跳过"""
+    for product, product_file in PRODUCT_FILES.items():
         try:
-            with open(status_path, "r") as f:
-                status = json.load(f)
-        except:
-            pass
+            yield load_product_index(product, product_file)
+        except FileNotFoundError:
+            continue
+
+
+def save_json(path: Path, data, indent: int = 4):
+    """
+    原子地保存 JSON 文件（json_io.save_json），
+    写入后用刚保存的数据更新解析缓存，下次读取无需重新解析
+    """
+    json_io.save_json(path, data, indent)
+    with _json_cache_lock:
+        _json_cache[path] = (_file_signature(path), data)
+
+
+# 单文件修改的合并写入：同一文件的修改排队，持有文件锁的线程一次性应用队列中的全部修改并只写一次
+# （后台连续打标/编辑时多个请求同时到达，只需解析和写入一次；各请求仍在数据落盘后才返回）
+_file_write_queues = {}
+_file_write_queue_lock = threading.Lock()
+
+
+def get_file_lock(path: Path) -> threading.Lock:
+    """
+    取得文件的写锁：对同一文件的“读取-修改-写回”必须持有该锁，
+    update_json_file 内部也使用同一把锁，直接调用 save_json 的地方要自行加锁
+    （与在本进程中运行的 monitor、llm_tagger 共用 json_io 中的锁）
+    """
+    return json_io.get_file_lock(path)
+
+
+def lock_files(paths) -> ExitStack:
+    """按固定顺序取得多个文件的写锁（跨文件修改时使用，顺序固定避免互相等待死锁）"""
+    stack = ExitStack()
+    try:
+        for path in sorted(set(paths)):
+            stack.enter_context(get_file_lock(path))
+    except BaseException:
+        stack.close()
+        raise
+    return stack
+
+
+def update_json_file(path: Path, mutate):
+    """
+    读取 JSON 文件，调用 mutate(data) 修改后保存，返回 mutate 的返回值
+    mutate 返回 None 表示未做修改（如找不到指定的 feature）；一批修改都未改动时不写文件
+    文件不存在时抛出 FileNotFoundError
+    """
+    job = {"mutate": mutate, "done": False}
+    with _file_write_queue_lock:
+        _file_write_queues.setdefault(path, []).append(job)
     
-    # 更新状态
-    if crawl_time:
-        status["crawl_last_run"] = crawl_time
-    if summary_time:
-        status["summary_last_run"] = summary_time
+    with get_file_lock(path):
+        # 前一个持锁线程可能已经顺带处理了本次修改
+        if not job["done"]:
+            with _file_write_queue_lock:
+                jobs = _file_write_queues.pop(path)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                modified = False
+                for j in jobs:
+                    try:
+                        j["result"] = j["mutate"](data)
+                        modified = modified or j["result"] is not None
+                    except Exception as e:
+                        j["error"] = e
+                if modified:
+                    save_json(path, data)
+            except Exception as e:
+                for j in jobs:
+                    j.setdefault("error", e)
+            for j in jobs:
+                j["done"] = True
     
-    # 保存
-    with open(status_path, "w") as f:
-        json.dump(status, f, indent=2)
+    if "error" in job:
+        raise job["error"]
+    return job["result"]
 
 
-def run_script_async(script_name: str, task_type: str = None, callback=None):
-    """异步运行脚本，并记录详细日志"""
-    def run():
-        global running_tasks
-        if task_type:
-            running_tasks[task_type] = True
-        
-        root = get_project_root()
-        logs_dir = root / "logs"
-        logs_dir.mkdir(exist_ok=True)
+RENAME_WORKERS = 4  # 标签重命名时并行处理产品文件的线程数
+
+
+def rename_tag_in_tag_data(tags_data: dict, old_name: str, new_name: str, tag_type: str) -> bool:
+    """在 tag.json 数据中重命名/合并标签（直接修改 tags_data），返回是否为合并操作"""
+    if tag_type == 'primary':
+        # 按名称索引一级标签，同名时保留第一个（与按顺序查找的结果一致）
+        primary_by_name = {}
+        for p_tag in tags_data.get('primary_tags', []):
+            primary_by_name.setdefault(p_tag.get('name'), p_tag)
         
-        # Docker 中脚本在 /app 下，本地在 script/ 下
-        if root == Path("/app"):
-            script_path = root / script_name
+        # 检查 new_name 是否已存在（合并操作）
+        is_merge = new_name in primary_by_name
+    
+        if is_merge:
+            # 合并：找到旧标签和新标签
+            old_tag = primary_by_name.get(old_name)
+            new_tag = primary_by_name[new_name]
+    
+            if old_tag and new_tag:
+                # 将旧标签的 subtags 合并到新标签
+                existing_subtag_names = {s.get('name') for s in new_tag.get('subtags', [])}
+                for subtag in old_tag.get('subtags', []):
+                    if subtag.get('name') not in existing_subtag_names:
+                        new_tag.setdefault('subtags', []).append(subtag)
+    
+                # 删除旧标签
+                tags_data['primary_tags'] = [p for p in tags_data['primary_tags'] if p.get('name') != old_name]
+    
+                # 更新 subtag_to_primary 映射
+                for subtag, primary in list(tags_data.get('subtag_to_primary', {}).items()):
+                    if primary == old_name:
+                        tags_data['subtag_to_primary'][subtag] = new_name
         else:
-            script_path = root / "script" / script_name
+            # 重命名一级标签
+            old_tag = primary_by_name.get(old_name)
+            if old_tag is not None:
+                old_tag['name'] = new_name
+    
+            # 更新 subtag_to_primary 中的值
+            for subtag, primary in list(tags_data.get('subtag_to_primary', {}).items()):
+                if primary == old_name:
+                    tags_data['subtag_to_primary'][subtag] = new_name
+    else:
+        # 检查 new_name 是否已存在（合并操作）
+        is_merge = new_name in tags_data.get('subtag_to_primary', {})
+    
+        if is_merge:
+            # 合并：删除旧的 subtag，保留新的
+            for p_tag in tags_data.get('primary_tags', []):
+                p_tag['subtags'] = [s for s in p_tag.get('subtags', []) if s.get('name') != old_name]
+    
+            # 删除旧的映射
+            if old_name in tags_data.get('subtag_to_primary', {}):
+                del tags_data['subtag_to_primary'][old_name]
+        else:
+            # 重命名二级标签
+            # 更新 primary_tags 中的 subtags
+            for p_tag in tags_data.get('primary_tags', []):
+                for subtag in p_tag.get('subtags', []):
+                    if subtag.get('name') == old_name:
+                        subtag['name'] = new_name
+                        break
+    
+            # 更新 subtag_to_primary 映射
+            if old_name in tags_data.get('subtag_to_primary', {}):
+                primary = tags_data['subtag_to_primary'].pop(old_name)
+                tags_data['subtag_to_primary'][new_name] = primary
+    
+    return is_merge
+
+
+def rename_primary_in_feature(feature: dict, old_name: str, new_name: str, is_merge: bool) -> tuple:
+    """在单个功能中重命名/合并一级标签，返回 (是否修改, 合并的条目数)"""
+    tags = feature.get('tags', [])
+    if not isinstance(tags, list):
+        return False, 0
+
+    # 一次遍历：找出旧/新标签，同时收集去掉旧标签后的列表（合并时使用）
+    old_tag = None
+    new_tag = None
+    remaining_tags = []
+    for t in tags:
+        name = t.get('name') if isinstance(t, dict) else None
+        if name == old_name:
+            if old_tag is None:
+                old_tag = t
+            continue
+        if name == new_name and new_tag is None:
+            new_tag = t
+        remaining_tags.append(t)
+
+    if not old_tag:
+        return False, 0
+    if new_tag and is_merge:
+        # 合并：将旧标签的 subtags 合并到新标签
+        existing = {s.get('name') for s in new_tag.get('subtags', []) if isinstance(s, dict)}
+        for s in old_tag.get('subtags', []):
+            if isinstance(s, dict) and s.get('name') not in existing:
+                new_tag.setdefault('subtags', []).append(s)
+        # 删除旧标签
+        feature['tags'] = remaining_tags
+        return True, 1
+    # 重命名
+    old_tag['name'] = new_name
+    return True, 0
+
+
+def rename_subtag_in_tag(tag: dict, old_name: str, new_name: str, is_merge: bool) -> tuple:
+    """在单个一级标签下重命名/合并二级标签，返回 (是否修改, 合并的条目数)"""
+    subtags = tag.get('subtags', [])
+    if not isinstance(subtags, list):
+        return False, 0
+
+    # 一次遍历同时找出旧二级标签的位置和新二级标签是否已存在
+    old_subtag_idx = None
+    new_subtag_exists = False
+    for i, s in enumerate(subtags):
+        if not isinstance(s, dict):
+            continue
+        name = s.get('name')
+        if name == old_name:
+            if old_subtag_idx is None:
+                old_subtag_idx = i
+        elif name == new_name:
+            new_subtag_exists = True
+
+    if old_subtag_idx is None:
+        return False, 0
+    if new_subtag_exists and is_merge:
+        # 合并：删除旧的（新的已存在）
+        subtags.pop(old_subtag_idx)
+        return True, 1
+    # 重命名
+    subtags[old_subtag_idx]['name'] = new_name
+    return True, 0
+
+
+def may_contain_name(raw: bytes, name: str) -> bool:
+    """
+    按原始字节粗筛文件中是否可能出现该名称（不解析 JSON）
+    JSON 中字符串按原字符（ensure_ascii=False）或 \\uXXXX 转义（ensure_ascii=True）保存，两种写法都检查
+    """
+    return (json.dumps(name, ensure_ascii=False)[1:-1].encode('utf-8') in raw or
+            json.dumps(name)[1:-1].encode('ascii') in raw)
+
+
+def rename_tag_in_product(product: str, product_file: Path, old_name: str, new_name: str,
+                          tag_type: str, is_merge: bool) -> tuple:
+    """
+    在单个产品文件中重命名/合并标签（只改内存中的新副本，不写回）
+    返回 (修改后的产品数据，未用到该标签时为 None, 合并的条目数)
+    """
+    merged_count = 0
+    postings_key = "primary_postings" if tag_type == 'primary' else "subtag_postings"
+    try:
+        raw = product_file.read_bytes()
+        # 文件字节中根本没有旧标签名时直接跳过，索引缓存失效时也不必为此重新解析整个文件
+        if not may_contain_name(raw, old_name):
+            return None, 0
+        # 用缓存的倒排索引找出用到旧标签的功能，用不到的产品无需重新解析和写回
+        postings = load_product_index(product, product_file)[postings_key].get(old_name)
+        if not postings:
+            return None, 0
+        product_data = json.loads(raw)
+    except FileNotFoundError:
+        return None, 0
+    
+    features = get_feature_list(product_data) or []
+    modified = False
+    if tag_type == 'primary':
+        # 处理一级标签（同一功能可能有重复的同名标签，下标去重）
+        for idx in dict.fromkeys(postings):
+            feature = features[idx] if idx < len(features) else {}
+            changed, merged = rename_primary_in_feature(feature, old_name, new_name, is_merge)
+            modified = modified or changed
+            merged_count += merged
+    else:
+        # 处理二级标签：倒排索引记录了 (功能下标, 一级标签位置)，直接定位到含该二级标签的一级标签，
+        # 不再逐个检查功能里的其他标签
+        for idx, pos in dict.fromkeys(postings):
+            tag = get_indexed_tag(features, idx, pos)
+            if tag is None:
+                continue
+            changed, merged = rename_subtag_in_tag(tag, old_name, new_name, is_merge)
+            modified = modified or changed
+            merged_count += merged
+    
+    return (product_data if modified else None), merged_count
+
+
+def bulk_rename_tags_in_product(product: str, product_file: Path, renames: list) -> tuple:
+    """
+    在单个产品文件中依次执行多个重命名/合并（renames 为 (旧名, 新名, 类型, 是否合并) 列表），只读取、解析一次
+    每个重命名只影响功能自身的标签，逐个功能按顺序执行全部重命名与逐个调用 rename_tag_in_product 结果一致
+    返回 (修改后的产品数据，未用到任何旧标签时为 None, 每个重命名合并的条目数列表)
+    """
+    merged_counts = [0] * len(renames)
+    # 可能被修改的功能：用到任一旧标签的功能（链式重命名 A->B、B->C 中新出现的 B 也来自 A 的功能）
+    try:
+        raw = product_file.read_bytes()
+        if not any(may_contain_name(raw, old_name) for old_name, _, _, _ in renames):
+            return None, merged_counts
+        index = load_product_index(product, product_file)
+        candidates = set()
+        for old_name, _, tag_type, _ in renames:
+            if tag_type == 'primary':
+                candidates.update(index['primary_postings'].get(old_name, ()))
+            else:
+                candidates.update(idx for idx, _ in index['subtag_postings'].get(old_name, ()))
+        if not candidates:
+            return None, merged_counts
+        product_data = json.loads(raw)
+    except FileNotFoundError:
+        return None, merged_counts
+    
+    features = get_feature_list(product_data) or []
+    modified = False
+    for idx in sorted(candidates):
+        if idx >= len(features):
+            continue
+        feature = features[idx]
+        for i, (old_name, new_name, tag_type, is_merge) in enumerate(renames):
+            if tag_type == 'primary':
+                changed, merged = rename_primary_in_feature(feature, old_name, new_name, is_merge)
+            else:
+                # 一级标签合并后位置会变化，这里按当前标签列表查找
+                tags = feature.get('tags', [])
+                if not isinstance(tags, list):
+                    continue
+                changed, merged = False, 0
+                for tag in tags:
+                    if isinstance(tag, dict):
+                        tag_changed, tag_merged = rename_subtag_in_tag(tag, old_name, new_name, is_merge)
+                        changed = changed or tag_changed
+                        merged += tag_merged
+            modified = modified or changed
+            merged_counts[i] += merged
+    
+    return (product_data if modified else None), merged_counts
+
+
+LOG_PREVIEW_CHARS = 5000  # 日志列表中每个日志最多返回的字符数
+
+
+def read_log_head(path: Path, limit: int) -> str:
+    """只读取日志开头的 limit 个字符，避免把大日志整个读进内存再截断"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read(limit)
+
+
+class ThreadOutput:
+    """
+    按任务分流的输出流：任务 capture 后打印的内容写入该任务自己的缓冲区，其他线程照常输出到原来的流
+    缓冲区保存在 ContextVar 中，任务内部的线程池用 contextvars.copy_context().run 提交时，
+    工作线程打印的内容（如 ai_summary 并发请求中的 API 错误）也写入同一个任务日志
+    """
+    def __init__(self, stream):
+        self._stream = stream
+        self._buffer = contextvars.ContextVar(f"task_output_{id(self)}", default=None)
+    
+    def capture(self, buffer):
+        self._buffer.set(buffer)
+    
+    def release(self):
+        self._buffer.set(None)
+    
+    def write(self, text):
+        buffer = self._buffer.get()
+        if buffer is not None:
+            return buffer.write(text)
+        return self._stream.write(text)
+    
+    def flush(self):
+        self._stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+_output_lock = threading.Lock()
+
+
+def install_thread_output():
+    """把 sys.stdout / sys.stderr 替换为按线程分流的输出流（只替换一次）"""
+    with _output_lock:
+        if not isinstance(sys.stdout, ThreadOutput):
+            sys.stdout = ThreadOutput(sys.stdout)
+        if not isinstance(sys.stderr, ThreadOutput):
+            sys.stderr = ThreadOutput(sys.stderr)
+
+
+# 后台任务的默认时限（秒），与原先用子进程运行脚本时的超时一致
+TASK_TIMEOUT = 1800
+
+
+def run_task_async(task_name: str, func, *args, task_type: str = None, callback=None,
+                   timeout: float = TASK_TIMEOUT):
+    """
+    在后台线程池中直接调用脚本函数（不再启动子进程），并记录详细日志
+    task_type 需由调用方先通过 claim_task 标记，任务结束后自动清除
+    func 抛出异常或返回 False 视为失败
+    超过 timeout 秒仍未结束时按超时失败处理：写入日志、回调并清除任务标记，后续可再次触发；
+    线程无法被强制终止，卡住的调用仍占用一个工作线程，结束后只在控制台提示
+    """
+    install_thread_output()
+    
+    def run():
+        logs_dir = LOGS_DIR
+        logs_dir.mkdir(exist_ok=True)
         
         start_time = datetime.now()
         log_file = logs_dir / f"{task_type or 'script'}_{start_time.strftime('%Y%m%d_%H%M%S')}.log"
+        stdout_buffer = io.StringIO()
+        stderr_buffer = io.StringIO()
+        finished = []
+        finish_lock = threading.Lock()
         
-        try:
-            print(f"[{start_time.isoformat()}] 开始运行: {script_name}")
-            
-            result = subprocess.run(
-                [sys.executable, str(script_path)],
-                capture_output=True,
-                text=True,
-                timeout=1800  # 30 分钟超时
-            )
+        def finish(success: bool, timed_out: bool = False) -> bool:
+            """任务返回和超时只有先到的一次生效：写日志、回调并清除任务标记"""
+            with finish_lock:
+                if finished:
+                    return False
+                finished.append(True)
             
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
+            result = f"超时 (>{timeout:.0f}秒)" if timed_out else ('成功' if success else '失败')
             
-            # 写入日志文件
-            with open(log_file, "w", encoding="utf-8") as f:
-                f.write(f"=== 脚本执行日志 ===\n")
-                f.write(f"脚本: {script_name}\n")
-                f.write(f"开始时间: {start_time.isoformat()}\n")
-                f.write(f"结束时间: {end_time.isoformat()}\n")
-                f.write(f"耗时: {duration:.1f} 秒\n")
-                f.write(f"返回码: {result.returncode}\n")
-                f.write(f"\n=== STDOUT ===\n")
-                f.write(result.stdout or "(无输出)")
-                f.write(f"\n\n=== STDERR ===\n")
-                f.write(result.stderr or "(无错误)")
-            
-            print(f"[{end_time.isoformat()}] 脚本完成: {script_name}, 耗时 {duration:.1f}秒, 返回码 {result.returncode}")
-            
-            if result.returncode != 0:
-                print(f"脚本错误输出: {result.stderr[:500] if result.stderr else '(无)'}")
+            try:
+                # 写入日志文件
+                # 拼成一个字符串一次写入
+                log_file.write_text(
+                    f"=== 脚本执行日志 ===\n"
+                    f"脚本: {task_name}\n"
+                    f"开始时间: {start_time.isoformat()}\n"
+                    f"结束时间: {end_time.isoformat()}\n"
+                    f"耗时: {duration:.1f} 秒\n"
+                    f"结果: {result}\n"
+                    f"\n=== STDOUT ===\n"
+                    f"{stdout_buffer.getvalue() or '(无输出)'}"
+                    f"\n\n=== STDERR ===\n"
+                    f"{stderr_buffer.getvalue() or '(无错误)'}",
+                    encoding="utf-8"
+                )
+            except OSError as e:
+                print(f"写入日志失败: {e}")
+            
+            print(f"[{end_time.isoformat()}] 任务完成: {task_name}, 耗时 {duration:.1f}秒, {result}")
+            if not success:
+                print(f"任务错误输出: {stderr_buffer.getvalue()[-500:] or '(无)'}")
             
-            if callback:
-                callback(result.returncode == 0)
-                
-        except subprocess.TimeoutExpired as e:
-            print(f"脚本执行超时: {script_name}")
-            with open(log_file, "w", encoding="utf-8") as f:
-                f.write(f"脚本执行超时 (>1800秒): {script_name}\n")
-            if callback:
-                callback(False)
-        except Exception as e:
-            print(f"脚本运行失败: {script_name}, 错误: {e}")
-            with open(log_file, "w", encoding="utf-8") as f:
-                f.write(f"脚本运行失败: {e}\n")
-            if callback:
-                callback(False)
+            try:
+                if callback:
+                    callback(success)
+            finally:
+                if task_type:
+                    release_task(task_type)
+            return True
+        
+        watchdog = threading.Timer(timeout, finish, args=(False, True))
+        watchdog.daemon = True
+        
+        print(f"[{start_time.isoformat()}] 开始运行: {task_name}")
+        sys.stdout.capture(stdout_buffer)
+        sys.stderr.capture(stderr_buffer)
+        success = False
+        watchdog.start()
+        try:
+            success = func(*args) is not False
+        except Exception:
+            traceback.print_exc()
         finally:
-            if task_type:
-                running_tasks[task_type] = False
+            watchdog.cancel()
+            sys.stdout.release()
+            sys.stderr.release()
+        
+        if not finish(success):
+            print(f"[{datetime.now().isoformat()}] 已超时的任务结束: {task_name}, {'成功' if success else '失败'}")
     
-    thread = threading.Thread(target=run)
-    thread.start()
+    task_executor.submit(run)
 
 
-def run_parse_and_tag():
-    """运行解析和打标脚本"""
-    root = get_project_root()
-    
-    # Docker 中脚本在 /app 下，本地在 script/ 下
-    if root == Path("/app"):
-        script_dir = root
-    else:
-        script_dir = root / "script"
-    
-    # 1. 运行解析脚本
+def run_ai_summary():
+    """生成 AI 总结（常驻进程中先清空配置/标签缓存，读取最新文件）"""
+    ai_summary.clear_caches()
+    return ai_summary.generate_all_summaries()
+
+
+def run_parse_and_tag(tag: bool = True):
+    """运行解析和打标（tag 为 False 时只解析：已有打标任务在运行）"""
+    # 1. 解析 changelog
     print("正在解析 changelog...")
-    parse_script = script_dir / "parse_changelog.py"
     try:
-        result = subprocess.run(
-            [sys.executable, str(parse_script)],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        print(result.stdout)
-        if result.returncode != 0:
-            print(f"解析失败: {result.stderr}")
-            return False
+        features = parse_changelog.parse_and_save()
     except Exception as e:
-        print(f"解析脚本运行失败: {e}")
+        print(f"解析失败: {e}")
+        return False
+    if features is None:
         return False
     
-    # 2. 运行打标脚本
+    # 2. 打标
+    if not tag:
+        print("打标任务正在运行，跳过打标（新条目将在下次打标时处理）")
+        return True
     print("正在打标...")
-    tag_script = script_dir / "llm_tagger.py"
     try:
-        result = subprocess.run(
-            [sys.executable, str(tag_script), "--file", "youware.json"],
-            capture_output=True,
-            text=True,
-            timeout=600
-        )
-        print(result.stdout)
-        if result.returncode != 0:
-            print(f"打标失败: {result.stderr}")
+        llm_tagger.process_all_features(target_file="youware.json")
     except Exception as e:
-        print(f"打标脚本运行失败: {e}")
+        print(f"打标失败: {e}")
     
     return True
 
 
 class APIHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 长连接：同一连接上处理多个请求，省去反复建连
+    # 每个响应都必须带 Content-Length，空闲连接 60 秒后断开，避免占住线程
+    protocol_version = "HTTP/1.1"
+    timeout = 60
     
     def get_auth_token(self):
         """从请求头获取认证 token"""
@@ -230,316 +864,273 @@ class APIHandler(BaseHTTPRequestHandler):
             return auth_header[7:]
         return None
     
-    def send_json_response(self, status_code, data):
-        """发送 JSON 响应"""
+    def send_json_response(self, status_code, data, etag=False):
+        """
+        发送 JSON 响应
+        etag=True 时附带内容的 ETag，客户端 If-None-Match 一致则只返回 304（用于被轮询的接口）
+        """
+        content = _response_encoder.encode(data).encode('utf-8')
+        
+        etag_value = None
+        if etag:
+            etag_value = f'"{hashlib.md5(content).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag_value:
+                self.send_empty_response(304, {
+                    "ETag": etag_value,
+                    "Cache-Control": "no-cache",
+                    "Access-Control-Allow-Origin": "*"
+                })
+                return
+        
         self.send_response(status_code)
         self.send_header("Content-Type", "application/json")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
+        if etag_value:
+            self.send_header("ETag", etag_value)
+            self.send_header("Cache-Control", "no-cache")
+        # 较大的响应在客户端支持时用 gzip 压缩（JSON/日志文本压缩率很高）
+        if len(content) > GZIP_MIN_SIZE and 'gzip' in self.headers.get('Accept-Encoding', '').lower():
+            content = gzip.compress(content, compresslevel=GZIP_LEVEL)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Vary", "Accept-Encoding")
+        self.send_header("Content-Length", str(len(content)))
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        self.wfile.write(content)
     
-    def read_request_body(self):
-        """读取请求体"""
-        content_length = int(self.headers.get('Content-Length', 0))
+    def send_empty_response(self, status_code, headers=None):
+        """发送无响应体的响应（404、304、CORS 预检等）"""
+        self.send_response(status_code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        # 304 不带 Content-Length（否则会被理解为原资源长度为 0）
+        if status_code != 304:
+            self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def consume_request_body(self):
+        """
+        从连接中读出请求体（原始 bytes，json.loads 可直接解析，无需先解码成 str）
+        Content-Length 无效或超过上限时直接返回 400/413 并关闭连接（未读出的内容不能留给下一个请求），返回 None
+        """
+        try:
+            content_length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            content_length = -1
+        if content_length < 0:
+            self.close_connection = True
+            self.send_json_response(400, {"error": "无效的 Content-Length"})
+            return None
+        if content_length > MAX_REQUEST_BODY:
+            self.close_connection = True
+            self.send_json_response(413, {"error": "请求体过大"})
+            return None
         if content_length > 0:
-            body = self.rfile.read(content_length)
-            return body.decode('utf-8')
-        return ''
+            return self.rfile.read(content_length)
+        return b''
+    
+    def read_request_body(self):
+        """读取请求体 bytes（do_POST 开头已从连接读出）"""
+        return self._request_body
+    
+    def require_auth(self) -> bool:
+        """校验 session，未授权时直接返回 401"""
+        if verify_session(self.get_auth_token()):
+            return True
+        self.send_json_response(401, {"error": "未授权访问"})
+        return False
+    
+    def read_json_body(self):
+        """解析 JSON 请求体，无效时直接返回 400 并返回 None"""
+        try:
+            data = json.loads(self.read_request_body())
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            self.send_json_response(400, {"error": "无效的 JSON"})
+            return None
+        return data
+    
+    def read_authorized_json(self):
+        """受保护的 POST 接口公共前置：先校验 session，再解析 JSON 请求体，失败时返回 None"""
+        if not self.require_auth():
+            return None
+        return self.read_json_body()
     
     def do_GET(self):
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        
-        if path == "/api/admin/changelog":
-            # 获取原始 changelog 文本
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            raw_file = get_project_root() / "storage" / "youware_changelog_raw.txt"
-            if raw_file.exists():
-                content = raw_file.read_text(encoding='utf-8')
-                self.send_json_response(200, {"content": content})
-            else:
-                self.send_json_response(200, {"content": ""})
+        handler = self.GET_ROUTES.get(urlparse(self.path).path)
+        if handler is None:
+            self.send_empty_response(404)
+            return
+        handler(self)
+    
+    def do_POST(self):
+        # 长连接下必须先读完请求体，否则提前返回（如未授权）时剩余内容会被当成下一个请求
+        self._request_body = self.consume_request_body()
+        if self._request_body is None:
+            return
+        handler = self.POST_ROUTES.get(urlparse(self.path).path)
+        if handler is None:
+            self.send_empty_response(404)
+            return
+        handler(self)
+    
+    def handle_get_changelog(self):
+        """获取原始 changelog 文本"""
+        if not self.require_auth():
+            return
         
-        elif path == "/api/status":
-            # 获取运行状态
-            status_path = get_project_root() / "info" / "run_status.json"
+        raw_file = CHANGELOG_RAW_FILE
+        try:
+            content = raw_file.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            content = ""
+        self.send_json_response(200, {"content": content})
+    
+    def handle_get_status(self):
+        """获取运行状态"""
+        # 运行状态文件未变化时复用解析结果（缓存只读，复制后再加入当前运行状态）
+        status_path = RUN_STATUS_FILE
+        try:
+            status = dict(load_json_cached(status_path))
+        except FileNotFoundError:
             status = {}
-            if status_path.exists():
-                with open(status_path, 'r') as f:
-                    status = json.load(f)
-            
-            # 添加当前运行状态
-            status["crawl_running"] = running_tasks.get("crawl", False)
-            status["summary_running"] = running_tasks.get("summary", False)
-            status["tagging_running"] = running_tasks.get("tagging", False)
-            
-            self.send_json_response(200, status)
         
-        elif path == "/api/admin/logs":
-            # 获取最近的日志文件列表
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            logs_dir = get_project_root() / "logs"
-            logs = []
-            
-            if logs_dir.exists():
-                # 获取所有 .log 文件，按修改时间排序
-                log_files = sorted(
-                    logs_dir.glob("*.log"),
-                    key=lambda x: x.stat().st_mtime,
-                    reverse=True
-                )[:10]  # 最近 10 个日志
-                
-                for log_file in log_files:
-                    try:
-                        content = log_file.read_text(encoding='utf-8')
-                        logs.append({
-                            'name': log_file.name,
-                            'time': datetime.fromtimestamp(log_file.stat().st_mtime).isoformat(),
-                            'content': content[:5000]  # 最多 5000 字符
-                        })
-                    except:
-                        pass
-            
-            self.send_json_response(200, {"logs": logs})
+        # 添加当前运行状态
+        status["crawl_running"] = running_tasks.get("crawl", False)
+        status["summary_running"] = running_tasks.get("summary", False)
+        status["tagging_running"] = running_tasks.get("tagging", False)
         
-        elif path == "/api/admin/others":
-            # 获取所有标记为 Others 的 features
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            others_features = []
-            storage_dir = get_project_root() / "storage"
-            products = ['youware', 'base44', 'bolt', 'lovable', 'replit', 'rocket', 'trickle', 'v0']
-            
-            for product in products:
-                product_file = storage_dir / f"{product}.json"
-                if not product_file.exists():
-                    continue
-                
-                with open(product_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                feature_data = next((item for item in data if item.get('name') == 'feature'), None)
-                if not feature_data:
-                    continue
-                
-                for idx, feature in enumerate(feature_data.get('features', [])):
-                    tags = feature.get('tags', [])
-                    # 确保 tags 是列表，不是字符串 "None"
-                    if not isinstance(tags, list):
-                        continue
-                    for tag in tags:
-                        # 确保 tag 是字典
-                        if not isinstance(tag, dict):
-                            continue
-                        if tag.get('name') == 'Others':
-                            subtags = tag.get('subtags', [])
-                            others_features.append({
-                                'product': product,
-                                'feature_index': idx,
-                                'title': feature.get('title', ''),
-                                'description': feature.get('description', ''),
-                                'time': feature.get('time', ''),
-                                'current_subtags': [st.get('name') for st in subtags if isinstance(st, dict)]
-                            })
-                            break
-            
-            self.send_json_response(200, {"features": others_features})
+        # 管理后台会轮询该接口，状态未变化时只返回 304
+        self.send_json_response(200, status, etag=True)
+    
+    def handle_get_logs(self):
+        """获取最近的日志文件列表"""
+        if not self.require_auth():
+            return
         
-        elif path == "/api/admin/tags":
-            # 获取标签结构
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            tag_file = get_project_root() / "info" / "tag.json"
-            if tag_file.exists():
-                with open(tag_file, 'r', encoding='utf-8') as f:
-                    tags_data = json.load(f)
-                self.send_json_response(200, tags_data)
-            else:
-                self.send_json_response(404, {"error": "标签文件不存在"})
+        logs_dir = LOGS_DIR
+        logs = []
         
-        elif path == "/api/admin/untagged":
-            # 获取所有未打标的 features（tags为空数组或undefined）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            untagged_features = []
-            storage_dir = get_project_root() / "storage"
-            products = ['youware', 'base44', 'bolt', 'lovable', 'replit', 'rocket', 'trickle', 'v0']
-            
-            for product in products:
-                product_file = storage_dir / f"{product}.json"
-                if not product_file.exists():
-                    continue
-                
-                with open(product_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                feature_data = next((item for item in data if item.get('name') == 'feature'), None)
-                if not feature_data:
-                    continue
-                
-                for idx, feature in enumerate(feature_data.get('features', [])):
-                    tags = feature.get('tags')
-                    # 未打标: tags 不存在、为 None、为空数组
-                    # 无需打标: tags == "None" (字符串)
-                    is_untagged = (
-                        tags is None or 
-                        (isinstance(tags, list) and len(tags) == 0)
-                    )
-                    is_none_tag = tags == "None"
-                    
-                    if is_untagged:
-                        untagged_features.append({
-                            'product': product,
-                            'feature_index': idx,
-                            'title': feature.get('title', ''),
-                            'description': feature.get('description', ''),
-                            'time': feature.get('time', ''),
-                            'status': 'untagged'  # 未打标
-                        })
-                    elif is_none_tag:
-                        untagged_features.append({
-                            'product': product,
-                            'feature_index': idx,
-                            'title': feature.get('title', ''),
-                            'description': feature.get('description', ''),
-                            'time': feature.get('time', ''),
-                            'status': 'none'  # 已标记为无需打标
-                        })
-            
-            self.send_json_response(200, {"features": untagged_features})
+        if logs_dir.exists():
+            # 获取所有 .log 文件，按修改时间排序（每个文件只 stat 一次）
+            log_files = sorted(
+                ((log_file.stat().st_mtime, log_file) for log_file in logs_dir.glob("*.log")),
+                key=lambda x: x[0],
+                reverse=True
+            )[:10]  # 最近 10 个日志
         
-        elif path == "/api/admin/used-subtags":
-            # 获取所有被使用的二级标签（用于隐藏未使用的标签）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            used_subtags = set()
-            storage_dir = get_project_root() / "storage"
-            products = ['youware', 'base44', 'bolt', 'lovable', 'replit', 'rocket', 'trickle', 'v0']
-            
-            for product in products:
-                product_file = storage_dir / f"{product}.json"
-                if not product_file.exists():
-                    continue
-                
-                with open(product_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                feature_data = next((item for item in data if item.get('name') == 'feature'), None)
-                if not feature_data:
-                    continue
-                
-                for feature in feature_data.get('features', []):
-                    tags = feature.get('tags', [])
-                    if not isinstance(tags, list):
-                        continue
-                    for tag in tags:
-                        if not isinstance(tag, dict):
-                            continue
-                        for subtag in tag.get('subtags', []):
-                            if isinstance(subtag, dict) and subtag.get('name'):
-                                used_subtags.add(subtag.get('name'))
-            
-            self.send_json_response(200, {"used_subtags": list(used_subtags)})
+            for mtime, log_file in log_files:
+                try:
+                    logs.append({
+                        'name': log_file.name,
+                        'time': datetime.fromtimestamp(mtime).isoformat(),
+                        'content': read_log_head(log_file, LOG_PREVIEW_CHARS)
+                    })
+                except:
+                    pass
         
-        else:
-            self.send_response(404)
-            self.end_headers()
+        self.send_json_response(200, {"logs": logs})
     
-    def do_POST(self):
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
+    def handle_get_others(self):
+        """获取所有标记为 Others 的 features"""
+        if not self.require_auth():
+            return
         
-        if path == "/api/admin/login":
-            # 验证密码
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            password = data.get('password', '')
-            config = load_admin_config()
-            
-            if password == config.get('password', ''):
-                token = create_session()
-                self.send_json_response(200, {"token": token})
-            else:
-                self.send_json_response(401, {"error": "密码错误"})
+        others_features = []
         
-        elif path == "/api/admin/changelog":
-            # 保存 changelog 并自动解析+打标
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            content = data.get('content', '')
-            
-            # 保存原始文件
-            raw_file = get_project_root() / "storage" / "youware_changelog_raw.txt"
-            raw_file.write_text(content, encoding='utf-8')
-            
-            # 异步运行解析和打标
-            def run_async():
-                run_parse_and_tag()
-            
-            thread = threading.Thread(target=run_async)
-            thread.start()
-            
-            self.send_json_response(200, {"status": "saved", "message": "已保存并开始解析打标"})
-        
-        elif path == "/api/admin/logout":
-            # 登出
-            token = self.get_auth_token()
-            if token and token in sessions:
-                del sessions[token]
-            self.send_json_response(200, {"status": "logged_out"})
-        
-        elif path == "/api/admin/config":
-            # 更新配置（如 exclude_tags）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            # 读取现有配置
-            config_path = get_project_root() / "info" / "admin_config.json"
+        for index in iter_product_indexes():
+            others_features.extend(index["others"])
+        
+        self.send_json_response(200, {"features": others_features})
+    
+    def handle_get_tags(self):
+        """获取标签结构"""
+        if not self.require_auth():
+            return
+        
+        tag_file = TAG_FILE
+        try:
+            tags_data = load_json_cached(tag_file)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": "标签文件不存在"})
+            return
+        self.send_json_response(200, tags_data)
+    
+    def handle_get_untagged(self):
+        """获取所有未打标的 features（tags为空数组或undefined）"""
+        if not self.require_auth():
+            return
+        
+        untagged_features = []
+        
+        for index in iter_product_indexes():
+            untagged_features.extend(index["untagged"])
+        
+        self.send_json_response(200, {"features": untagged_features})
+    
+    def handle_get_used_subtags(self):
+        """获取所有被使用的二级标签（用于隐藏未使用的标签）"""
+        if not self.require_auth():
+            return
+        
+        used_subtags = set()
+        
+        for index in iter_product_indexes():
+            used_subtags |= index["used_subtags"]
+        
+        self.send_json_response(200, {"used_subtags": list(used_subtags)})
+    
+    def handle_post_login(self):
+        """验证密码"""
+        data = self.read_json_body()
+        if data is None:
+            return
+        
+        password = data.get('password', '')
+        config = load_admin_config()
+        
+        if check_password(password, config.get('password', '')):
+            token = create_session()
+            self.send_json_response(200, {"token": token})
+        else:
+            self.send_json_response(401, {"error": "密码错误"})
+    
+    def handle_post_changelog(self):
+        """保存 changelog 并自动解析+打标"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        content = data.get('content', '')
+        
+        # 保存原始文件
+        raw_file = CHANGELOG_RAW_FILE
+        raw_file.write_text(content, encoding='utf-8')
+        
+        # 异步运行解析和打标：打标与其他打标任务互斥，已有打标任务时只解析
+        # （时限与原先解析 60 秒 + 打标 600 秒的子进程超时一致）
+        tag = claim_task("tagging")
+        run_task_async("parse_changelog", run_parse_and_tag, tag,
+                       task_type="tagging" if tag else None, timeout=660)
+        
+        self.send_json_response(200, {"status": "saved", "message": "已保存并开始解析打标"})
+    
+    def handle_post_logout(self):
+        """登出"""
+        token = self.get_auth_token()
+        delete_session(token)
+        self.send_json_response(200, {"status": "logged_out"})
+    
+    def handle_post_config(self):
+        """更新配置（如 exclude_tags）"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        # 读取现有配置（读取到写回之间持有文件锁，并发请求不会互相覆盖）
+        config_path = ADMIN_CONFIG_FILE
+        with get_file_lock(config_path):
             config = load_admin_config()
             
             # 更新 exclude_tags
@@ -547,80 +1138,66 @@ class APIHandler(BaseHTTPRequestHandler):
                 config['exclude_tags'] = data['exclude_tags']
             
             # 保存配置
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "saved"})
+            save_json(config_path, config)
         
-        elif path == "/api/run-crawl":
-            # 触发增量更新
-            if running_tasks.get("crawl"):
-                self.send_json_response(200, {"status": "already_running"})
-                return
-            
-            # 保存运行时间
-            save_run_status(crawl_time=datetime.now().isoformat())
-            
-            # 异步运行脚本
-            run_script_async("monitor.py", task_type="crawl")
-            
-            self.send_json_response(200, {"status": "started"})
-            
-        elif path == "/api/run-summary":
-            # 触发 AI 总结
-            if running_tasks.get("summary"):
-                self.send_json_response(200, {"status": "already_running"})
-                return
-            
-            # 保存运行时间
-            save_run_status(summary_time=datetime.now().isoformat())
-            
-            # 异步运行脚本
-            run_script_async("ai_summary.py", task_type="summary")
-            
-            self.send_json_response(200, {"status": "started"})
+        self.send_json_response(200, {"status": "saved"})
+    
+    def handle_post_run_crawl(self):
+        """触发增量更新"""
+        if not claim_task("crawl"):
+            self.send_json_response(200, {"status": "already_running"})
+            return
         
-        elif path == "/api/run-tag-all":
-            # 触发为所有未打标内容自动打标
-            if running_tasks.get("tagging"):
-                self.send_json_response(200, {"status": "already_running"})
-                return
-            
-            running_tasks["tagging"] = True
-            
-            # 异步运行打标脚本
-            run_script_async("llm_tagger.py", task_type="tagging")
-            
-            self.send_json_response(200, {"status": "started"})
+        # 保存运行时间
+        monitor.save_run_status(crawl_time=datetime.now().isoformat())
         
-        elif path == "/api/admin/others/update":
-            # 更新 feature 的标签
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product')
-            feature_index = data.get('feature_index')
-            new_primary_tag = data.get('primary_tag')
-            new_subtag = data.get('subtag')
-            
-            if not all([product, new_primary_tag, new_subtag]) or feature_index is None:
-                self.send_json_response(400, {"error": "缺少必要参数"})
-                return
-            
-            # 1. 更新 tag.json（如果是新的 subtag）
-            tag_file = get_project_root() / "info" / "tag.json"
-            with open(tag_file, 'r', encoding='utf-8') as f:
-                tags_data = json.load(f)
-            
+        # 异步运行监控（各产品爬虫仍由 monitor 在独立子进程中启动浏览器）
+        run_task_async("monitor", monitor.monitor_all, task_type="crawl")
+        
+        self.send_json_response(200, {"status": "started"})
+    
+    def handle_post_run_summary(self):
+        """触发 AI 总结"""
+        if not claim_task("summary"):
+            self.send_json_response(200, {"status": "already_running"})
+            return
+        
+        # 保存运行时间
+        monitor.save_run_status(summary_time=datetime.now().isoformat())
+        
+        # 异步运行脚本
+        run_task_async("ai_summary", run_ai_summary, task_type="summary")
+        
+        self.send_json_response(200, {"status": "started"})
+    
+    def handle_post_run_tag_all(self):
+        """触发为所有未打标内容自动打标"""
+        if not claim_task("tagging"):
+            self.send_json_response(200, {"status": "already_running"})
+            return
+        
+        # 异步运行打标脚本
+        run_task_async("llm_tagger", llm_tagger.process_all_features, task_type="tagging")
+        
+        self.send_json_response(200, {"status": "started"})
+    
+    def handle_post_others_update(self):
+        """更新 feature 的标签"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product')
+        feature_index = data.get('feature_index')
+        new_primary_tag = data.get('primary_tag')
+        new_subtag = data.get('subtag')
+        
+        if not all([product, new_primary_tag, new_subtag]) or feature_index is None:
+            self.send_json_response(400, {"error": "缺少必要参数"})
+            return
+        
+        # 1. 更新 tag.json（如果是新的 subtag）：经 update_json_file 加锁读写，并发请求添加的标签不会互相覆盖
+        def add_subtag(tags_data):
             # 检查 subtag 是否已存在于映射中
             subtag_to_primary = tags_data.get('subtag_to_primary', {})
             if new_subtag not in subtag_to_primary:
@@ -653,24 +1230,16 @@ class APIHandler(BaseHTTPRequestHandler):
                 
                 tags_data['subtag_to_primary'] = subtag_to_primary
                 
-                with open(tag_file, 'w', encoding='utf-8') as f:
-                    json.dump(tags_data, f, ensure_ascii=False, indent=4)
-            
-            # 2. 更新产品的 feature tags
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data or feature_index >= len(feature_data.get('features', [])):
-                self.send_json_response(404, {"error": "找不到指定的 feature"})
-                return
-            
-            feature = feature_data['features'][feature_index]
+                return tags_data
+            return None
+        
+        update_json_file(TAG_FILE, add_subtag)
+        
+        # 2. 更新产品的 feature tags
+        def replace_others(product_data):
+            feature = find_feature(product_data, feature_index)
+            if feature is None:
+                return None
             current_tags = feature.get('tags', [])
             
             # 确保 current_tags 是列表
@@ -685,7 +1254,7 @@ class APIHandler(BaseHTTPRequestHandler):
                 # 确保 tag 是字典
                 if not isinstance(tag, dict):
                     continue
-                    
+            
                 if tag.get('name') == 'Others':
                     # 完全跳过 Others 标签（不保留）
                     continue
@@ -712,462 +1281,352 @@ class APIHandler(BaseHTTPRequestHandler):
                 })
             
             feature['tags'] = new_tags
-            
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "updated"})
+            return feature
         
-        elif path == "/api/admin/feature/update-tags":
-            # 更新单个 feature 的标签
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product')
-            feature_index = data.get('feature_index')
-            new_tags = data.get('tags', [])  # [{name: 'Primary', subtags: [{name: 'Subtag'}]}]
-            
-            if not product or feature_index is None:
-                self.send_json_response(400, {"error": "缺少必要参数"})
-                return
-            
-            # 更新产品的 feature tags
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data or feature_index >= len(feature_data.get('features', [])):
-                self.send_json_response(404, {"error": "找不到指定的 feature"})
-                return
-            
-            feature = feature_data['features'][feature_index]
-            feature['tags'] = new_tags
-            
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "updated"})
+        product_file = get_product_file(product)
+        try:
+            feature = update_json_file(product_file, replace_others)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if feature is None:
+            self.send_json_response(404, {"error": "找不到指定的 feature"})
+            return
         
-        elif path == "/api/admin/feature/mark-none":
-            # 将 feature 标记为 "无需打标"（tags 设为 "None" 字符串）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product')
-            feature_index = data.get('feature_index')
-            mark_as_none = data.get('mark_as_none', True)  # True = 标记为无需打标，False = 清除标记（变为未打标）
-            
-            if not product or feature_index is None:
-                self.send_json_response(400, {"error": "缺少必要参数"})
-                return
-            
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data or feature_index >= len(feature_data.get('features', [])):
-                self.send_json_response(404, {"error": "找不到指定的 feature"})
-                return
-            
-            feature = feature_data['features'][feature_index]
-            
+        self.send_json_response(200, {"status": "updated"})
+    
+    def handle_post_feature_update_tags(self):
+        """更新单个 feature 的标签"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product')
+        feature_index = data.get('feature_index')
+        new_tags = data.get('tags', [])  # [{name: 'Primary', subtags: [{name: 'Subtag'}]}]
+        
+        if not product or feature_index is None:
+            self.send_json_response(400, {"error": "缺少必要参数"})
+            return
+        
+        # 更新产品的 feature tags
+        def set_tags(product_data):
+            feature = find_feature(product_data, feature_index)
+            if feature is not None:
+                feature['tags'] = new_tags
+            return feature
+        
+        product_file = get_product_file(product)
+        try:
+            feature = update_json_file(product_file, set_tags)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if feature is None:
+            self.send_json_response(404, {"error": "找不到指定的 feature"})
+            return
+        
+        self.send_json_response(200, {"status": "updated"})
+    
+    def handle_post_feature_mark_none(self):
+        """将 feature 标记为 "无需打标"（tags 设为 "None" 字符串）"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product')
+        feature_index = data.get('feature_index')
+        mark_as_none = data.get('mark_as_none', True)  # True = 标记为无需打标，False = 清除标记（变为未打标）
+        
+        if not product or feature_index is None:
+            self.send_json_response(400, {"error": "缺少必要参数"})
+            return
+        
+        def mark(product_data):
+            feature = find_feature(product_data, feature_index)
+            if feature is None:
+                return None
             if mark_as_none:
                 feature['tags'] = "None"  # 设为字符串 "None" 表示无需打标
             else:
                 feature['tags'] = []  # 设为空数组表示未打标
-            
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "marked" if mark_as_none else "unmarked"})
+            return feature
         
-        elif path == "/api/admin/tag/rename":
-            # 统一重命名标签（支持合并同名标签）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            old_name = data.get('old_name')
-            new_name = data.get('new_name')
-            tag_type = data.get('type', 'subtag')  # 'primary' or 'subtag'
-            
-            if not old_name or not new_name:
-                self.send_json_response(400, {"error": "缺少 old_name 或 new_name"})
-                return
-            
-            if old_name == new_name:
-                self.send_json_response(400, {"error": "新旧名称相同"})
-                return
-            
+        product_file = get_product_file(product)
+        try:
+            feature = update_json_file(product_file, mark)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if feature is None:
+            self.send_json_response(404, {"error": "找不到指定的 feature"})
+            return
+        
+        self.send_json_response(200, {"status": "marked" if mark_as_none else "unmarked"})
+    
+    def handle_post_tag_rename(self):
+        """统一重命名标签（支持合并同名标签）"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        old_name = data.get('old_name')
+        new_name = data.get('new_name')
+        tag_type = data.get('type', 'subtag')  # 'primary' or 'subtag'
+        
+        if not old_name or not new_name:
+            self.send_json_response(400, {"error": "缺少 old_name 或 new_name"})
+            return
+        
+        if old_name == new_name:
+            self.send_json_response(400, {"error": "新旧名称相同"})
+            return
+        
+        # tag.json 和产品文件的读取到写回之间持有它们的写锁，期间其他修改请求排队等待，不会被覆盖
+        with lock_files([TAG_FILE, *PRODUCT_FILES.values()]):
             # 1. 更新 tag.json
-            tag_file = get_project_root() / "info" / "tag.json"
+            tag_file = TAG_FILE
             with open(tag_file, 'r', encoding='utf-8') as f:
                 tags_data = json.load(f)
             
-            is_merge = False  # 是否是合并操作
-            
-            if tag_type == 'primary':
-                # 检查 new_name 是否已存在（合并操作）
-                existing_new = any(p.get('name') == new_name for p in tags_data.get('primary_tags', []))
-                is_merge = existing_new
-                
-                if is_merge:
-                    # 合并：找到旧标签和新标签
-                    old_tag = next((p for p in tags_data['primary_tags'] if p.get('name') == old_name), None)
-                    new_tag = next((p for p in tags_data['primary_tags'] if p.get('name') == new_name), None)
-                    
-                    if old_tag and new_tag:
-                        # 将旧标签的 subtags 合并到新标签
-                        existing_subtag_names = {s.get('name') for s in new_tag.get('subtags', [])}
-                        for subtag in old_tag.get('subtags', []):
-                            if subtag.get('name') not in existing_subtag_names:
-                                new_tag.setdefault('subtags', []).append(subtag)
-                        
-                        # 删除旧标签
-                        tags_data['primary_tags'] = [p for p in tags_data['primary_tags'] if p.get('name') != old_name]
-                        
-                        # 更新 subtag_to_primary 映射
-                        for subtag, primary in list(tags_data.get('subtag_to_primary', {}).items()):
-                            if primary == old_name:
-                                tags_data['subtag_to_primary'][subtag] = new_name
-                else:
-                    # 重命名一级标签
-                    for p_tag in tags_data.get('primary_tags', []):
-                        if p_tag.get('name') == old_name:
-                            p_tag['name'] = new_name
-                            break
-                    
-                    # 更新 subtag_to_primary 中的值
-                    for subtag, primary in list(tags_data.get('subtag_to_primary', {}).items()):
-                        if primary == old_name:
-                            tags_data['subtag_to_primary'][subtag] = new_name
-            else:
-                # 检查 new_name 是否已存在（合并操作）
-                existing_new = new_name in tags_data.get('subtag_to_primary', {})
-                is_merge = existing_new
-                
-                if is_merge:
-                    # 合并：删除旧的 subtag，保留新的
-                    for p_tag in tags_data.get('primary_tags', []):
-                        p_tag['subtags'] = [s for s in p_tag.get('subtags', []) if s.get('name') != old_name]
-                    
-                    # 删除旧的映射
-                    if old_name in tags_data.get('subtag_to_primary', {}):
-                        del tags_data['subtag_to_primary'][old_name]
-                else:
-                    # 重命名二级标签
-                    # 更新 primary_tags 中的 subtags
-                    for p_tag in tags_data.get('primary_tags', []):
-                        for subtag in p_tag.get('subtags', []):
-                            if subtag.get('name') == old_name:
-                                subtag['name'] = new_name
-                                break
-                    
-                    # 更新 subtag_to_primary 映射
-                    if old_name in tags_data.get('subtag_to_primary', {}):
-                        primary = tags_data['subtag_to_primary'].pop(old_name)
-                        tags_data['subtag_to_primary'][new_name] = primary
-            
-            with open(tag_file, 'w', encoding='utf-8') as f:
-                json.dump(tags_data, f, ensure_ascii=False, indent=4)
+            is_merge = rename_tag_in_tag_data(tags_data, old_name, new_name, tag_type)
             
             # 2. 更新所有产品文件中的标签（支持合并）
-            storage_dir = get_project_root() / "storage"
-            products = ['youware', 'base44', 'bolt', 'lovable', 'replit', 'rocket', 'trickle', 'v0']
+            # 先在内存中改完所有文件，最后统一写入：中途出错时不会只改了一部分文件
+            pending_writes = [(tag_file, tags_data)]
             updated_count = 0
             merged_count = 0
             
-            for product in products:
-                product_file = storage_dir / f"{product}.json"
-                if not product_file.exists():
-                    continue
-                
-                with open(product_file, 'r', encoding='utf-8') as f:
-                    product_data = json.load(f)
-                
-                modified = False
-                feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-                if not feature_data:
-                    continue
-                
-                for feature in feature_data.get('features', []):
-                    tags = feature.get('tags', [])
-                    if not isinstance(tags, list):
-                        continue
-                    
-                    if tag_type == 'primary':
-                        # 处理一级标签
-                        old_tag = next((t for t in tags if isinstance(t, dict) and t.get('name') == old_name), None)
-                        new_tag = next((t for t in tags if isinstance(t, dict) and t.get('name') == new_name), None)
-                        
-                        if old_tag:
-                            if new_tag and is_merge:
-                                # 合并：将旧标签的 subtags 合并到新标签
-                                existing = {s.get('name') for s in new_tag.get('subtags', []) if isinstance(s, dict)}
-                                for s in old_tag.get('subtags', []):
-                                    if isinstance(s, dict) and s.get('name') not in existing:
-                                        new_tag.setdefault('subtags', []).append(s)
-                                # 删除旧标签
-                                feature['tags'] = [t for t in tags if not (isinstance(t, dict) and t.get('name') == old_name)]
-                                merged_count += 1
-                            else:
-                                # 重命名
-                                old_tag['name'] = new_name
-                            modified = True
-                    else:
-                        # 处理二级标签
-                        for tag in tags:
-                            if not isinstance(tag, dict):
-                                continue
-                            subtags = tag.get('subtags', [])
-                            if not isinstance(subtags, list):
-                                continue
-                            
-                            old_subtag_idx = next((i for i, s in enumerate(subtags) if isinstance(s, dict) and s.get('name') == old_name), None)
-                            new_subtag_exists = any(isinstance(s, dict) and s.get('name') == new_name for s in subtags)
-                            
-                            if old_subtag_idx is not None:
-                                if new_subtag_exists and is_merge:
-                                    # 合并：删除旧的（新的已存在）
-                                    subtags.pop(old_subtag_idx)
-                                    merged_count += 1
-                                else:
-                                    # 重命名
-                                    subtags[old_subtag_idx]['name'] = new_name
-                                modified = True
-                
-                if modified:
-                    with open(product_file, 'w', encoding='utf-8') as f:
-                        json.dump(product_data, f, ensure_ascii=False, indent=4)
+            # 各产品文件互不相关，并行读取和修改
+            with ThreadPoolExecutor(max_workers=RENAME_WORKERS) as executor:
+                results = list(executor.map(
+                    lambda item: rename_tag_in_product(item[0], item[1], old_name, new_name, tag_type, is_merge),
+                    PRODUCT_FILES.items()
+                ))
+            
+            for product_file, (product_data, product_merged) in zip(PRODUCT_FILES.values(), results):
+                merged_count += product_merged
+                if product_data is not None:
+                    pending_writes.append((product_file, product_data))
                     updated_count += 1
             
-            self.send_json_response(200, {
-                "status": "merged" if is_merge else "renamed",
-                "updated_products": updated_count,
-                "merged_items": merged_count if is_merge else 0
-            })
+            for path, file_data in pending_writes:
+                save_json(path, file_data)
         
-        elif path == "/api/admin/features":
-            # 获取产品的 features 列表
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
+        self.send_json_response(200, {
+            "status": "merged" if is_merge else "renamed",
+            "updated_products": updated_count,
+            "merged_items": merged_count if is_merge else 0
+        })
+    
+    def handle_post_tag_bulk_rename(self):
+        """批量重命名/合并标签：按顺序执行多个重命名，每个产品文件只读写一次"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        items = data.get('renames')
+        if not isinstance(items, list) or not items:
+            self.send_json_response(400, {"error": "缺少 renames"})
+            return
+        
+        # 先校验全部条目，有无效条目时不做任何修改
+        renames = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get('old_name') or not item.get('new_name'):
+                self.send_json_response(400, {"error": "缺少 old_name 或 new_name"})
                 return
-            
-            product = data.get('product', 'youware')
-            page = data.get('page', 1)
-            page_size = data.get('page_size', 20)
-            search = data.get('search', '')
-            
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            if item['old_name'] == item['new_name']:
+                self.send_json_response(400, {"error": f"新旧名称相同: {item['old_name']}"})
                 return
+            renames.append((item['old_name'], item['new_name'], item.get('type', 'subtag')))
+        
+        # 与单个重命名相同，读取到写回之间持有 tag.json 和产品文件的写锁
+        with lock_files([TAG_FILE, *PRODUCT_FILES.values()]):
+            # 1. 依次更新 tag.json，得到每个重命名是否为合并
+            tag_file = TAG_FILE
+            with open(tag_file, 'r', encoding='utf-8') as f:
+                tags_data = json.load(f)
             
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data:
-                self.send_json_response(200, {"features": [], "total": 0, "page": page})
-                return
+            renames = [
+                (old_name, new_name, tag_type, rename_tag_in_tag_data(tags_data, old_name, new_name, tag_type))
+                for old_name, new_name, tag_type in renames
+            ]
             
-            all_features = feature_data.get('features', [])
+            # 2. 更新所有产品文件，同样先在内存中改完再统一写入
+            pending_writes = [(tag_file, tags_data)]
+            updated_count = 0
+            merged_counts = [0] * len(renames)
+            
+            with ThreadPoolExecutor(max_workers=RENAME_WORKERS) as executor:
+                results = list(executor.map(
+                    lambda item: bulk_rename_tags_in_product(item[0], item[1], renames),
+                    PRODUCT_FILES.items()
+                ))
+            
+            for product_file, (product_data, product_merged) in zip(PRODUCT_FILES.values(), results):
+                merged_counts = [a + b for a, b in zip(merged_counts, product_merged)]
+                if product_data is not None:
+                    pending_writes.append((product_file, product_data))
+                    updated_count += 1
             
-            # 搜索过滤
-            if search:
-                search_lower = search.lower()
-                all_features = [
-                    (idx, f) for idx, f in enumerate(all_features)
-                    if search_lower in f.get('title', '').lower() or 
-                       search_lower in f.get('description', '').lower()
+            for path, file_data in pending_writes:
+                save_json(path, file_data)
+        
+        self.send_json_response(200, {
+            "results": [
+                {
+                    "old_name": old_name,
+                    "new_name": new_name,
+                    "type": tag_type,
+                    "status": "merged" if is_merge else "renamed",
+                    "merged_items": merged if is_merge else 0
+                }
+                for (old_name, new_name, tag_type, is_merge), merged in zip(renames, merged_counts)
+            ],
+            "updated_products": updated_count
+        })
+    
+    def handle_post_features(self):
+        """获取产品的 features 列表"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product', 'youware')
+        page = data.get('page', 1)
+        page_size = data.get('page_size', 20)
+        search = data.get('search', '')
+        
+        product_file = get_product_file(product)
+        try:
+            product_data = load_json_cached(product_file)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        
+        all_features = get_feature_list(product_data)
+        if all_features is None:
+            self.send_json_response(200, {"features": [], "total": 0, "page": page})
+            return
+        
+        # 搜索过滤：只收集匹配功能的下标，不为每个功能构建 (下标, 功能) 元组
+        if search:
+            search_lower = search.lower()
+            search_texts = load_product_index(product, product_file)['search_texts']
+            if len(search_texts) != len(all_features):
+                # 两次读取之间文件被改写，索引与功能列表不一致时按当前列表现算
+                search_texts = [
+                    (str(f.get('title') or '').lower(), str(f.get('description') or '').lower())
+                    for f in all_features
                 ]
-            else:
-                all_features = [(idx, f) for idx, f in enumerate(all_features)]
-            
-            total = len(all_features)
-            
-            # 分页
-            start = (page - 1) * page_size
-            end = start + page_size
-            page_features = all_features[start:end]
-            
-            # 构建返回数据
-            result_features = []
-            for idx, f in page_features:
-                result_features.append({
-                    'index': idx,
-                    'title': f.get('title', ''),
-                    'description': f.get('description', ''),
-                    'time': f.get('time', ''),
-                    'tags': f.get('tags', [])
-                })
-            
-            self.send_json_response(200, {
-                "features": result_features,
-                "total": total,
-                "page": page,
-                "page_size": page_size
+            matched = [
+                idx for idx, (title, description) in enumerate(search_texts)
+                if search_lower in title or search_lower in description
+            ]
+        else:
+            # range 切片与列表切片规则一致，且不需要生成完整列表
+            matched = range(len(all_features))
+        
+        total = len(matched)
+        
+        # 分页
+        start = (page - 1) * page_size
+        end = start + page_size
+        page_features = [(idx, all_features[idx]) for idx in matched[start:end]]
+        
+        # 构建返回数据
+        result_features = []
+        for idx, f in page_features:
+            result_features.append({
+                'index': idx,
+                'title': f.get('title', ''),
+                'description': f.get('description', ''),
+                'time': f.get('time', ''),
+                'tags': f.get('tags', [])
             })
         
-        elif path == "/api/admin/feature/add":
-            # 添加新功能条目
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product', 'youware')
-            title = data.get('title', '').strip()
-            description = data.get('description', '').strip()
-            time_str = data.get('time', '')
-            auto_tag = data.get('auto_tag', True)
-            
-            if not title:
-                self.send_json_response(400, {"error": "标题不能为空"})
-                return
-            
-            # 加载产品 JSON
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data:
-                self.send_json_response(404, {"error": "找不到 feature 数据"})
-                return
-            
-            # 创建新功能
-            new_feature = {
-                "title": title,
-                "description": description,
-                "time": time_str or datetime.now().strftime("%Y-%m-%d")
-            }
-            
+        self.send_json_response(200, {
+            "features": result_features,
+            "total": total,
+            "page": page,
+            "page_size": page_size
+        })
+    
+    def handle_post_feature_add(self):
+        """添加新功能条目"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product', 'youware')
+        title = data.get('title', '').strip()
+        description = data.get('description', '').strip()
+        time_str = data.get('time', '')
+        auto_tag = data.get('auto_tag', True)
+        
+        if not title:
+            self.send_json_response(400, {"error": "标题不能为空"})
+            return
+        
+        # 创建新功能
+        new_feature = {
+            "title": title,
+            "description": description,
+            "time": time_str or datetime.now().strftime("%Y-%m-%d")
+        }
+        
+        def insert(product_data):
+            features = get_feature_list(product_data)
+            if features is None:
+                return None
             # 插入到最前面
-            feature_data['features'].insert(0, new_feature)
-            
-            # 保存
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            # 如果需要自动打标
-            if auto_tag:
-                def run_tag():
-                    root = get_project_root()
-                    if root == Path("/app"):
-                        script_path = root / "llm_tagger.py"
-                    else:
-                        script_path = root / "script" / "llm_tagger.py"
-                    try:
-                        subprocess.run(
-                            [sys.executable, str(script_path), "--file", f"{product}.json"],
-                            capture_output=True,
-                            text=True,
-                            timeout=120
-                        )
-                    except Exception as e:
-                        print(f"自动打标失败: {e}")
-                
-                thread = threading.Thread(target=run_tag)
-                thread.start()
-            
-            self.send_json_response(200, {"status": "added", "auto_tag": auto_tag})
+            features.insert(0, new_feature)
+            return new_feature
         
-        elif path == "/api/admin/feature/edit":
-            # 编辑功能条目（标题、描述、日期）
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product', 'youware')
-            feature_index = data.get('feature_index')
-            title = data.get('title')
-            description = data.get('description')
-            time_str = data.get('time')
-            
-            if feature_index is None:
-                self.send_json_response(400, {"error": "缺少 feature_index"})
-                return
-            
-            # 加载产品 JSON
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data or feature_index >= len(feature_data.get('features', [])):
-                self.send_json_response(404, {"error": "找不到指定的 feature"})
-                return
-            
-            feature = feature_data['features'][feature_index]
-            
+        product_file = get_product_file(product)
+        try:
+            added = update_json_file(product_file, insert)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if added is None:
+            self.send_json_response(404, {"error": "找不到 feature 数据"})
+            return
+        
+        # 如果需要自动打标：与其他打标任务互斥，已有打标任务在运行时不再启动（新条目下次打标时处理）
+        tagging = None
+        if auto_tag:
+            if claim_task("tagging"):
+                # 时限与原先自动打标子进程的超时一致
+                run_task_async("llm_tagger", partial(llm_tagger.process_all_features, target_file=f"{product}.json"),
+                               task_type="tagging", timeout=120)
+                tagging = "started"
+            else:
+                tagging = "already_running"
+        
+        self.send_json_response(200, {"status": "added", "auto_tag": tagging == "started", "tagging": tagging})
+    
+    def handle_post_feature_edit(self):
+        """编辑功能条目（标题、描述、日期）"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product', 'youware')
+        feature_index = data.get('feature_index')
+        title = data.get('title')
+        description = data.get('description')
+        time_str = data.get('time')
+        
+        if feature_index is None:
+            self.send_json_response(400, {"error": "缺少 feature_index"})
+            return
+        
+        def edit(product_data):
+            feature = find_feature(product_data, feature_index)
+            if feature is None:
+                return None
             # 更新字段
             if title is not None:
                 feature['title'] = title
@@ -1175,68 +1634,87 @@ class APIHandler(BaseHTTPRequestHandler):
                 feature['description'] = description
             if time_str is not None:
                 feature['time'] = time_str
-            
-            # 保存
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "updated"})
+            return feature
         
-        elif path == "/api/admin/feature/delete":
-            # 删除功能条目
-            token = self.get_auth_token()
-            if not verify_session(token):
-                self.send_json_response(401, {"error": "未授权访问"})
-                return
-            
-            body = self.read_request_body()
-            try:
-                data = json.loads(body)
-            except:
-                self.send_json_response(400, {"error": "无效的 JSON"})
-                return
-            
-            product = data.get('product', 'youware')
-            feature_index = data.get('feature_index')
-            
-            if feature_index is None:
-                self.send_json_response(400, {"error": "缺少 feature_index"})
-                return
-            
-            # 加载产品 JSON
-            product_file = get_project_root() / "storage" / f"{product}.json"
-            if not product_file.exists():
-                self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
-                return
-            
-            with open(product_file, 'r', encoding='utf-8') as f:
-                product_data = json.load(f)
-            
-            feature_data = next((item for item in product_data if item.get('name') == 'feature'), None)
-            if not feature_data or feature_index >= len(feature_data.get('features', [])):
-                self.send_json_response(404, {"error": "找不到指定的 feature"})
-                return
-            
-            # 删除
-            deleted = feature_data['features'].pop(feature_index)
-            
-            # 保存
-            with open(product_file, 'w', encoding='utf-8') as f:
-                json.dump(product_data, f, ensure_ascii=False, indent=4)
-            
-            self.send_json_response(200, {"status": "deleted", "deleted_title": deleted.get('title', '')})
-            
-        else:
-            self.send_response(404)
-            self.end_headers()
+        product_file = get_product_file(product)
+        try:
+            feature = update_json_file(product_file, edit)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if feature is None:
+            self.send_json_response(404, {"error": "找不到指定的 feature"})
+            return
+        
+        self.send_json_response(200, {"status": "updated"})
+    
+    def handle_post_feature_delete(self):
+        """删除功能条目"""
+        data = self.read_authorized_json()
+        if data is None:
+            return
+        
+        product = data.get('product', 'youware')
+        feature_index = data.get('feature_index')
+        
+        if feature_index is None:
+            self.send_json_response(400, {"error": "缺少 feature_index"})
+            return
+        
+        def delete(product_data):
+            if find_feature(product_data, feature_index) is None:
+                return None
+            return get_feature_list(product_data).pop(feature_index)
+        
+        product_file = get_product_file(product)
+        try:
+            deleted = update_json_file(product_file, delete)
+        except FileNotFoundError:
+            self.send_json_response(404, {"error": f"产品文件不存在: {product}"})
+            return
+        if deleted is None:
+            self.send_json_response(404, {"error": "找不到指定的 feature"})
+            return
+        
+        self.send_json_response(200, {"status": "deleted", "deleted_title": deleted.get('title', '')})
+    
+    # 路由表：路径 -> 处理方法，按字典查找分发，不再逐个比较 if/elif 分支
+    GET_ROUTES = {
+        "/api/admin/changelog": handle_get_changelog,
+        "/api/status": handle_get_status,
+        "/api/admin/logs": handle_get_logs,
+        "/api/admin/others": handle_get_others,
+        "/api/admin/tags": handle_get_tags,
+        "/api/admin/untagged": handle_get_untagged,
+        "/api/admin/used-subtags": handle_get_used_subtags,
+    }
+    
+    POST_ROUTES = {
+        "/api/admin/login": handle_post_login,
+        "/api/admin/changelog": handle_post_changelog,
+        "/api/admin/logout": handle_post_logout,
+        "/api/admin/config": handle_post_config,
+        "/api/run-crawl": handle_post_run_crawl,
+        "/api/run-summary": handle_post_run_summary,
+        "/api/run-tag-all": handle_post_run_tag_all,
+        "/api/admin/others/update": handle_post_others_update,
+        "/api/admin/feature/update-tags": handle_post_feature_update_tags,
+        "/api/admin/feature/mark-none": handle_post_feature_mark_none,
+        "/api/admin/tag/rename": handle_post_tag_rename,
+        "/api/admin/tag/bulk-rename": handle_post_tag_bulk_rename,
+        "/api/admin/features": handle_post_features,
+        "/api/admin/feature/add": handle_post_feature_add,
+        "/api/admin/feature/edit": handle_post_feature_edit,
+        "/api/admin/feature/delete": handle_post_feature_delete,
+    }
     
     def do_OPTIONS(self):
         # CORS 预检请求
-        self.send_response(200)
-        self.send_header("Access-Control-Allow-Origin", "*")
-        self.send_header("Access-Control-Allow-Methods", "GET, POST, OPTIONS")
-        self.send_header("Access-Control-Allow-Headers", "Content-Type, Authorization")
-        self.end_headers()
+        self.send_empty_response(200, {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization"
+        })
     
     def log_message(self, format, *args):
         print(f"[API] {args[0]}")
@@ -1244,7 +1722,8 @@ class APIHandler(BaseHTTPRequestHandler):
 
 def main():
     port = 3003
-    server = HTTPServer(("0.0.0.0", port), APIHandler)
+    # 每个请求一个线程，长耗时请求不会阻塞 /api/status 轮询
+    server = ThreadingHTTPServer(("0.0.0.0", port), APIHandler)
     print(f"API 服务器运行在 http://0.0.0.0:{port}")
     print("可用接口:")
     print("  POST /api/admin/login     - 管理员登录")
@@ -5,13 +5,21 @@ Base44 Changelog Crawler
 点击每个 Read more 链接获取完整描述
 """
 
-import json
 import re
 from datetime import datetime
-from pathlib import Path
+from functools import lru_cache
 from playwright.sync_api import sync_playwright
 
+from common import launch_browser, new_context, run_crawler, scroll_to_bottom
 
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "base44", "url": "https://base44.com/changelog"}
+
+# 详情页正文段落（与下面提取描述时的选择器一致）
+DETAIL_CONTENT_SELECTOR = 'main p, article p, .content p, [class*="content"] p, [class*="body"] p'
+
+
+@lru_cache(maxsize=256)
 def parse_month_year(month_year: str) -> str:
     """
     将月份年份转换为日期 (取该月1日)
@@ -43,18 +51,21 @@ def crawl_base44_changelog():
     features = []
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = launch_browser(p)
+        context = new_context(browser)
+        page = context.new_page()
         
         print(f"正在访问 {url}...")
         page.goto(url, wait_until="domcontentloaded", timeout=90000)
-        page.wait_for_timeout(5000)
+        # Read more 链接出现即开始处理，不再固定等待 5 秒
+        try:
+            page.wait_for_selector('a[href*="/changelog/feature/"]', timeout=15000)
+        except:
+            pass
         
-        # 滚动加载所有内容
+        # 滚动加载所有内容：到底部且 2 秒内没有新内容即停止，不再固定滚动 15 次
         print("滚动加载页面内容...")
-        for i in range(15):
-            page.evaluate("window.scrollBy(0, 2000)")
-            page.wait_for_timeout(400)
+        scroll_to_bottom(page, max_rounds=15, step=2000)
         
         page.evaluate("window.scrollTo(0, 0)")
         page.wait_for_timeout(1000)
@@ -65,19 +76,51 @@ def crawl_base44_changelog():
             () => {
                 const entries = [];
                 const seen = new Set();
-                let currentMonth = '';
                 
-                // 遍历页面内容，查找月份和条目
-                const allElements = document.querySelectorAll('*');
+                // 正则只编译一次
+                const MONTH_PREFIX_RE = /^(January|February|March|April|May|June|July|August|September|October|November|December)/;
+                const MONTH_RE = /(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d{4}/;
+                const SKIP_TITLES = new Set(['Read more', 'New Releases', 'Improvements', 'Bug Fixes']);
                 
-                allElements.forEach(el => {
-                    const text = el.innerText?.trim() || '';
-                    
-                    // 检查是否是月份格式
-                    if (/^(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d{4}$/.test(text)) {
-                        currentMonth = text;
+                // 多个链接共享同一批祖先元素，外层祖先的 querySelectorAll 结果也包含内层的全部元素，
+                // 按元素缓存 innerText（会触发布局计算）以及匹配到的标题、月份，每个元素只读取一次
+                const textCache = new Map();
+                const textOf = (el) => {
+                    if (!textCache.has(el)) {
+                        textCache.set(el, el.innerText || '');
                     }
-                });
+                    return textCache.get(el);
+                };
+                
+                const titleCache = new Map();
+                const titleOf = (el) => {
+                    if (!titleCache.has(el)) {
+                        let found = '';
+                        // 查找同级或父级的标题元素
+                        for (const sib of el.querySelectorAll('p, span, h1, h2, h3, h4')) {
+                            const sibText = textOf(sib).trim();
+                            if (sibText && 
+                                sibText.length > 3 && 
+                                sibText.length < 200 &&
+                                !SKIP_TITLES.has(sibText) &&
+                                !MONTH_PREFIX_RE.test(sibText)) {
+                                found = sibText;
+                                break;
+                            }
+                        }
+                        titleCache.set(el, found);
+                    }
+                    return titleCache.get(el);
+                };
+                
+                const monthCache = new Map();
+                const monthOf = (el) => {
+                    if (!monthCache.has(el)) {
+                        const match = textOf(el).match(MONTH_RE);
+                        monthCache.set(el, match ? match[0] : '');
+                    }
+                    return monthCache.get(el);
+                };
                 
                 // 查找所有 Read more 链接
                 const readMoreLinks = document.querySelectorAll('a[href*="/changelog/feature/"]');
@@ -91,22 +134,7 @@ def crawl_base44_changelog():
                     let attempts = 0;
                     
                     while (parent && attempts < 5) {
-                        // 查找同级或父级的标题元素
-                        const siblings = parent.querySelectorAll('p, span, h1, h2, h3, h4');
-                        for (const sib of siblings) {
-                            const sibText = sib.innerText?.trim();
-                            if (sibText && 
-                                sibText.length > 3 && 
-                                sibText.length < 200 &&
-                                sibText !== 'Read more' && 
-                                sibText !== 'New Releases' && 
-                                sibText !== 'Improvements' &&
-                                sibText !== 'Bug Fixes' &&
-                                !/^(January|February|March|April|May|June|July|August|September|October|November|December)/.test(sibText)) {
-                                title = sibText;
-                                break;
-                            }
-                        }
+                        title = titleOf(parent);
                         if (title) break;
                         parent = parent.parentElement;
                         attempts++;
@@ -118,13 +146,8 @@ def crawl_base44_changelog():
                     attempts = 0;
                     
                     while (parent && attempts < 10) {
-                        const monthPattern = /(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d{4}/;
-                        const parentText = parent.innerText || '';
-                        const match = parentText.match(monthPattern);
-                        if (match) {
-                            month = match[0];
-                            break;
-                        }
+                        month = monthOf(parent);
+                        if (month) break;
                         parent = parent.parentElement;
                         attempts++;
                     }
@@ -157,7 +180,11 @@ def crawl_base44_changelog():
                 try:
                     print(f"  [{i+1}/{len(entries)}] 获取详情: {title[:40]}...")
                     page.goto(detail_url, wait_until="domcontentloaded", timeout=30000)
-                    page.wait_for_timeout(2000)
+                    # 正文段落出现即可提取，不再固定等待 2 秒
+                    try:
+                        page.wait_for_selector(DETAIL_CONTENT_SELECTOR, timeout=5000)
+                    except:
+                        pass
                     
                     # 提取详情页描述
                     description = page.evaluate("""
@@ -214,47 +241,8 @@ def crawl_base44_changelog():
     return features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {"name": "base44", "url": "https://base44.com/changelog"},
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "base44.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("Base44 Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_base44_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Base44 Changelog Crawler", crawl_base44_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
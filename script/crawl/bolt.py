@@ -5,12 +5,17 @@ Bolt Changelog Crawler
 获取所有 New Features 和 Improvements（包括列表项）
 """
 
-import json
 import re
-from datetime import datetime
-from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from common import MONTHS, format_date, launch_browser, new_context, run_crawler, scroll_to_bottom
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "bolt", "url": "https://support.bolt.new/release-notes"}
+
+MONTH_YEAR_RE = re.compile(r'^([A-Za-z]+)\s+(\d{4})$')
+MONTH_DAY_RE = re.compile(r'([A-Za-z]+)\s*(\d+)')
+
 
 def parse_date_range(date_str: str) -> str:
     """
@@ -23,7 +28,7 @@ def parse_date_range(date_str: str) -> str:
     date_str = date_str.strip()
     
     # 处理纯月份格式 "June 2025", "September 2025"
-    month_year_match = re.match(r'^([A-Za-z]+)\s+(\d{4})$', date_str)
+    month_year_match = MONTH_YEAR_RE.match(date_str)
     if month_year_match:
         return date_str  # 保留原格式
     
@@ -33,20 +38,13 @@ def parse_date_range(date_str: str) -> str:
         year = "2026"
     
     # 提取所有月份和日期
-    month_day_patterns = re.findall(r'([A-Za-z]+)\s*(\d+)', date_str)
+    month_day_patterns = MONTH_DAY_RE.findall(date_str)
     
     if month_day_patterns:
-        # 取最后一个月日组合
+        # 取最后一个月日组合（月份须为英文全称或缩写，日期须在该月天数内）
         month, day = month_day_patterns[-1]
-        try:
-            dt = datetime.strptime(f"{month} {day} {year}", "%b %d %Y")
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            try:
-                dt = datetime.strptime(f"{month} {day} {year}", "%B %d %Y")
-                return dt.strftime("%Y-%m-%d")
-            except ValueError:
-                pass
+        if len(day) <= 2:
+            return format_date(int(year), month, int(day)) or date_str
     
     return date_str
 
@@ -58,18 +56,21 @@ def crawl_bolt_changelog():
     
     with sync_playwright() as p:
         # 使用 headless 模式（Docker 环境必须）
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = launch_browser(p)
+        context = new_context(browser)
+        page = context.new_page()
         
         print(f"正在访问 {url}...")
         page.goto(url, wait_until="domcontentloaded", timeout=90000)
-        page.wait_for_timeout(5000)
+        # 功能标题出现即开始处理，不再固定等待 5 秒
+        try:
+            page.wait_for_selector("h3", timeout=15000)
+        except:
+            pass
         
-        # 滚动加载所有内容
+        # 滚动加载所有内容：未到底部时直接继续滚动；到底部后等待新内容撑高页面，2 秒内没有变化视为加载完毕
         print("滚动加载页面内容...")
-        for i in range(25):
-            page.evaluate("window.scrollBy(0, 2000)")
-            page.wait_for_timeout(300)
+        scroll_to_bottom(page, max_rounds=25, step=2000)
         
         page.evaluate("window.scrollTo(0, 0)")
         page.wait_for_timeout(1000)
@@ -81,6 +82,14 @@ def crawl_bolt_changelog():
                 const features = [];
                 const seen = new Set();
                 
+                // 分类标题，不作为功能条目
+                const SKIP_TITLES = new Set(['New features', 'Improvements', 'Bug fixes', 'New features - Bolt V2']);
+                
+                // 日期文本判断（正则只编译一次）
+                const DATE_TEXT_RE = /[A-Za-z]+.*\\d/;
+                const MONTH_YEAR_RE = /^[A-Za-z]+\\s+\\d{4}$/;
+                const isDateText = (text) => DATE_TEXT_RE.test(text) || MONTH_YEAR_RE.test(text);
+                
                 // 首先收集所有日期节点
                 const dateInfo = {};
                 const dateContainers = document.querySelectorAll('a[href^="#"]');
@@ -89,45 +98,76 @@ def crawl_bolt_changelog():
                     const dateSpan = link.parentElement?.querySelector('[class*="cursor-pointer"]');
                     if (dateSpan) {
                         const text = dateSpan.innerText?.trim() || '';
-                        if (text && (text.match(/[A-Za-z]+.*\\d/) || text.match(/^[A-Za-z]+\\s+\\d{4}$/))) {
+                        if (text && isDateText(text)) {
                             dateInfo[href] = text;
                         }
                     }
                 });
                 
+                // 兄弟节点自身包含的日期（日期链接或日期文本），没有时为空字符串
+                function dateIn(el) {
+                    const dateLink = el.querySelector('a[href^="#"]');
+                    if (dateLink) {
+                        const href = dateLink.getAttribute('href')?.replace('#', '');
+                        if (href && dateInfo[href]) {
+                            return dateInfo[href];
+                        }
+                    }
+                    // 直接检查文本
+                    const dateSpan = el.querySelector('[class*="cursor-pointer"]');
+                    if (dateSpan) {
+                        const text = dateSpan.innerText?.trim();
+                        if (text && isDateText(text)) {
+                            return text;
+                        }
+                    }
+                    return '';
+                }
+                
+                // 从某个兄弟节点往前找到的第一个日期，按节点缓存：
+                // 相邻兄弟共享同一段结果，每个节点只检查一次，整页为线性时间
+                const siblingDateCache = new Map();
+                function siblingDate(start) {
+                    const chain = [];
+                    let el = start;
+                    let result = '';
+                    while (el) {
+                        if (siblingDateCache.has(el)) {
+                            result = siblingDateCache.get(el);
+                            break;
+                        }
+                        chain.push(el);
+                        const date = dateIn(el);
+                        if (date) {
+                            result = date;
+                            break;
+                        }
+                        el = el.previousElementSibling;
+                    }
+                    // 链上的节点（含找到日期的节点）往前查找的结果都相同
+                    chain.forEach(node => siblingDateCache.set(node, result));
+                    return result;
+                }
+                
+                // 单个元素自身能确定的日期（id 或前面的兄弟节点），与查找起点无关
+                function localDate(el) {
+                    // 检查 id 属性
+                    const id = el.id;
+                    if (id && dateInfo[id]) {
+                        return dateInfo[id];
+                    }
+                    // 检查前面兄弟节点的日期
+                    return siblingDate(el.previousElementSibling);
+                }
+                
                 // 辅助函数：查找元素对应的日期
                 function findDate(element) {
                     let el = element;
                     let attempts = 0;
                     
                     while (el && attempts < 30) {
-                        // 检查 id 属性
-                        const id = el.id;
-                        if (id && dateInfo[id]) {
-                            return dateInfo[id];
-                        }
-                        
-                        // 检查前一个兄弟的日期
-                        let prev = el.previousElementSibling;
-                        while (prev) {
-                            const dateLink = prev.querySelector('a[href^="#"]');
-                            if (dateLink) {
-                                const href = dateLink.getAttribute('href')?.replace('#', '');
-                                if (href && dateInfo[href]) {
-                                    return dateInfo[href];
-                                }
-                            }
-                            // 直接检查文本
-                            const dateSpan = prev.querySelector('[class*="cursor-pointer"]');
-                            if (dateSpan) {
-                                const text = dateSpan.innerText?.trim();
-                                if (text && (text.match(/[A-Za-z]+.*\\d/) || text.match(/^[A-Za-z]+\\s+\\d{4}$/))) {
-                                    return text;
-                                }
-                            }
-                            prev = prev.previousElementSibling;
-                        }
-                        
+                        const date = localDate(el);
+                        if (date) return date;
                         el = el.parentElement;
                         attempts++;
                     }
@@ -143,7 +183,7 @@ def crawl_bolt_changelog():
                     
                     if (!title || title.length < 5 || seen.has(title)) return;
                     // 跳过分类标题
-                    if (['New features', 'Improvements', 'Bug fixes', 'New features - Bolt V2'].includes(title)) return;
+                    if (SKIP_TITLES.has(title)) return;
                     seen.add(title);
                     
                     const dateText = findDate(h3);
@@ -239,13 +279,13 @@ def crawl_bolt_changelog():
         t = x.get('time', '')
         if not t:
             return '0000-00-00'
-        # 处理 "June 2025" 格式
-        if re.match(r'^[A-Za-z]+\s+\d{4}$', t):
-            try:
-                dt = datetime.strptime(t, "%B %Y")
-                return dt.strftime("%Y-%m-01")
-            except:
-                return t
+        # 处理 "June 2025" 格式：查月份表，不再调用 strptime
+        match = MONTH_YEAR_RE.match(t)
+        if match:
+            month_name, year = match.groups()
+            month_num = MONTHS.get(month_name.lower())
+            if month_num:
+                return f"{year}-{month_num:02d}-01"
         return t
     
     features.sort(key=sort_key, reverse=True)
@@ -253,47 +293,8 @@ def crawl_bolt_changelog():
     return features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {"name": "bolt", "url": "https://support.bolt.new/release-notes"},
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "bolt.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("Bolt Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_bolt_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Bolt Changelog Crawler", crawl_bolt_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+爬虫公共函数
+各产品爬虫共用的 storage 目录定位、浏览器启动和上下文、滚动加载、数据保存和入口流程，爬虫脚本只保留各站点的抓取逻辑
+"""
+
+import calendar
+import os
+import sys
+from pathlib import Path
+
+# JSON 原子写入与 API 服务、监控脚本共用上级目录（本地为 script/，Docker 中为 /app）中的 json_io
+SCRIPT_DIR = Path(__file__).resolve().parent.parent
+if str(SCRIPT_DIR) not in sys.path:
+    sys.path.append(str(SCRIPT_DIR))
+
+from json_io import save_json
+
+# Chromium 启动参数：Docker 容器默认 /dev/shm 只有 64MB，多个爬虫并行运行时共享内存不足会导致页面崩溃，
+# 改为使用 /tmp
+BROWSER_ARGS = ["--disable-dev-shm-usage"]
+
+# 只抓取文本，不需要加载的资源类型。样式表不能拦截：提取依赖 innerText（隐藏元素不计入）
+# 和滚动加载时的页面高度，都需要样式表参与布局
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "texttrack", "manifest"}
+
+# 英文月份名（全称和缩写，小写）-> 月份，替代逐个格式尝试 strptime
+MONTHS = {}
+for _i, _name in enumerate(("january", "february", "march", "april", "may", "june", "july",
+                            "august", "september", "october", "november", "december"), 1):
+    MONTHS[_name] = _i
+    MONTHS[_name[:3]] = _i
+
+
+def get_storage_dir():
+    """获取 storage 目录（支持本地和 Docker 环境）"""
+    script_dir = Path(__file__).parent
+
+    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
+    if script_dir == Path("/app/crawl"):
+        return Path("/app/storage")
+
+    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
+    return script_dir.parent.parent / "storage"
+
+
+def get_cache_dir():
+    """爬虫缓存目录：与 storage 同级的 .cache（不提交到仓库，前端也访问不到）"""
+    return get_storage_dir().parent / ".cache"
+
+
+def get_output_dir():
+    """
+    爬取结果的输出目录：默认直接写入 storage；
+    monitor 通过环境变量 CRAWL_OUTPUT_DIR 指定暂存目录，合并保留已有 tags 后再由它写入 storage
+    """
+    output_dir = os.environ.get("CRAWL_OUTPUT_DIR")
+    return Path(output_dir) if output_dir else get_storage_dir()
+
+
+def format_date(year: int, month_name: str, day: int) -> str:
+    """
+    将年、英文月份名（全称或缩写）、日格式化为 YYYY-MM-DD，
+    月份名无法识别或日期不在该月天数内时返回空字符串
+    """
+    month_num = MONTHS.get(month_name.lower())
+    if not month_num or not 1 <= day <= calendar.monthrange(year, month_num)[1]:
+        return ""
+    return f"{year:04d}-{month_num:02d}-{day:02d}"
+
+
+def launch_browser(p):
+    """启动无头 Chromium（同步 API）"""
+    return p.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+
+def new_context(browser, **options):
+    """
+    为单个爬取目标新建浏览器上下文（同步 API），options 透传给 browser.new_context
+    只需要文本，不加载图片/字体/媒体，减少下载量和渲染时间
+    """
+    context = browser.new_context(**options)
+    context.route("**/*", lambda route: route.abort()
+                  if route.request.resource_type in BLOCKED_RESOURCE_TYPES
+                  else route.continue_())
+    return context
+
+
+def scroll_to_bottom(page, max_rounds: int = 100, step: int = None, settle_ms: int = 2000) -> int:
+    """
+    滚动加载页面内容（同步 API），返回滚动次数
+    step 为空时每次直接滚到底部，否则每次向下滚动 step 像素，未到底部时直接继续滚动；
+    到底部后等待新内容撑高页面，新内容一出现就继续滚动，settle_ms 内没有变化视为加载完毕
+    """
+    for scroll_round in range(max_rounds):
+        height, at_bottom = page.evaluate("""
+            (step) => {
+                if (step) {
+                    window.scrollBy(0, step);
+                } else {
+                    window.scrollTo(0, document.body.scrollHeight);
+                }
+                const height = document.body.scrollHeight;
+                return [height, window.innerHeight + window.scrollY >= height - 10];
+            }
+        """, step)
+        if step and not at_bottom:
+            continue
+        try:
+            page.wait_for_function("h => document.body.scrollHeight > h", arg=height, timeout=settle_ms)
+        except:
+            return scroll_round + 1
+    return max_rounds
+
+
+def save_data(product_info: dict, features: list):
+    """
+    保存数据到 storage/<name>.json（由 monitor 运行时写入其指定的暂存目录）
+    product_info 为产品信息（name、url 等），作为文件的第一个元素
+    """
+    output_dir = get_output_dir()
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    output_data = [
+        product_info,
+        {"name": "feature", "features": features}
+    ]
+
+    output_path = output_dir / f"{product_info['name']}.json"
+    save_json(output_path, output_data)
+
+    print(f"\n数据已保存到 {output_path}")
+    print(f"共 {len(features)} 条功能更新")
+
+
+def run_crawler(title: str, crawl_func, product_info: dict):
+    """爬虫入口：打印标题，运行爬取函数，有数据时保存"""
+    print("=" * 50)
+    print(title)
+    print("=" * 50)
+
+    features = crawl_func()
+
+    if features:
+        save_data(product_info, features)
+    else:
+        print("未获取到任何数据")
@@ -5,12 +5,15 @@ Lovable Changelog Crawler
 确保获取所有历史数据（从 Dec 3, 2024 开始）
 """
 
-import json
 import re
 from datetime import datetime
-from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from common import format_date, launch_browser, new_context, run_crawler, scroll_to_bottom
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "lovable", "url": "https://docs.lovable.dev/changelog"}
+
 
 def parse_date_from_id(date_id: str) -> str:
     """
@@ -20,25 +23,15 @@ def parse_date_from_id(date_id: str) -> str:
     if not date_id:
         return ""
     
-    # 清理并解析
-    date_id = date_id.lower().replace(",", "").replace("-", " ").strip()
-    # dec 23 2025
-    
-    month_map = {
-        'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4,
-        'may': 5, 'jun': 6, 'jul': 7, 'aug': 8,
-        'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
-    }
-    
-    parts = date_id.split()
+    # 清理并解析: dec 23 2025
+    parts = date_id.lower().replace(",", "").replace("-", " ").split()
     if len(parts) >= 3:
         month_str = parts[0]
         day_str = parts[1]
         year_str = parts[2]
         
-        month = month_map.get(month_str[:3], 0)
-        if month and day_str.isdigit() and year_str.isdigit():
-            return f"{year_str}-{month:02d}-{int(day_str):02d}"
+        if day_str.isdigit() and year_str.isdigit():
+            return format_date(int(year_str), month_str[:3], int(day_str))
     
     return ""
 
@@ -49,32 +42,22 @@ def crawl_lovable_changelog():
     features = []
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = launch_browser(p)
+        context = new_context(browser)
+        page = context.new_page()
         
         print(f"正在访问 {url}...")
         page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        page.wait_for_timeout(3000)
+        # 日期区块出现即开始处理，不再固定等待 3 秒
+        try:
+            page.wait_for_selector('div[id*="%2C-"]', timeout=15000)
+        except:
+            pass
         
-        # 滚动加载所有内容
+        # 滚动加载所有内容：滚到底部后等待页面变高，新内容一出现就继续滚动，2 秒内没有变化视为加载完毕
         print("滚动加载所有内容...")
-        last_height = 0
-        no_change_count = 0
-        
-        for scroll_round in range(100):
-            page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            page.wait_for_timeout(500)
-            
-            new_height = page.evaluate("document.body.scrollHeight")
-            
-            if new_height == last_height:
-                no_change_count += 1
-                if no_change_count >= 3:
-                    print(f"  页面加载完成 (滚动 {scroll_round + 1} 次)")
-                    break
-            else:
-                no_change_count = 0
-                last_height = new_height
+        rounds = scroll_to_bottom(page, max_rounds=100)
+        print(f"  页面加载完成 (滚动 {rounds} 次)")
         
         page.evaluate("window.scrollTo(0, 0)")
         page.wait_for_timeout(1000)
@@ -180,47 +163,8 @@ def crawl_lovable_changelog():
     return features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {"name": "lovable", "url": "https://docs.lovable.dev/changelog"},
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "lovable.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("Lovable Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_lovable_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Lovable Changelog Crawler", crawl_lovable_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
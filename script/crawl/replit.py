@@ -5,11 +5,27 @@ Replit Changelog Crawler
 Replit 使用分页结构，每周一个页面
 """
 
+import asyncio
 import json
 import re
+import xml.etree.ElementTree as ET
 from datetime import datetime
 from pathlib import Path
-from playwright.sync_api import sync_playwright
+import requests
+from playwright.async_api import async_playwright
+
+from common import BLOCKED_RESOURCE_TYPES, BROWSER_ARGS, format_date, get_cache_dir, run_crawler, save_json
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "replit", "url": "https://docs.replit.com/updates/"}
+
+# "January 09, 2026" / "Jan 09 2026" 等格式：月份 日[,] 年
+DATE_RE = re.compile(r'([A-Za-z]+)\s+(\d{1,2}),?\s+(\d{4})')
+# 更新页面 URL 中的日期: /updates/2026/01/09/changelog
+URL_DATE_RE = re.compile(r'/updates/(\d{4})/(\d{2})/(\d{2})/')
+ISO_DATE_RE = re.compile(r'\d{4}-\d{2}-\d{2}')
+# sitemap 中的更新页面地址: https://docs.replit.com/updates/2026/01/09/changelog
+CHANGELOG_URL_RE = re.compile(r'^https://docs\.replit\.com/updates/\d{4}/\d{2}/\d{2}/changelog$')
 
 
 def parse_date(date_str: str) -> str:
@@ -20,49 +36,200 @@ def parse_date(date_str: str) -> str:
     if not date_str:
         return ""
     
-    date_str = date_str.strip()
-    
-    formats = [
-        "%B %d, %Y",     # January 09, 2026
-        "%B %d %Y",      # January 09 2026
-        "%b %d, %Y",     # Jan 09, 2026
-        "%b %d %Y",      # Jan 09 2026
-    ]
-    
-    for fmt in formats:
-        try:
-            dt = datetime.strptime(date_str, fmt)
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            continue
+    match = DATE_RE.fullmatch(date_str.strip())
+    if not match:
+        return ""
     
-    return ""
+    return format_date(int(match.group(3)), match.group(1), int(match.group(2)))
 
 
 def extract_date_from_url(url: str) -> str:
     """从 URL 中提取日期"""
     # URL 格式: /updates/2026/01/09/changelog
-    match = re.search(r'/updates/(\d{4})/(\d{2})/(\d{2})/', url)
+    match = URL_DATE_RE.search(url)
     if match:
         return f"{match.group(1)}-{match.group(2)}-{match.group(3)}"
     return ""
 
 
-def crawl_replit_changelog():
-    """爬取 Replit changelog 页面"""
-    base_url = "https://docs.replit.com/updates/"
-    features = []
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+# 单个更新页面的功能提取脚本
+PAGE_FEATURES_SCRIPT = """
+    () => {
+        const features = [];
+        const seen = new Set();
+        
+        // 分类标题，不作为功能条目
+        const SKIP_TITLES = new Set(["What's new", "Platform", "Agent", "Core Agent", "Changelog"]);
         
+        // 查找所有 h3 标题
+        document.querySelectorAll('h3').forEach(h3 => {
+            const titleEl = h3.querySelector('[class*="cursor-pointer"]') || h3;
+            let title = titleEl.innerText?.trim();
+            
+            // 清理标题
+            title = title.replace('Navigate to header', '').trim();
+            
+            if (!title || title.length < 3 || seen.has(title)) return;
+            // 跳过分类标题
+            if (SKIP_TITLES.has(title)) return;
+            seen.add(title);
+            
+            // 获取描述
+            let desc = [];
+            let next = h3.nextElementSibling;
+            let count = 0;
+            
+            while (next && count < 5) {
+                if (next.matches('h2, h3')) break;
+                const txt = next.innerText?.trim();
+                if (txt && !txt.startsWith('Navigate')) {
+                    desc.push(txt);
+                }
+                next = next.nextElementSibling;
+                count++;
+            }
+            
+            features.push({
+                title: title,
+                description: desc.join('\\n').substring(0, 2000)
+            });
+        });
+        
+        return features;
+    }
+"""
+
+# 历史更新页面发布后基本不再修改，提取结果按 URL 缓存，再次运行时无需重新打开；
+# 最近 CACHE_MIN_AGE_DAYS 天内的页面仍可能补充内容，每次都重新爬取
+CACHE_MIN_AGE_DAYS = 14
+
+
+def get_cache_path() -> Path:
+    """页面缓存文件：放在与 storage 同级的 .cache 目录（不提交到仓库，前端也访问不到）"""
+    return get_cache_dir() / "replit_pages.json"
+
+
+def get_profile_dir() -> Path:
+    """
+    浏览器用户数据目录：保留 HTTP 磁盘缓存、TLS 会话和 cookie，
+    再次运行时索引页和各更新页面的脚本、样式可直接走缓存或 304
+    """
+    return get_cache_dir() / "replit_browser_profile"
+
+
+async def launch_context(p):
+    """启动带持久化用户数据目录的浏览器上下文；目录被其他进程占用等情况下退回普通上下文"""
+    profile_dir = get_profile_dir()
+    try:
+        profile_dir.mkdir(parents=True, exist_ok=True)
+        return await p.chromium.launch_persistent_context(
+            str(profile_dir),
+            headless=True,
+            args=[*BROWSER_ARGS, f"--disk-cache-size={DISK_CACHE_SIZE}"],
+        )
+    except Exception as e:
+        print(f"持久化浏览器目录不可用，使用临时上下文: {e}")
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        return await browser.new_context()
+
+
+def load_page_cache() -> dict:
+    """读取页面缓存 {url: [功能]}，不存在或损坏时返回空字典"""
+    try:
+        with open(get_cache_path(), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except:
+        return {}
+
+
+def save_page_cache(cache: dict):
+    """保存页面缓存（缓存写入失败不影响爬取结果）"""
+    cache_path = get_cache_path()
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        # 原子写入：中途被中断也不会留下半截缓存；不缩进时 json.dumps 走 C 编码器
+        save_json(cache_path, cache, indent=None)
+    except Exception as e:
+        print(f"保存页面缓存失败: {e}")
+
+
+def is_cacheable(parsed_date: str) -> bool:
+    """页面日期早于 CACHE_MIN_AGE_DAYS 天时才使用/写入缓存"""
+    try:
+        return (datetime.now() - datetime.strptime(parsed_date, "%Y-%m-%d")).days >= CACHE_MIN_AGE_DAYS
+    except ValueError:
+        return False
+
+
+# 同时打开的更新页面数：页面之间互不依赖，耗时主要在等待网络
+PAGE_WORKERS = 6
+
+# 浏览器 HTTP 磁盘缓存上限（100MB）
+DISK_CACHE_SIZE = 100 * 1024 * 1024
+
+
+async def block_heavy_resources(route):
+    """只需要文本，不加载图片/字体/媒体，减少索引页和每个更新页面的下载量"""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def crawl_page(context, url: str) -> list:
+    """在共享的浏览器上下文中新开一个标签页，打开单个更新页面并提取其中的功能"""
+    page = await context.new_page()
+    try:
+        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        # 功能标题出现即可提取，不再固定等待 2 秒
+        try:
+            await page.wait_for_selector("h3", timeout=5000)
+        except:
+            pass
+        return await page.evaluate(PAGE_FEATURES_SCRIPT)
+    finally:
+        await page.close()
+
+
+# 文档站 sitemap 列出了全部更新页面，直接请求即可拿到链接列表，无需启动浏览器渲染索引页；
+# 解析出的链接少于 SITEMAP_MIN_LINKS 个时视为结构有变，退回浏览器打开索引页
+SITEMAP_URL = "https://docs.replit.com/sitemap.xml"
+SITEMAP_MIN_LINKS = 5
+
+
+def fetch_sitemap_links() -> list:
+    """从 sitemap 获取更新页面链接，按日期从新到旧排列（与索引页顺序一致）；失败时返回空列表"""
+    try:
+        response = requests.get(SITEMAP_URL, timeout=15)
+        response.raise_for_status()
+        root = ET.fromstring(response.content)
+    except Exception as e:
+        print(f"获取 sitemap 失败: {e}")
+        return []
+    
+    urls = set()
+    for loc in root.findall(".//{*}loc"):
+        url = (loc.text or "").strip().rstrip("/")
+        if CHANGELOG_URL_RE.match(url):
+            urls.add(url)
+    
+    # URL 中的日期为定长数字，按字符串倒序即按日期从新到旧
+    return [{"url": url, "text": extract_date_from_url(url)} for url in sorted(urls, reverse=True)]
+
+
+async def fetch_index_links(context, base_url: str) -> list:
+    """用浏览器打开索引页，收集所有日期页面的链接"""
+    page = await context.new_page()
+    try:
         print(f"正在访问 {base_url}...")
-        page.goto(base_url, wait_until="domcontentloaded", timeout=60000)
-        page.wait_for_timeout(5000)
+        await page.goto(base_url, wait_until="domcontentloaded", timeout=60000)
+        # 更新页面链接出现即开始收集，不再固定等待 5 秒
+        try:
+            await page.wait_for_selector('a[href*="/updates/"][href*="/changelog"]', timeout=15000)
+        except:
+            pass
         
-        # 获取所有日期页面的链接
-        date_links = page.evaluate("""
+        return await page.evaluate("""
             () => {
                 const links = [];
                 const seen = new Set();
@@ -83,139 +250,113 @@ def crawl_replit_changelog():
                 return links;
             }
         """)
+    finally:
+        await page.close()
+
+
+def crawl_replit_changelog():
+    """爬取 Replit changelog 页面"""
+    return asyncio.run(crawl_replit_changelog_async())
+
+
+async def crawl_replit_changelog_async():
+    """
+    爬取 Replit changelog 页面（异步）
+    链接列表优先取自 sitemap；历史页面命中缓存时不再打开，全部命中时不启动浏览器
+    需要爬取的页面在同一个浏览器上下文中并发打开（最多 PAGE_WORKERS 个），结果仍按索引页顺序汇总
+    """
+    base_url = "https://docs.replit.com/updates/"
+    features = []
+    
+    print(f"正在获取 {SITEMAP_URL}...")
+    date_links = await asyncio.to_thread(fetch_sitemap_links)
+    if len(date_links) < SITEMAP_MIN_LINKS:
+        date_links = None
+    
+    async with async_playwright() as p:
+        context = None
+        
+        async def get_context():
+            nonlocal context
+            if context is None:
+                context = await launch_context(p)
+                await context.route("**/*", block_heavy_resources)
+            return context
+        
+        if date_links is None:
+            date_links = await fetch_index_links(await get_context(), base_url)
         
         print(f"找到 {len(date_links)} 个更新页面")
         
-        # 处理所有更新页面
+        page_cache = load_page_cache()
+        used_cache = {}  # 本次仍在列表中的页面，保存时只保留这些，缓存不会无限增长
+        
+        # 先确定每个页面的日期并查缓存，得到需要用浏览器打开的页面
+        entries = []  # [url, 原始日期文本, 解析后的日期, 功能列表（未爬取时为 None）]
         for link_info in date_links:
-            try:
-                url = link_info['url']
-                date_text = link_info['text']
-                
-                # 优先从 URL 提取日期
-                parsed_date = extract_date_from_url(url)
-                if not parsed_date:
-                    parsed_date = parse_date(date_text)
-                
-                # 跳过无效日期
-                if not parsed_date or not re.match(r'\d{4}-\d{2}-\d{2}', parsed_date):
-                    continue
-                
-                print(f"  正在爬取 {parsed_date} ({date_text})...")
-                
-                page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                page.wait_for_timeout(2000)
-                
-                # 提取该页面的所有功能
-                page_features = page.evaluate("""
-                    () => {
-                        const features = [];
-                        const seen = new Set();
-                        
-                        // 查找所有 h3 标题
-                        document.querySelectorAll('h3').forEach(h3 => {
-                            const titleEl = h3.querySelector('[class*="cursor-pointer"]') || h3;
-                            let title = titleEl.innerText?.trim();
-                            
-                            // 清理标题
-                            title = title.replace('Navigate to header', '').trim();
-                            
-                            if (!title || title.length < 3 || seen.has(title)) return;
-                            // 跳过分类标题
-                            if (["What's new", "Platform", "Agent", "Core Agent", "Changelog"].includes(title)) return;
-                            seen.add(title);
-                            
-                            // 获取描述
-                            let desc = [];
-                            let next = h3.nextElementSibling;
-                            let count = 0;
-                            
-                            while (next && count < 5) {
-                                if (next.matches('h2, h3')) break;
-                                const txt = next.innerText?.trim();
-                                if (txt && !txt.startsWith('Navigate')) {
-                                    desc.push(txt);
-                                }
-                                next = next.nextElementSibling;
-                                count++;
-                            }
-                            
-                            features.push({
-                                title: title,
-                                description: desc.join('\\n').substring(0, 2000)
-                            });
-                        });
-                        
-                        return features;
-                    }
-                """)
-                
-                for feat in page_features:
-                    features.append({
-                        "title": feat['title'],
-                        "description": feat['description'],
-                        "time": parsed_date,
-                        "tags": []
-                    })
-                    print(f"    ✓ {feat['title'][:50]}...")
-                    
-            except Exception as e:
-                print(f"    ✗ 爬取失败: {e}")
+            url = link_info['url']
+            date_text = link_info['text']
+            
+            # 优先从 URL 提取日期
+            parsed_date = extract_date_from_url(url)
+            if not parsed_date:
+                parsed_date = parse_date(date_text)
+            
+            # 跳过无效日期
+            if not parsed_date or not ISO_DATE_RE.match(parsed_date):
                 continue
+            
+            # 历史页面优先使用缓存的提取结果，不再打开页面
+            page_features = page_cache.get(url) if is_cacheable(parsed_date) else None
+            if page_features is not None:
+                print(f"  使用缓存 {parsed_date} ({date_text})")
+            entries.append([url, date_text, parsed_date, page_features])
+        
+        pending = [entry for entry in entries if entry[3] is None]
+        if pending:
+            browser_context = await get_context()
+            semaphore = asyncio.Semaphore(PAGE_WORKERS)
+            
+            async def fetch(entry):
+                """爬取单个更新页面，失败时功能列表为空"""
+                url, date_text, parsed_date, _ = entry
+                try:
+                    async with semaphore:
+                        print(f"  正在爬取 {parsed_date} ({date_text})...")
+                        entry[3] = await crawl_page(browser_context, url)
+                except Exception as e:
+                    print(f"    ✗ 爬取失败 {url}: {e}")
+                    entry[3] = []
+            
+            await asyncio.gather(*(fetch(entry) for entry in pending))
+        else:
+            print("所有页面均命中缓存，无需启动浏览器")
+        
+        for url, date_text, parsed_date, page_features in entries:
+            if is_cacheable(parsed_date) and page_features:
+                used_cache[url] = page_features
+            for feat in page_features:
+                features.append({
+                    "title": feat['title'],
+                    "description": feat['description'],
+                    "time": parsed_date,
+                    "tags": []
+                })
+                print(f"    ✓ {parsed_date} {feat['title'][:50]}...")
         
-        browser.close()
+        # 关闭上下文即可退出浏览器（临时上下文的浏览器随 async_playwright 退出一并关闭）
+        if context is not None:
+            await context.close()
+    
+    if used_cache:
+        save_page_cache(used_cache)
     
     print(f"\n总共获取 {len(features)} 条功能更新")
     return features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据到 storage/replit.json"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {
-            "name": "replit",
-            "url": "https://docs.replit.com/updates/"
-        },
-        {
-            "name": "feature",
-            "features": features
-        }
-    ]
-    
-    output_path = storage_dir / "replit.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("Replit Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_replit_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Replit Changelog Crawler", crawl_replit_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
@@ -4,25 +4,21 @@ Rocket.new Changelog Crawler
 爬取 https://docs.rocket.new/inspiration-and-help/changelog 的功能更新数据
 """
 
-import json
-import re
 from datetime import datetime
-from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from common import launch_browser, new_context, run_crawler, scroll_to_bottom
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "rocket", "url": "https://docs.rocket.new/inspiration-and-help/changelog"}
+
 
 def parse_date(date_str: str) -> str:
-    """解析日期字符串"""
+    """解析日期字符串（页面上的日期已经是 YYYY-MM-DD 格式，只需去掉首尾空白）"""
     if not date_str:
         return ""
     
-    date_str = date_str.strip()
-    
-    # 已经是 YYYY-MM-DD 格式
-    if re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-        return date_str
-    
-    return date_str
+    return date_str.strip()
 
 
 def crawl_rocket_changelog():
@@ -31,17 +27,20 @@ def crawl_rocket_changelog():
     features = []
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = launch_browser(p)
+        context = new_context(browser)
+        page = context.new_page()
         
         print(f"正在访问 {url}...")
         page.goto(url, wait_until="domcontentloaded", timeout=60000)
-        page.wait_for_timeout(5000)
+        # 功能标题（h4 或 strong 小标题）出现即开始处理，不再固定等待 5 秒
+        try:
+            page.wait_for_selector("h4, strong", timeout=15000)
+        except:
+            pass
         
-        # 滚动加载 - 需要多次滚动到页面底部
-        for _ in range(40):
-            page.evaluate("window.scrollBy(0, 2000)")
-            page.wait_for_timeout(300)
+        # 滚动加载 - 需要多次滚动到页面底部，到底部且 2 秒内没有新内容即停止
+        scroll_to_bottom(page, max_rounds=40, step=2000)
         
         page.evaluate("window.scrollTo(0, 0)")
         page.wait_for_timeout(1000)
@@ -52,6 +51,35 @@ def crawl_rocket_changelog():
                 const features = [];
                 const seen = new Set();
                 
+                // 分类标题，不作为功能条目
+                const SKIP_TITLES = new Set(['New Features', 'Enhancements', 'Bug Fixes', 'Feature Completion']);
+                
+                // 出现过的功能日期，代替每个日期链接都遍历一次 features
+                const featureDates = new Set();
+                
+                // 元素前一个兄弟节点中的日期，按元素缓存：同一日期区块下的 h4 共享祖先节点，
+                // 不缓存时每个 h4 都要对相同的兄弟节点重复 querySelector 和读取 innerText
+                const prevSiblingDateCache = new Map();
+                function prevSiblingDate(el) {
+                    if (prevSiblingDateCache.has(el)) return prevSiblingDateCache.get(el);
+                    let result = '';
+                    const prevSibling = el.previousElementSibling;
+                    if (prevSibling) {
+                        const dateLink = prevSibling.querySelector('a[href^="#20"]');
+                        if (dateLink) {
+                            const dateSpan = prevSibling.querySelector('[class*="cursor-pointer"]');
+                            if (dateSpan) {
+                                const text = dateSpan.innerText.trim();
+                                if (text.match(/^\\d{4}-\\d{2}-\\d{2}$/)) {
+                                    result = text;
+                                }
+                            }
+                        }
+                    }
+                    prevSiblingDateCache.set(el, result);
+                    return result;
+                }
+                
                 // 方法1: 查找所有 h4 标题 - 新版格式
                 const h4s = document.querySelectorAll('h4');
                 
@@ -69,20 +97,8 @@ def crawl_rocket_changelog():
                     let maxUp = 10;
                     
                     while (parent && maxUp > 0) {
-                        const prevSibling = parent.previousElementSibling;
-                        if (prevSibling) {
-                            const dateLink = prevSibling.querySelector('a[href^="#20"]');
-                            if (dateLink) {
-                                const dateSpan = prevSibling.querySelector('[class*="cursor-pointer"]');
-                                if (dateSpan) {
-                                    const text = dateSpan.innerText.trim();
-                                    if (text.match(/^\\d{4}-\\d{2}-\\d{2}$/)) {
-                                        dateText = text;
-                                        break;
-                                    }
-                                }
-                            }
-                        }
+                        dateText = prevSiblingDate(parent);
+                        if (dateText) break;
                         parent = parent.parentElement;
                         maxUp--;
                     }
@@ -108,6 +124,7 @@ def crawl_rocket_changelog():
                         time: dateText,
                         tags: []
                     });
+                    featureDates.add(dateText);
                 });
                 
                 // 方法2: 查找所有日期区块 - 处理老版格式（没有 h4 的情况）
@@ -121,7 +138,7 @@ def crawl_rocket_changelog():
                     const dateText = dateMatch[1];
                     
                     // 检查这个日期是否已经有 h4 功能
-                    const hasH4Features = features.some(f => f.time === dateText);
+                    const hasH4Features = featureDates.has(dateText);
                     if (hasH4Features) return;
                     
                     const dateContainer = dateLink.parentElement;
@@ -137,7 +154,7 @@ def crawl_rocket_changelog():
                         let title = strong.innerText?.trim() || '';
                         if (!title || title.length < 3 || seen.has(title + dateText)) return;
                         // 跳过分类标题
-                        if (['New Features', 'Enhancements', 'Bug Fixes', 'Feature Completion'].includes(title)) return;
+                        if (SKIP_TITLES.has(title)) return;
                         seen.add(title + dateText);
                         
                         // 获取描述 - strong 后面的 list
@@ -158,16 +175,10 @@ def crawl_rocket_changelog():
                             time: dateText,
                             tags: []
                         });
+                        featureDates.add(dateText);
                     });
                 });
                 
-                // 按日期排序
-                features.sort((a, b) => {
-                    if (!a.time) return 1;
-                    if (!b.time) return -1;
-                    return b.time.localeCompare(a.time);
-                });
-                
                 return features;
             }
         """)
@@ -182,50 +193,14 @@ def crawl_rocket_changelog():
         
         browser.close()
     
-    return features
-
-
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {"name": "rocket", "url": "https://docs.rocket.new/inspiration-and-help/changelog"},
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "rocket.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
+    # 按日期排序（最新在前，无日期的排在最后）
+    features.sort(key=lambda x: x['time'] if x['time'] else '0000-00-00', reverse=True)
     
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
+    return features
 
 
 def main():
-    print("=" * 50)
-    print("Rocket.new Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_rocket_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Rocket.new Changelog Crawler", crawl_rocket_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+v0 爬虫测试：服务端渲染 HTML 的解析结果与浏览器提取脚本一致
+运行: python -m unittest discover -s script/crawl/tests
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+# 爬虫脚本以 crawl/ 为工作目录导入 common，测试同样把 crawl/ 加入 sys.path
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import launch_browser, new_context
+from v0 import ARTICLES_SCRIPT, ArticleParser
+
+# 浏览器对比测试需要 playwright，未安装时只跳过该测试，静态解析的测试照常运行
+try:
+    from playwright.sync_api import sync_playwright
+except ImportError:
+    sync_playwright = None
+
+FIXTURE = Path(__file__).parent / "fixtures" / "v0_changelog.html"
+
+# 隐藏的段落、列表项、标题和整个隐藏的 article 都不应出现
+EXPECTED = [
+    {
+        "date": "Jan 8, 2026",
+        "title": "Design Mode for every project",
+        "descriptionLines": [
+            "Design Mode is now available on all plans.",
+            "Select any element and edit its styles\nwithout writing a prompt.",
+            "• Edit colors, spacing and typography",
+            "• Changes are saved as a new version",
+        ],
+    },
+    {
+        "date": "Dec 22, 2025",
+        "title": "GitHub sync improvements",
+        "descriptionLines": [
+            "Pushing to GitHub is faster and more reliable.",
+            "Shown from the md breakpoint up",
+            "• Branches are created automatically",
+            "• Conflicts are shown inline",
+        ],
+    },
+    {
+        "date": "Dec 10, 2025",
+        "title": "Faster previews",
+        "descriptionLines": [
+            "Previews start up to twice as fast. Large projects benefit the most.",
+            "Works with all templates.",
+        ],
+    },
+]
+
+
+def parse_static(html: str) -> list:
+    parser = ArticleParser()
+    parser.feed(html)
+    parser.close()
+    return parser.articles
+
+
+class ArticleParserTest(unittest.TestCase):
+    def setUp(self):
+        self.html = FIXTURE.read_text(encoding="utf-8")
+
+    def test_static_parser_skips_hidden_subtrees(self):
+        self.assertEqual(parse_static(self.html), EXPECTED)
+
+    @unittest.skipUnless(sync_playwright, "未安装 playwright")
+    def test_static_parser_matches_browser(self):
+        with sync_playwright() as p:
+            try:
+                browser = launch_browser(p)
+            except Exception as e:
+                self.skipTest(f"Chromium 不可用: {e}")
+            try:
+                # 与爬虫相同的上下文（默认 1280 宽视口），响应式类按桌面布局判断
+                page = new_context(browser).new_page()
+                page.set_content(self.html)
+                browser_articles = page.evaluate(ARTICLES_SCRIPT)
+            finally:
+                browser.close()
+
+        self.assertEqual(browser_articles, EXPECTED)
+        self.assertEqual(parse_static(self.html), browser_articles)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,12 +4,18 @@ Trickle Changelog Crawler
 爬取 https://trickleai.featurebase.app/changelog 的功能更新数据
 """
 
-import json
 import re
 from datetime import datetime
-from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from common import launch_browser, new_context, run_crawler
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "trickle", "url": "https://feedback.trickle.so/changelog"}
+
+# 日期中的序数后缀 (1st, 2nd, 3rd, 4th)
+ORDINAL_RE = re.compile(r'(\d+)(st|nd|rd|th)')
+
 
 def parse_date(date_str: str) -> str:
     """
@@ -22,7 +28,7 @@ def parse_date(date_str: str) -> str:
     date_str = date_str.strip()
     
     # 移除序数后缀 (st, nd, rd, th)
-    clean_date = re.sub(r'(\d+)(st|nd|rd|th)', r'\1', date_str)
+    clean_date = ORDINAL_RE.sub(r'\1', date_str)
     
     formats = [
         "%B %d, %Y",    # July 1, 2025
@@ -45,17 +51,16 @@ def crawl_trickle_changelog():
     features = []
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(viewport={'width': 1920, 'height': 1080})
+        browser = launch_browser(p)
+        context = new_context(browser, viewport={'width': 1920, 'height': 1080})
         page = context.new_page()
         
         print(f"正在访问 {url}...")
         page.goto(url, wait_until="domcontentloaded", timeout=90000)
-        page.wait_for_timeout(5000)
         
-        # 等待页面加载
+        # 等待页面加载：changelog 条目标题出现即开始处理，不再固定等待 5 秒
         try:
-            page.wait_for_selector("h1", timeout=15000)
+            page.wait_for_selector('a[href*="/changelog/"] h2', timeout=15000)
             print("  页面加载成功")
         except:
             print("  警告: 页面可能未完全加载")
@@ -95,6 +100,39 @@ def crawl_trickle_changelog():
                 const seen = new Set();
                 const datePattern = /(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d{1,2}(st|nd|rd|th)?,?\\s+\\d{4}/;
                 
+                // 分类标题，不作为功能条目
+                const SKIP_TITLES = new Set(['New', 'Improvements', 'Bug Fixes', 'News', 'Changelog']);
+                
+                // 日期段落只收集一次（按文档顺序），不再对每个链接的每层祖先都遍历其中所有段落并读取 innerText
+                const datePs = [];
+                document.querySelectorAll('p').forEach(p => {
+                    const text = p.innerText?.trim() || '';
+                    if (datePattern.test(text) && text.length < 30) {
+                        datePs.push({ el: p, text: text });
+                    }
+                });
+                
+                // 容器内的第一个日期段落：容器的后代在文档顺序中紧跟在容器之后，
+                // 二分查找文档顺序中位于容器之后的第一个日期段落，再判断它是否在容器内。
+                // 相邻链接共享祖先，结果按容器缓存
+                const containerDateCache = new Map();
+                function firstDateIn(container) {
+                    if (containerDateCache.has(container)) return containerDateCache.get(container);
+                    let lo = 0;
+                    let hi = datePs.length;
+                    while (lo < hi) {
+                        const mid = (lo + hi) >> 1;
+                        if (container.compareDocumentPosition(datePs[mid].el) & Node.DOCUMENT_POSITION_FOLLOWING) {
+                            hi = mid;
+                        } else {
+                            lo = mid + 1;
+                        }
+                    }
+                    const result = lo < datePs.length && container.contains(datePs[lo].el) ? datePs[lo].text : '';
+                    containerDateCache.set(container, result);
+                    return result;
+                }
+                
                 // 查找所有 changelog 链接
                 const links = document.querySelectorAll('a[href*="/changelog/"]');
                 
@@ -108,7 +146,7 @@ def crawl_trickle_changelog():
                     
                     const title = h2.innerText?.trim() || '';
                     if (!title || title.length < 5 || seen.has(title)) return;
-                    if (['New', 'Improvements', 'Bug Fixes', 'News', 'Changelog'].includes(title)) return;
+                    if (SKIP_TITLES.has(title)) return;
                     
                     seen.add(title);
                     
@@ -118,14 +156,7 @@ def crawl_trickle_changelog():
                     let attempts = 0;
                     
                     while (container && attempts < 20) {
-                        const paragraphs = container.querySelectorAll('p');
-                        for (const p of paragraphs) {
-                            const text = p.innerText?.trim() || '';
-                            if (datePattern.test(text) && text.length < 30) {
-                                dateFound = text;
-                                break;
-                            }
-                        }
+                        dateFound = firstDateIn(container);
                         if (dateFound) break;
                         container = container.parentElement;
                         attempts++;
@@ -193,47 +224,8 @@ def crawl_trickle_changelog():
     return features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {"name": "trickle", "url": "https://feedback.trickle.so/changelog"},
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "trickle.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("Trickle Changelog Crawler (Playwright)")
-    print("=" * 50)
-    
-    features = crawl_trickle_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("Trickle Changelog Crawler (Playwright)", crawl_trickle_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
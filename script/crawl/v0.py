@@ -4,150 +4,280 @@ v0 Changelog Crawler
 爬取 https://v0.app/changelog 的功能更新数据
 """
 
-import json
 import re
-from datetime import datetime
-from pathlib import Path
-from playwright.sync_api import sync_playwright
+from html.parser import HTMLParser
+import requests
+
+from common import format_date, launch_browser, new_context, run_crawler
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {"name": "v0", "url": "https://v0.app/changelog"}
+
+# "Jan 8, 2026" / "January 8, 2026"：月份 日, 年
+DATE_RE = re.compile(r'([A-Za-z]+)\s+(\d{1,2}),\s+(\d{4})')
+WHITESPACE_RE = re.compile(r'\s+')
+
+# 直接请求页面时使用的浏览器 User-Agent
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# 文本中按换行分隔的块级元素（近似 innerText 的换行规则）
+BLOCK_TAGS = {"p", "li", "ul", "ol", "div", "section", "h1", "h2", "h3", "h4", "h5", "h6",
+              "blockquote", "pre", "table", "tr"}
+# 没有结束标签的元素
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+             "source", "track", "wbr"}
+# 内容不会显示的元素（template 的内容不在 DOM 中，noscript 在启用脚本时不渲染）
+HIDDEN_TAGS = {"script", "style", "template", "noscript"}
+# Tailwind 的 display 类和断点前缀：浏览器提取使用默认的 1280 宽视口，sm 到 xl 都生效，
+# 按从小到大的顺序覆盖（如 "hidden md:block" 在桌面可见，"md:hidden" 不可见）；
+# 同一断点内 hidden 在生成的样式表中排在其他 display 类之后，放在最后
+TAILWIND_BREAKPOINTS = ("", "sm:", "md:", "lg:", "xl:")
+TAILWIND_DISPLAY_CLASSES = ("block", "inline-block", "inline", "flex", "inline-flex", "table", "inline-table",
+                            "flow-root", "grid", "inline-grid", "contents", "list-item", "hidden")
+INLINE_HIDDEN_RE = re.compile(r'(?:^|;)\s*(?:display\s*:\s*none|visibility\s*:\s*hidden)\s*(?:!important\s*)?(?:;|$)', re.I)
+
+# 浏览器中提取 main 下每个可见 article 的日期、标题和描述行（非空段落 + 带 • 的非空列表项）。
+# innerText 对 display:none 的元素会退回 textContent，aria-hidden 也不影响 innerText，
+# 因此先按布局和 aria-hidden 过滤掉隐藏元素，与 ArticleParser 跳过的内容保持一致
+ARTICLES_SCRIPT = """
+    () => {
+        const visible = el => el.getClientRects().length > 0
+            && getComputedStyle(el).visibility === 'visible'
+            && !el.closest('[aria-hidden="true"]');
+        const first = (root, selector) => Array.from(root.querySelectorAll(selector)).find(visible);
+        return Array.from(document.querySelectorAll('main article')).filter(visible).map(article => {
+            const timeElem = first(article, 'time');
+            const titleElem = first(article, 'h2');
+            const texts = (selector) => Array.from(article.querySelectorAll(selector))
+                .filter(visible).map(el => el.innerText.trim()).filter(Boolean);
+            return {
+                date: timeElem ? timeElem.innerText.trim() : '',
+                title: titleElem ? titleElem.innerText.trim() : '',
+                descriptionLines: texts('p').concat(texts('li').map(text => '• ' + text))
+            };
+        });
+    }
+"""
 
 
 def parse_date(date_str: str) -> str:
     """
     将日期字符串解析为 YYYY-MM-DD 格式
-    支持格式: "Jan 8, 2026", "Dec 22, 2025" 等
+    支持格式: "Jan 8, 2026", "Dec 22, 2025" 等，无法解析时原样返回
     """
-    try:
-        dt = datetime.strptime(date_str.strip(), "%b %d, %Y")
-        return dt.strftime("%Y-%m-%d")
-    except ValueError:
-        # 尝试其他格式
-        try:
-            dt = datetime.strptime(date_str.strip(), "%B %d, %Y")
-            return dt.strftime("%Y-%m-%d")
-        except ValueError:
-            return date_str
+    match = DATE_RE.fullmatch(date_str.strip())
+    if not match:
+        return date_str
+    
+    return format_date(int(match.group(3)), match.group(1), int(match.group(2))) or date_str
 
 
-def extract_text_content(element) -> str:
-    """提取元素的文本内容，处理嵌套结构"""
-    return element.inner_text().strip()
+class ArticleParser(HTMLParser):
+    """
+    从服务端渲染的 HTML 中提取 main 下每个 article 的日期、标题和描述行，
+    结果与浏览器中的提取脚本（ARTICLES_SCRIPT）相同。
+    隐藏的子树整体跳过：script/style/template/noscript、hidden 属性、aria-hidden="true"、
+    行内 display:none / visibility:hidden，以及在桌面视口下隐藏的 Tailwind display 类（页面样式使用 Tailwind）
+    """
 
+    def __init__(self):
+        super().__init__()
+        self.articles = []
+        self.stack = []        # 当前打开的元素标签
+        self.main_depth = 0    # 所在 main 元素的层数
+        self.article = None    # 当前 article 的提取结果
+        self.article_level = 0
+        self.captures = []     # 正在收集文本的 (标签, 层级, 文本片段)
+        self.skip_level = 0    # 隐藏子树的层级，其中的元素和文本都不计入
 
-def crawl_v0_changelog():
-    """爬取 v0 changelog 页面"""
-    url = "https://v0.app/changelog"
-    features = []
+    @staticmethod
+    def _is_hidden(tag, attrs) -> bool:
+        if tag in HIDDEN_TAGS:
+            return True
+        attrs = dict(attrs)
+        if "hidden" in attrs or attrs.get("aria-hidden") == "true":
+            return True
+        if ArticleParser._hidden_by_class(attrs.get("class") or ""):
+            return True
+        return bool(INLINE_HIDDEN_RE.search(attrs.get("style") or ""))
+
+    @staticmethod
+    def _hidden_by_class(class_attr: str) -> bool:
+        classes = set(class_attr.split())
+        hidden = False
+        for prefix in TAILWIND_BREAKPOINTS:
+            for display in TAILWIND_DISPLAY_CLASSES:
+                if prefix + display in classes:
+                    hidden = display == "hidden"
+        return hidden
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._text("\n")
+            return
+        # <p> 不能嵌套，新的 <p> 隐式关闭上一个
+        if tag == "p" and "p" in self.stack and not self.skip_level:
+            self.handle_endtag("p")
+        if tag in BLOCK_TAGS:
+            self._text("\n")
+        self.stack.append(tag)
+        level = len(self.stack)
+        if self.skip_level:
+            return
+        if self._is_hidden(tag, attrs):
+            self.skip_level = level
+        elif tag == "main":
+            self.main_depth += 1
+        elif tag == "article" and self.main_depth and self.article is None:
+            self.article = {"date": None, "title": None, "paragraphs": [], "listItems": []}
+            self.article_level = level
+        elif self.article is not None:
+            if tag in ("p", "li") or (tag == "time" and self.article["date"] is None) \
+                    or (tag == "h2" and self.article["title"] is None):
+                parts = []
+                self.captures.append((tag, level, parts))
+                # 先按文档顺序占位，结束标签时再填入文本
+                if tag == "p":
+                    self.article["paragraphs"].append(parts)
+                elif tag == "li":
+                    self.article["listItems"].append(parts)
+                elif tag == "time":
+                    self.article["date"] = parts
+                else:
+                    self.article["title"] = parts
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS or tag not in self.stack:
+            return
+        # 未显式关闭的子元素随父元素一起关闭
+        while self.stack:
+            open_tag = self.stack[-1]
+            level = len(self.stack)
+            if open_tag in BLOCK_TAGS:
+                self._text("\n")
+            self.captures = [c for c in self.captures if c[1] < level]
+            if level == self.skip_level:
+                self.skip_level = 0
+            elif open_tag == "main":
+                self.main_depth -= 1
+            elif level == self.article_level and self.article is not None:
+                self.articles.append(self._finish(self.article))
+                self.article = None
+                self.article_level = 0
+            self.stack.pop()
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        self._text(WHITESPACE_RE.sub(" ", data))
+
+    def _text(self, text):
+        if self.skip_level:
+            return
+        for _, _, parts in self.captures:
+            parts.append(text)
+
+    @staticmethod
+    def _inner_text(parts) -> str:
+        if parts is None:
+            return ""
+        lines = (line.strip() for line in "".join(parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+    def _finish(self, article) -> dict:
+        paragraphs = [self._inner_text(parts) for parts in article["paragraphs"]]
+        list_items = [self._inner_text(parts) for parts in article["listItems"]]
+        return {
+            "date": self._inner_text(article["date"]),
+            "title": self._inner_text(article["title"]),
+            "descriptionLines": [text for text in paragraphs if text] + [f"• {text}" for text in list_items if text]
+        }
+
+
+def fetch_static_articles(url: str) -> list:
+    """直接请求页面 HTML 并解析出 article；页面不是服务端渲染或请求失败时返回空列表"""
+    try:
+        response = requests.get(url, headers={"User-Agent": USER_AGENT}, timeout=15)
+        response.raise_for_status()
+        parser = ArticleParser()
+        parser.feed(response.text)
+        parser.close()
+    except Exception as e:
+        print(f"直接请求页面失败: {e}")
+        return []
+    
+    # 没有带标题的条目说明内容由前端渲染，需要交给浏览器
+    if not any(article["title"] for article in parser.articles):
+        return []
+    return parser.articles
+
+
+def fetch_browser_articles(url: str) -> list:
+    """用浏览器打开页面并提取 article"""
+    # 只在服务端渲染的 HTML 中没有条目时才需要浏览器，静态解析不依赖 playwright
+    from playwright.sync_api import sync_playwright
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+        browser = launch_browser(p)
+        context = new_context(browser)
+        page = context.new_page()
         
-        print(f"正在访问 {url}...")
+        print(f"正在用浏览器访问 {url}...")
         page.goto(url, wait_until="networkidle")
         
         # 等待页面加载完成
         page.wait_for_selector("main", timeout=10000)
         
-        # 获取所有 article 元素
-        articles = page.query_selector_all("main article")
-        print(f"找到 {len(articles)} 个功能更新条目")
-        
-        for article in articles:
-            try:
-                # 提取日期
-                time_elem = article.query_selector("time")
-                date_str = time_elem.inner_text() if time_elem else ""
-                parsed_date = parse_date(date_str)
-                
-                # 提取标题 (h2)
-                title_elem = article.query_selector("h2")
-                title = title_elem.inner_text().strip() if title_elem else ""
-                
-                # 提取描述内容
-                description_parts = []
-                
-                # 获取段落内容
-                paragraphs = article.query_selector_all("p")
-                for p in paragraphs:
-                    text = p.inner_text().strip()
-                    if text:
-                        description_parts.append(text)
-                
-                # 获取列表内容
-                list_items = article.query_selector_all("li")
-                for li in list_items:
-                    text = li.inner_text().strip()
-                    if text:
-                        description_parts.append(f"• {text}")
-                
-                description = "\n".join(description_parts)
-                
-                if title:  # 只添加有标题的条目
-                    features.append({
-                        "title": title,
-                        "description": description,
-                        "time": parsed_date,
-                        "tags": []
-                    })
-                    print(f"  ✓ {parsed_date}: {title[:50]}...")
-                    
-            except Exception as e:
-                print(f"  ✗ 解析失败: {e}")
-                continue
+        # 一次 evaluate 取出所有 article，不再对每个元素分别 query_selector / inner_text
+        # （每次都是一次与浏览器的往返）
+        articles = page.evaluate(ARTICLES_SCRIPT)
         
         browser.close()
     
-    return features
+    return articles
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据到 storage/v0.json"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
+def crawl_v0_changelog():
+    """爬取 v0 changelog 页面：优先直接解析服务端渲染的 HTML，拿不到条目时再启动浏览器"""
+    url = "https://v0.app/changelog"
+    features = []
     
-    # 构建输出数据结构
-    output_data = [
-        {
-            "name": "v0",
-            "url": "https://v0.app/changelog"
-        },
-        {
-            "name": "feature",
-            "features": features
-        }
-    ]
+    print(f"正在访问 {url}...")
+    articles = fetch_static_articles(url)
+    if not articles:
+        articles = fetch_browser_articles(url)
+    print(f"找到 {len(articles)} 个功能更新条目")
     
-    output_path = storage_dir / "v0.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
+    for article in articles:
+        try:
+            # 提取日期
+            parsed_date = parse_date(article["date"])
+            
+            # 提取标题 (h2)
+            title = article["title"]
+            
+            # 提取描述内容：段落 + 列表
+            description = "\n".join(article["descriptionLines"])
+            
+            if title:  # 只添加有标题的条目
+                features.append({
+                    "title": title,
+                    "description": description,
+                    "time": parsed_date,
+                    "tags": []
+                })
+                print(f"  ✓ {parsed_date}: {title[:50]}...")
+                
+        except Exception as e:
+            print(f"  ✗ 解析失败: {e}")
+            continue
     
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
+    return features
 
 
 def main():
-    print("=" * 50)
-    print("v0 Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_v0_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("v0 Changelog Crawler", crawl_v0_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
@@ -10,12 +10,22 @@ YouWare Changelog Crawler
   - 每个分类下有具体条目，可展开查看
 """
 
-import json
 import re
 from datetime import datetime
-from pathlib import Path
 from playwright.sync_api import sync_playwright
 
+from common import launch_browser, new_context, run_crawler
+
+# 产品信息，保存为数据文件的第一个元素
+PRODUCT_INFO = {
+    "name": "youware",
+    "url": "https://youware.app/project/zln9fqecog?enter_from=share&invite_code=FUQ800OLMY&screen_status=1",
+    "is_self": True
+}
+
+# 折叠按钮文本，如 "3 items"
+ITEMS_RE = re.compile(r'\d+\s*items?', re.I)
+
 
 def parse_date(date_str: str) -> str:
     """解析日期字符串为 YYYY-MM-DD 格式"""
@@ -38,10 +48,7 @@ def parse_date(date_str: str) -> str:
     except ValueError:
         pass
     
-    # 已经是 YYYY-MM-DD 格式
-    if re.match(r'^\d{4}-\d{2}-\d{2}$', date_str):
-        return date_str
-    
+    # 其他格式（包括已经是 YYYY-MM-DD 的日期）原样返回
     return date_str
 
 
@@ -52,8 +59,9 @@ def crawl_youware_changelog():
     features = []
     
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        context = browser.new_context(
+        browser = launch_browser(p)
+        context = new_context(
+            browser,
             viewport={'width': 1920, 'height': 1080},
             user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
         )
@@ -108,7 +116,7 @@ def crawl_youware_changelog():
             for btn in expand_buttons:
                 try:
                     text = btn.inner_text()
-                    if re.search(r'\d+\s*items?', text, re.I):
+                    if ITEMS_RE.search(text):
                         btn.click()
                         page.wait_for_timeout(500)
                 except:
@@ -137,11 +145,21 @@ def crawl_youware_changelog():
                 const features = [];
                 const seen = new Set();
                 
+                // 分类标题
+                const CATEGORIES = new Set(['Features', 'Improvements', 'Patches', 'Bug Fixes', 'New', 'Fixes']);
+                
                 // 首先收集所有版本块及其日期
                 // 结构：左侧有版本号和日期，右侧有具体内容
                 
-                // 查找所有包含版本号的元素
-                const allText = document.body.innerText || '';
+                // 版本块父元素、标题的父元素和祖先节点会被多个元素反复读取，
+                // 按元素缓存 innerText（会触发布局计算并遍历整个子树），每个元素只读取一次
+                const textCache = new Map();
+                const textOf = (el) => {
+                    if (!textCache.has(el)) {
+                        textCache.set(el, el.innerText || '');
+                    }
+                    return textCache.get(el);
+                };
                 
                 // 提取版本-日期对应关系
                 // 格式：v2.7.4 (换行或空格) January 12, 2026
@@ -157,7 +175,7 @@ def crawl_youware_changelog():
                 
                 // 遍历所有元素，建立版本-日期映射
                 for (const el of allElements) {
-                    const text = el.innerText?.trim() || '';
+                    const text = textOf(el).trim();
                     
                     // 检测版本号 (如 v2.7.4)
                     const vMatch = text.match(/^v(\\d+\\.\\d+\\.\\d+)$/);
@@ -170,7 +188,7 @@ def crawl_youware_changelog():
                         
                         // 在父元素中查找日期
                         if (parent) {
-                            const parentText = parent.innerText || '';
+                            const parentText = textOf(parent);
                             const dMatch = parentText.match(/(January|February|March|April|May|June|July|August|September|October|November|December)\\s+(\\d{1,2}),?\\s*(\\d{4})/i);
                             if (dMatch) {
                                 lastDate = dMatch[0];
@@ -198,7 +216,7 @@ def crawl_youware_changelog():
                 let currentCategory = '';
                 
                 for (const el of titleElements) {
-                    const text = el.innerText?.trim() || '';
+                    const text = textOf(el).trim();
                     if (!text || text.length < 3) continue;
                     
                     // 跳过版本号
@@ -214,7 +232,7 @@ def crawl_youware_changelog():
                     }
                     
                     // 检测分类
-                    if (['Features', 'Improvements', 'Patches', 'Bug Fixes', 'New', 'Fixes'].includes(text)) {
+                    if (CATEGORIES.has(text)) {
                         currentCategory = text;
                         continue;
                     }
@@ -237,7 +255,7 @@ def crawl_youware_changelog():
                     // 尝试从父元素获取更多文本
                     let parent = el.parentElement;
                     if (parent) {
-                        const parentText = parent.innerText?.trim() || '';
+                        const parentText = textOf(parent).trim();
                         if (parentText.length > text.length + 10) {
                             // 移除标题部分，保留描述
                             const idx = parentText.indexOf(text);
@@ -251,7 +269,7 @@ def crawl_youware_changelog():
                     if (!description || description.length < 10) {
                         let next = el.nextElementSibling;
                         if (next) {
-                            const nextText = next.innerText?.trim() || '';
+                            const nextText = textOf(next).trim();
                             if (nextText && nextText.length > 10 && !nextText.match(/^v\\d/)) {
                                 description = nextText;
                             }
@@ -272,7 +290,7 @@ def crawl_youware_changelog():
                         let ancestor = el.parentElement;
                         let attempts = 0;
                         while (ancestor && attempts < 20) {
-                            const ancestorText = ancestor.innerText || '';
+                            const ancestorText = textOf(ancestor);
                             
                             // 查找版本号
                             const vMatch = ancestorText.match(/v(\\d+\\.\\d+\\.\\d+)/);
@@ -314,7 +332,7 @@ def crawl_youware_changelog():
                     const paragraphs = document.querySelectorAll('p, [class*="description"], [class*="content"]');
                     
                     for (const p of paragraphs) {
-                        const text = p.innerText?.trim() || '';
+                        const text = textOf(p).trim();
                         if (text.length < 20 || text.length > 500) continue;
                         
                         // 提取第一句作为标题
@@ -326,7 +344,7 @@ def crawl_youware_changelog():
                         let ancestor = p.parentElement;
                         let attempts = 0;
                         while (ancestor && attempts < 15) {
-                            const ancestorText = ancestor.innerText || '';
+                            const ancestorText = textOf(ancestor);
                             const dMatch = ancestorText.match(/(January|February|March|April|May|June|July|August|September|October|November|December)\\s+\\d+,?\\s*\\d{4}/i);
                             if (dMatch) {
                                 date = dMatch[0];
@@ -397,51 +415,8 @@ def crawl_youware_changelog():
     return unique_features
 
 
-def get_storage_dir():
-    """获取 storage 目录（支持本地和 Docker 环境）"""
-    script_dir = Path(__file__).parent
-    
-    # Docker 环境: /app/crawl/xxx.py -> storage 在 /app/storage
-    if script_dir == Path("/app/crawl"):
-        return Path("/app/storage")
-    
-    # 本地环境: script/crawl/xxx.py -> storage 在 ../../storage
-    return script_dir.parent.parent / "storage"
-
-
-def save_data(features: list):
-    """保存数据"""
-    storage_dir = get_storage_dir()
-    storage_dir.mkdir(exist_ok=True)
-    
-    output_data = [
-        {
-            "name": "youware",
-            "url": "https://youware.app/project/zln9fqecog?enter_from=share&invite_code=FUQ800OLMY&screen_status=1",
-            "is_self": True
-        },
-        {"name": "feature", "features": features}
-    ]
-    
-    output_path = storage_dir / "youware.json"
-    with open(output_path, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
-    
-    print(f"\n数据已保存到 {output_path}")
-    print(f"共 {len(features)} 条功能更新")
-
-
 def main():
-    print("=" * 50)
-    print("YouWare Changelog Crawler")
-    print("=" * 50)
-    
-    features = crawl_youware_changelog()
-    
-    if features:
-        save_data(features)
-    else:
-        print("未获取到任何数据")
+    run_crawler("YouWare Changelog Crawler", crawl_youware_changelog, PRODUCT_INFO)
 
 
 if __name__ == "__main__":
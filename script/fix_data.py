@@ -7,6 +7,8 @@ import json
 import re
 from pathlib import Path
 
+from json_io import save_json
+
 
 def fix_replit_dates():
     """修复 replit.json 中的日期问题"""
@@ -54,8 +56,7 @@ def fix_replit_dates():
     
     data[1]["features"] = valid_features
     
-    with open(replit_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    save_json(replit_path, data)
     
     print(f"replit.json: 修复 {fixed_count} 条日期，移除 {removed_count} 条无效条目")
     print(f"  剩余 {len(valid_features)} 条有效功能更新")
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+JSON 文件保存
+API 服务、监控、打标、总结脚本和爬虫共用的原子写入和文件写锁
+"""
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# 监控、打标在 API 服务进程中运行时与请求处理线程读写同一批文件，写锁放在这里由双方共用
+_file_locks = {}
+_file_locks_lock = threading.Lock()
+
+
+def get_file_lock(path: Path) -> threading.Lock:
+    """
+    取得文件的写锁（同一进程内按文件实际路径共用一把锁）：
+    对同一文件的“读取-修改-写回”必须持有该锁，独立运行的脚本中加锁也没有副作用
+    """
+    key = Path(path).resolve()
+    with _file_locks_lock:
+        return _file_locks.setdefault(key, threading.Lock())
+
+
+def save_json(path: Path, data, indent: int = 4):
+    """
+    原子地保存 JSON 文件：先在内存中编码再一次性写入同目录临时文件，再 os.replace 替换
+    （json.dump 直接写文件时会对每个小片段调用一次 write；indent 为 None 时 json.dumps 走 C 编码器）
+    数据文件同时被 nginx、API 服务和其他脚本读取，写到一半崩溃或被中断也不会留下损坏的文件，
+    读取方也不会读到写了一半的内容
+    """
+    path = Path(path)
+    content = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+
+    # 临时文件默认权限为 600，沿用原文件权限，否则 nginx 可能无权读取
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
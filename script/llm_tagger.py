@@ -8,15 +8,19 @@
 import json
 import time
 import re
+from functools import lru_cache
 from pathlib import Path
 import requests
 
+from json_io import get_file_lock, save_json
+
 
 # 重试配置
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # 秒
 
 
+@lru_cache(maxsize=1)
 def get_project_root():
     """获取项目根目录（支持本地和 Docker 环境）"""
     script_dir = Path(__file__).parent
@@ -51,8 +55,60 @@ def load_tags():
 def save_tags(tags_data: dict):
     """保存标签体系"""
     tags_path = get_project_root() / "info" / "tag.json"
-    with open(tags_path, "w", encoding="utf-8") as f:
-        json.dump(tags_data, f, ensure_ascii=False, indent=4)
+    save_json(tags_path, tags_data)
+
+
+def save_new_subtags(new_subtags: list):
+    """
+    把新增的二级标签写入标签体系（归入 Others）
+    打标要调用很久的 LLM，期间 Admin 可能修改或重命名标签：持有文件锁重新读取 tag.json，只追加缺少的标签，
+    不用打标开始时读到的旧标签体系整个覆盖
+    """
+    tags_path = get_project_root() / "info" / "tag.json"
+    with get_file_lock(tags_path):
+        tags_data = load_tags()
+        subtag_to_primary = tags_data.setdefault("subtag_to_primary", {})
+        others = next((pt for pt in tags_data.get("primary_tags", []) if pt["name"] == "Others"), None)
+        added = False
+        for subtag in new_subtags:
+            if subtag in subtag_to_primary:
+                continue
+            subtag_to_primary[subtag] = "Others"
+            if others is not None:
+                others.setdefault("subtags", []).append({"name": subtag, "description": subtag})
+            added = True
+        if added:
+            save_tags(tags_data)
+
+
+def is_untagged(feature: dict) -> bool:
+    """未打标：tags 字段不存在、为 None 或空数组（"None" 字符串表示无需打标）"""
+    tags = feature.get("tags")
+    return tags is None or (isinstance(tags, list) and len(tags) == 0)
+
+
+def save_feature_tags(json_file: Path, idx: int, feature: dict, tags) -> bool:
+    """
+    把一条功能的打标结果写回数据文件：持有文件锁重新读取最新内容，只修改这一条的 tags
+    （打标期间 Admin 中的编辑、新增和标签修改不会被打标开始时读到的旧数据覆盖）
+    按标题和日期找到该条目（新增条目插在最前面，下标可能已变化）；
+    条目已被修改、删除或已手动打标时不写入，返回 False
+    """
+    with get_file_lock(json_file):
+        with open(json_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        features = data[1].get("features", []) if len(data) >= 2 else []
+        
+        for i in [idx, *range(len(features))]:
+            if i >= len(features):
+                continue
+            current = features[i]
+            if current.get("title") == feature.get("title") and current.get("time") == feature.get("time") \
+                    and is_untagged(current):
+                current["tags"] = tags
+                save_json(json_file, data)
+                return True
+    return False
 
 
 def normalize_name(name: str) -> str:
@@ -517,15 +573,7 @@ def process_all_features(use_llm: bool = True, limit_per_file: int = None, targe
         # 2. tags 是空数组 []
         # 3. tags 是 None
         # 排除：tags == "None" (字符串，表示无需打标)
-        features_to_tag = []
-        for i, feat in enumerate(features):
-            tags = feat.get("tags")
-            # 跳过已标记为"无需打标"的
-            if tags == "None":
-                continue
-            # 未打标的情况
-            if tags is None or (isinstance(tags, list) and len(tags) == 0):
-                features_to_tag.append((i, feat))
+        features_to_tag = [(i, feat) for i, feat in enumerate(features) if is_untagged(feat)]
         
         if limit_per_file:
             features_to_tag = features_to_tag[:limit_per_file]
@@ -574,15 +622,15 @@ def process_all_features(use_llm: bool = True, limit_per_file: int = None, targe
                     print(f"       🆕 新增二级标签 (归入 Others): {', '.join(new_subtags)}")
                     all_new_subtags.extend(new_subtags)
                     # 保存更新后的标签体系
-                    save_tags(tags_data)
+                    save_new_subtags(new_subtags)
             else:
                 features[idx]["tags"] = "None"
                 skipped_count += 1
                 print(f"       ○ 非功能性内容，跳过")
             
             # 每处理一条就立即保存
-            with open(json_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            if not save_feature_tags(json_file, idx, feat, features[idx]["tags"]):
+                print("       ⚠️ 条目已被修改或删除，未写入标签")
             
             total_processed += 1
         
@@ -592,7 +640,7 @@ def process_all_features(use_llm: bool = True, limit_per_file: int = None, targe
     
     # 最终保存标签体系
     if all_new_subtags:
-        save_tags(tags_data)
+        save_new_subtags(all_new_subtags)
         print(f"\n📝 标签体系已更新:")
         print(f"   新增二级标签 (归入 Others): {', '.join(all_new_subtags)}")
     
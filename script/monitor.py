@@ -3,22 +3,29 @@
 竞品更新监控脚本（增量模式）
 
 工作原理：
-1. 备份现有数据（保护已有的 tags）
-2. 运行爬虫获取最新数据
-3. 合并新旧数据，保留已有的 tags
-4. 只对新增条目进行 LLM 打标
-5. 定期全量同步检查防止遗漏
+1. 运行爬虫获取最新数据（写入暂存目录，不覆盖 storage 中的现有数据）
+2. 合并新旧数据，保留已有的 tags
+3. 只对新增条目进行 LLM 打标
+4. 定期全量同步检查防止遗漏
 """
 
 import json
+import os
 import subprocess
 import sys
 import hashlib
 import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
+import ai_summary
+import llm_tagger
+from json_io import get_file_lock, save_json
 
+
+@lru_cache(maxsize=1)
 def get_project_root():
     """获取项目根目录（支持本地和 Docker 环境）"""
     script_dir = Path(__file__).parent
@@ -38,13 +45,23 @@ def get_feature_key(feature: dict) -> str:
     return f"{title_hash}_{time}"
 
 
-def load_storage(product_name: str) -> tuple:
+def get_crawl_output_dir() -> Path:
+    """
+    爬虫结果的暂存目录：项目根目录下的 .cache/crawl（不提交到仓库，前端也访问不到）
+    爬虫先写到这里，合并后才写入 storage；运行中断时 storage 中仍是带 tags 的完整数据
+    """
+    return get_project_root() / ".cache" / "crawl"
+
+
+def load_storage(product_name: str, storage_dir: Path = None) -> tuple:
     """
-    加载产品存储数据
+    加载产品存储数据（storage_dir 默认为 storage，读取爬虫暂存结果时传入暂存目录）
     返回: (data, features, feature_map)
     feature_map: {key: feature} 方便查找和合并
     """
-    storage_path = get_project_root() / "storage" / f"{product_name}.json"
+    if storage_dir is None:
+        storage_dir = get_project_root() / "storage"
+    storage_path = storage_dir / f"{product_name}.json"
 
     if not storage_path.exists():
         return None, [], {}
@@ -66,11 +83,14 @@ def load_storage(product_name: str) -> tuple:
     return data, features, feature_map
 
 
+def get_storage_path(product_name: str) -> Path:
+    """产品数据文件路径"""
+    return get_project_root() / "storage" / f"{product_name}.json"
+
+
 def save_storage(product_name: str, data: list):
-    """保存产品数据"""
-    storage_path = get_project_root() / "storage" / f"{product_name}.json"
-    with open(storage_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    """保存产品数据（调用方在读取到写回之间持有该文件的 get_file_lock）"""
+    save_json(get_storage_path(product_name), data)
 
 
 def backup_storage(product_name: str) -> dict:
@@ -159,6 +179,17 @@ def run_crawler(product_name: str) -> bool:
     运行爬虫
     返回: 是否成功
     """
+    success, message = run_crawler_process(product_name)
+    if message:
+        print(message)
+    return success
+
+
+def run_crawler_process(product_name: str) -> tuple:
+    """
+    在子进程中运行爬虫，不直接打印（可在工作线程中调用）
+    返回: (是否成功, 失败提示，成功时为空字符串)
+    """
     root = get_project_root()
     
     # Docker 环境中爬虫在 /app/crawl/，本地在 script/crawl/
@@ -168,58 +199,44 @@ def run_crawler(product_name: str) -> bool:
         crawler_path = root / "script" / "crawl" / f"{product_name}.py"
 
     if not crawler_path.exists():
-        print(f"  ⚠️ 爬虫脚本不存在: {crawler_path}")
-        return False
+        return False, f"  ⚠️ 爬虫脚本不存在: {crawler_path}"
+
+    # 爬虫结果写入暂存目录，先清除上次残留的结果，爬虫没有写出数据时不会误用旧结果
+    output_dir = get_crawl_output_dir()
+    try:
+        (output_dir / f"{product_name}.json").unlink(missing_ok=True)
+    except OSError:
+        pass
 
     try:
         result = subprocess.run(
             [sys.executable, str(crawler_path)],
             capture_output=True,
             text=True,
-            timeout=300  # 5 分钟超时，base44 需要访问详情页较慢
+            timeout=300,  # 5 分钟超时，base44 需要访问详情页较慢
+            env={**os.environ, "CRAWL_OUTPUT_DIR": str(output_dir)}
         )
 
         if result.returncode != 0:
-            print(f"  ⚠️ 爬虫执行失败: {result.stderr[:200]}")
-            return False
+            return False, f"  ⚠️ 爬虫执行失败: {result.stderr[:200]}"
 
-        return True
+        return True, ""
 
     except subprocess.TimeoutExpired:
-        print(f"  ⚠️ 爬虫执行超时")
-        return False
+        return False, f"  ⚠️ 爬虫执行超时"
     except Exception as e:
-        print(f"  ⚠️ 爬虫执行异常: {e}")
-        return False
+        return False, f"  ⚠️ 爬虫执行异常: {e}"
 
 
-def run_tagging_for_product(product_name: str) -> bool:
-    """为指定产品运行打标（只处理没有 tags 的条目）"""
-    root = get_project_root()
-    
-    # Docker 环境中脚本在 /app/，本地在 script/
-    if root == Path("/app"):
-        tag_script = root / "llm_tagger.py"
-    else:
-        tag_script = root / "script" / "llm_tagger.py"
+# 同时运行的爬虫数：爬虫耗时主要在等待网络，并行后总耗时接近最慢的那个；每个爬虫各启动一个 Chromium，不宜过多
+CRAWL_WORKERS = 3
 
-    if not tag_script.exists():
-        print(f"  ⚠️ 打标脚本不存在: {tag_script}")
-        return False
 
+def run_tagging_for_product(product_name: str) -> bool:
+    """为指定产品运行打标（只处理没有 tags 的条目，直接调用打标模块，不再启动子进程）"""
     try:
-        result = subprocess.run(
-            [sys.executable, str(tag_script), "--file", f"{product_name}.json"],
-            capture_output=True,
-            text=True,
-            timeout=600  # 打标可能需要较长时间
-        )
-        if result.stdout:
-            # 只打印关键信息
-            for line in result.stdout.split('\n'):
-                if '🏷️' in line or '✓' in line or '新增' in line:
-                    print(f"     {line}")
-        return result.returncode == 0
+        llm_tagger.process_all_features(target_file=f"{product_name}.json")
+        return True
     except Exception as e:
         print(f"  ⚠️ 打标执行异常: {e}")
         return False
@@ -247,9 +264,7 @@ def load_sync_status() -> dict:
 def save_sync_status(status: dict):
     """保存同步状态"""
     status_path = get_project_root() / "info" / "sync_status.json"
-
-    with open(status_path, "w", encoding="utf-8") as f:
-        json.dump(status, f, ensure_ascii=False, indent=4)
+    save_json(status_path, status)
 
 
 def save_update_log(updates: dict):
@@ -267,84 +282,95 @@ def save_update_log(updates: dict):
 
 
 def save_run_status(crawl_time=None, summary_time=None):
-    """保存运行状态（供 Admin 页面显示）"""
+    """
+    保存运行状态（供 Admin 页面显示），API 服务触发任务时也调用这里
+    爬取和总结任务可能同时结束，读取到写回之间持有文件锁
+    """
     status_path = get_project_root() / "info" / "run_status.json"
     
-    # 读取现有状态
-    status = {}
-    if status_path.exists():
-        try:
-            with open(status_path, "r", encoding="utf-8") as f:
-                status = json.load(f)
-        except:
-            pass
-    
-    # 更新状态
-    if crawl_time:
-        status["crawl_last_run"] = crawl_time
-    if summary_time:
-        status["summary_last_run"] = summary_time
-    
-    # 保存
-    with open(status_path, "w", encoding="utf-8") as f:
-        json.dump(status, f, ensure_ascii=False, indent=4)
+    with get_file_lock(status_path):
+        # 读取现有状态
+        status = {}
+        if status_path.exists():
+            try:
+                with open(status_path, "r", encoding="utf-8") as f:
+                    status = json.load(f)
+            except:
+                pass
+        
+        # 更新状态
+        if crawl_time:
+            status["crawl_last_run"] = crawl_time
+        if summary_time:
+            status["summary_last_run"] = summary_time
+        
+        # 保存
+        save_json(status_path, status)
 
 
-def monitor_product(name: str, url: str, force_full: bool = False) -> dict:
+def monitor_product(name: str, url: str, force_full: bool = False,
+                    crawl_result: tuple = None) -> dict:
     """
     监控单个产品
 
     流程：
-    1. 备份现有数据（保存 feature_map）
-    2. 运行爬虫（爬虫会覆盖文件）
-    3. 合并新旧数据，保留已有的 tags
-    4. 只对新增条目打标
+    1. 运行爬虫（结果写入暂存目录，storage 中的数据保持不变）
+    2. 读取现有数据，合并新旧数据，保留已有的 tags
+    3. 只对新增条目打标
+
+    monitor_all 并行运行爬虫，通过 crawl_result 传入 run_crawler_process 的返回值，此时跳过第 1 步
     """
     print(f"\n📦 {name}")
     print(f"   URL: {url}")
 
-    # 1. 备份现有数据
-    old_data, old_features, old_feature_map = load_storage(name)
-    old_count = len(old_features)
-    latest_date = get_latest_date(name)
-
-    print(f"   已有: {old_count} 条")
-    if latest_date:
-        print(f"   最新: {latest_date}")
-
-    # 2. 运行爬虫
-    print(f"   正在爬取...")
-    crawler_success = run_crawler(name)
-
-    if not crawler_success:
-        print(f"   ❌ 爬虫失败，保留原数据")
-        return {
-            "status": "crawler_failed",
-            "old_count": old_count,
-            "new_count": 0
-        }
-
-    # 3. 加载爬虫爬取的新数据
-    new_data, new_features, _ = load_storage(name)
-
-    if not new_features:
-        print(f"   ⚠️ 爬虫返回空数据，保留原数据")
-        # 恢复原数据
-        if old_data:
-            save_storage(name, old_data)
-        return {
-            "status": "empty_result",
-            "old_count": old_count,
-            "new_count": 0
-        }
-
-    # 4. 合并数据，保留已有的 tags
-    merged_features, new_keys = merge_features(old_feature_map, new_features)
-
-    # 5. 更新并保存数据
-    if new_data and len(new_data) >= 2:
-        new_data[1]["features"] = merged_features
-        save_storage(name, new_data)
+    # 1. 运行爬虫
+    if crawl_result is None:
+        print(f"   正在爬取...")
+        crawler_success = run_crawler(name)
+    else:
+        crawler_success, message = crawl_result
+        if message:
+            print(message)
+
+    with get_file_lock(get_storage_path(name)):
+        # 2. 读取现有数据（爬虫不再覆盖 storage，在爬取结束后读取，期间在 Admin 中的修改也会保留）
+        #    读取、合并到写回之间持有文件锁：在 API 服务中运行时，Admin 的修改不会在这期间被覆盖
+        _, old_features, old_feature_map = load_storage(name)
+        old_count = len(old_features)
+        latest_date = get_latest_date(name)
+
+        print(f"   已有: {old_count} 条")
+        if latest_date:
+            print(f"   最新: {latest_date}")
+
+        if not crawler_success:
+            print(f"   ❌ 爬虫失败，保留原数据")
+            return {
+                "status": "crawler_failed",
+                "old_count": old_count,
+                "new_count": 0
+            }
+
+        # 3. 加载爬虫暂存的新数据
+        output_path = get_crawl_output_dir() / f"{name}.json"
+        new_data, new_features, _ = load_storage(name, get_crawl_output_dir())
+
+        if not new_features:
+            print(f"   ⚠️ 爬虫返回空数据，保留原数据")
+            return {
+                "status": "empty_result",
+                "old_count": old_count,
+                "new_count": 0
+            }
+
+        # 4. 合并数据，保留已有的 tags
+        merged_features, new_keys = merge_features(old_feature_map, new_features)
+
+        # 5. 更新并保存数据，合并后的数据已写入 storage，删除暂存结果
+        if new_data and len(new_data) >= 2:
+            new_data[1]["features"] = merged_features
+            save_storage(name, new_data)
+        output_path.unlink(missing_ok=True)
 
     new_count = len(new_keys)
 
@@ -385,6 +411,27 @@ def monitor_product(name: str, url: str, force_full: bool = False) -> dict:
     return result
 
 
+def tag_self_product(name: str):
+    """自己的产品跳过爬取（通过 Admin 手动管理），但仍然检查是否需要打标"""
+    print(f"\n📦 {name}")
+    print(f"   ⏭️ 跳过（通过 Admin 手动管理）")
+    _, features, _ = load_storage(name)
+    # 检查未打标的：tags 为空、None、"None" 字符串、或空数组
+    def needs_tagging(f):
+        tags = f.get("tags")
+        if not tags:
+            return True
+        if isinstance(tags, str):  # "None" 字符串
+            return True
+        if isinstance(tags, list) and len(tags) == 0:
+            return True
+        return False
+    untagged = [f for f in features if needs_tagging(f)]
+    if untagged:
+        print(f"   🏷️ 发现 {len(untagged)} 条未打标，正在处理...")
+        run_tagging_for_product(name)
+
+
 def monitor_all(force_full: bool = False):
     """监控所有竞品"""
     print("=" * 60)
@@ -402,52 +449,46 @@ def monitor_all(force_full: bool = False):
 
     total_new = 0
 
+    urls = {}
+    self_products = []
     for competitor in competitors:
         name = competitor.get("name", "")
-        url = competitor.get("url", "")
-        is_self = competitor.get("is_self", False)
-
         if not name:
             continue
-
-        # 跳过自己的产品（通过 Admin 手动管理）
-        if is_self:
-            print(f"\n📦 {name}")
-            print(f"   ⏭️ 跳过（通过 Admin 手动管理）")
-            # 但仍然检查是否需要打标
-            _, features, _ = load_storage(name)
-            # 检查未打标的：tags 为空、None、"None" 字符串、或空数组
-            def needs_tagging(f):
-                tags = f.get("tags")
-                if not tags:
-                    return True
-                if isinstance(tags, str):  # "None" 字符串
-                    return True
-                if isinstance(tags, list) and len(tags) == 0:
-                    return True
-                return False
-            untagged = [f for f in features if needs_tagging(f)]
-            if untagged:
-                print(f"   🏷️ 发现 {len(untagged)} 条未打标，正在处理...")
-                run_tagging_for_product(name)
-            continue
-
-        try:
-            result = monitor_product(name, url, force_full)
-            all_updates["updates"][name] = result
-            total_new += result.get("new_count", 0)
-
-            # 更新同步状态
-            sync_status[name] = {
-                "last_sync": datetime.now().isoformat(),
-                "latest_date": get_latest_date(name)
-            }
-        except Exception as e:
-            print(f"   ❌ 监控失败: {e}")
-            all_updates["updates"][name] = {
-                "status": "failed",
-                "error": str(e)
-            }
+        # 自己的产品不爬取（通过 Admin 手动管理）
+        if competitor.get("is_self", False):
+            self_products.append(name)
+        else:
+            urls[name] = competitor.get("url", "")
+
+    # 爬虫在工作线程中并行运行（各自是独立子进程，结果写入暂存目录）；
+    # 每个爬虫结束后立即在当前线程合并并打标，不必等所有爬虫完成，storage 中始终是带 tags 的完整数据
+    print(f"\n🕷️ 正在并行爬取 {len(urls)} 个竞品...")
+    with ThreadPoolExecutor(max_workers=CRAWL_WORKERS) as executor:
+        futures = {executor.submit(run_crawler_process, name): name for name in urls}
+
+        # 等待爬虫期间先处理自己产品的打标
+        for name in self_products:
+            tag_self_product(name)
+
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                result = monitor_product(name, urls[name], force_full, future.result())
+                all_updates["updates"][name] = result
+                total_new += result.get("new_count", 0)
+
+                # 更新同步状态
+                sync_status[name] = {
+                    "last_sync": datetime.now().isoformat(),
+                    "latest_date": get_latest_date(name)
+                }
+            except Exception as e:
+                print(f"   ❌ 监控失败: {e}")
+                all_updates["updates"][name] = {
+                    "status": "failed",
+                    "error": str(e)
+                }
 
     # 保存同步状态
     save_sync_status(sync_status)
@@ -472,33 +513,13 @@ def monitor_all(force_full: bool = False):
 
 
 def run_ai_summary():
-    """运行 AI 总结脚本"""
-    root = get_project_root()
-    
-    # Docker 环境中脚本在 /app/，本地在 script/
-    if root == Path("/app"):
-        ai_script = root / "ai_summary.py"
-    else:
-        ai_script = root / "script" / "ai_summary.py"
-    
-    if not ai_script.exists():
-        print(f"  ⚠️ AI 总结脚本不存在: {ai_script}")
-        return
-    
+    """更新 AI 总结（直接调用总结模块，不再启动子进程）"""
     print("\n🤖 正在更新 AI 总结...")
     try:
-        result = subprocess.run(
-            [sys.executable, str(ai_script)],
-            capture_output=True,
-            text=True,
-            timeout=300  # AI 总结可能需要较长时间
-        )
-        if result.returncode == 0:
-            print("  ✓ AI 总结更新完成")
-        else:
-            print(f"  ⚠️ AI 总结更新失败: {result.stderr[:200]}")
-    except subprocess.TimeoutExpired:
-        print("  ⚠️ AI 总结更新超时")
+        # 常驻进程（API 服务）中多次运行时先清空配置/标签缓存，读取最新文件
+        ai_summary.clear_caches()
+        ai_summary.generate_all_summaries()
+        print("  ✓ AI 总结更新完成")
     except Exception as e:
         print(f"  ⚠️ AI 总结执行异常: {e}")
 
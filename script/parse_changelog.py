@@ -7,9 +7,13 @@
 import json
 import re
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 
+from json_io import save_json
 
+
+@lru_cache(maxsize=1)
 def get_project_root():
     """获取项目根目录（支持本地和 Docker 环境）"""
     script_dir = Path(__file__).parent
@@ -232,8 +236,7 @@ def parse_and_save(raw_file: Path = None, output_file: Path = None, preserve_tag
     ]
     
     # 保存
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=4)
+    save_json(output_file, output_data)
     
     print(f"已保存到 {output_file}")
     print(f"共 {len(features)} 条功能更新")
@@ -10,6 +10,8 @@ import time
 from pathlib import Path
 import requests
 
+from json_io import save_json
+
 
 def load_config():
     """加载 LLM 配置"""
@@ -383,8 +385,7 @@ def process_features(use_llm: bool = False, retag_all: bool = False, limit: int
             total_processed += 1
         
         # 保存更新后的数据
-        with open(json_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        save_json(json_file, data)
         
         print(f"  已处理 {len(features_to_tag)} 条，成功打标 {tagged_count} 条")
         total_tagged += tagged_count
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+API 服务后台任务测试：任务日志包含任务内部工作线程的输出
+运行: python -m unittest discover -s script/tests
+"""
+
+import contextvars
+import sys
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest import mock
+
+# 与 api_server 相同，同目录下的脚本作为模块导入
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import ai_summary
+import api_server
+
+
+class RunTaskAsyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = mock.patch.object(api_server, "LOGS_DIR", Path(self.tmp.name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_task(self, func, **kwargs) -> tuple:
+        """运行任务并等待结束，返回 (是否成功, 日志内容)"""
+        done = threading.Event()
+        result = {}
+
+        def callback(success):
+            result["success"] = success
+            done.set()
+
+        api_server.run_task_async("test", func, callback=callback, **kwargs)
+        self.assertTrue(done.wait(10), "任务未在 10 秒内结束")
+        logs = list(Path(self.tmp.name).glob("*.log"))
+        self.assertEqual(len(logs), 1)
+        return result["success"], logs[0].read_text(encoding="utf-8")
+
+    def test_log_captures_child_thread_output(self):
+        def task():
+            print("task thread")
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, print, f"child thread {i}")
+                           for i in range(2)]
+                for future in futures:
+                    future.result()
+
+        success, log = self.run_task(task)
+        self.assertTrue(success)
+        self.assertIn("task thread", log)
+        self.assertIn("child thread 0", log)
+        self.assertIn("child thread 1", log)
+
+    def test_log_captures_summary_worker_errors(self):
+        def fake_tag_summary(tag_name, *args):
+            print(f"API 返回错误: {tag_name}")
+            return ""
+
+        def task():
+            ai_summary.generate_tag_summaries(
+                [{"name": "Agent"}, {"name": "Deployment"}],
+                {"Agent": {}, "Deployment": {}}, {}, {}, "", {"max_concurrency": 2}
+            )
+
+        with mock.patch.object(ai_summary, "generate_tag_summary", fake_tag_summary):
+            success, log = self.run_task(task)
+        self.assertTrue(success)
+        self.assertIn("API 返回错误: Agent", log)
+        self.assertIn("API 返回错误: Deployment", log)
+
+    def test_timeout_releases_task(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def task():
+            print("stuck")
+            release.wait(10)
+
+        self.assertTrue(api_server.claim_task("test"))
+        self.addCleanup(api_server.release_task, "test")
+        success, log = self.run_task(task, task_type="test", timeout=0.2)
+        self.assertFalse(success)
+        self.assertIn("结果: 超时", log)
+        self.assertIn("stuck", log)
+        # 超时后任务标记已清除，可以再次触发
+        self.assertTrue(api_server.claim_task("test"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -565,7 +565,10 @@ function AdminPage() {
       })
       
       if (response.ok) {
-        setAddFeatureMessage('已添加！正在自动打标...')
+        const result = await response.json()
+        setAddFeatureMessage(result.tagging === 'already_running'
+          ? '已添加！打标任务正在运行，新条目将在下次打标时处理'
+          : '已添加！正在自动打标...')
         setNewFeatureTitle('')
         setNewFeatureDescription('')
         setNewFeatureTime('')